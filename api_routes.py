@@ -0,0 +1,347 @@
+import json
+from datetime import datetime
+from flask import Blueprint, Response, request, url_for
+from auth import current_user_id
+from cache import get_cache
+from db import execute_query
+from tasks_routes import (
+    cached_search,
+    current_tasks_version,
+    decode_cursor,
+    decode_search_cursor,
+    delete_task_record,
+    fetch_task,
+    fetch_task_page,
+    insert_task,
+    page_cache_key,
+    parse_list_options,
+    parse_page_size,
+    parse_version,
+    task_form_from_record,
+    tasks_cache_namespace,
+    validate_description,
+    validate_task_form,
+    validate_title,
+    update_task_record,
+)
+import psycopg2
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is absent
+    orjson = None
+
+api_bp = Blueprint("api", __name__, url_prefix="/api")
+
+TASK_FIELDS = ("id", "title", "description", "completed_at", "created_at", "updated_at")
+# Upper bound on ?ids= in a single batch lookup
+MAX_BATCH_IDS = 500
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def dumps(payload):
+    """Serialize `payload` to JSON, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, default=_json_default, separators=(",", ":"))
+
+
+def json_response(payload, status=200, headers=None):
+    """Build a JSON response with the fastest available serializer."""
+    return Response(
+        dumps(payload), status=status, headers=headers, mimetype="application/json"
+    )
+
+
+def parse_fields(value):
+    """
+    Parse a ?fields=id,title selection.
+
+    Returns:
+        (error_message, fields_tuple) tuple; fields are all TASK_FIELDS when
+        no selection was given
+    """
+    if not value:
+        return None, TASK_FIELDS
+    fields = tuple(dict.fromkeys(field.strip() for field in value.split(",")))
+    unknown = [field for field in fields if field not in TASK_FIELDS]
+    if unknown:
+        return f"Unknown fields: {', '.join(unknown)}", None
+    return None, fields
+
+
+def parse_ids(value):
+    """
+    Parse a ?ids=1,2,3 batch selection.
+
+    Returns:
+        (error_message, ids_list) tuple
+    """
+    try:
+        ids = list(dict.fromkeys(int(task_id) for task_id in value.split(",")))
+    except ValueError:
+        return "ids must be a comma-separated list of integers", None
+    if len(ids) > MAX_BATCH_IDS:
+        return f"At most {MAX_BATCH_IDS} ids per request", None
+    return None, ids
+
+
+def serialize_task(task, fields=TASK_FIELDS):
+    """Project a task row onto the selected fields."""
+    return {field: task[field] for field in fields}
+
+
+def read_json_body():
+    """Return the request's JSON object body, or None if it is not one."""
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else None
+
+
+def validate_completed(data, errors):
+    """Validate the optional boolean "completed" flag into `errors`."""
+    completed = data.get("completed", False)
+    if not isinstance(completed, bool):
+        errors["completed"] = "completed must be true or false"
+    return completed
+
+
+@api_bp.before_request
+def require_login():
+    """The API works on the logged-in user's tasks; anonymous calls get 401."""
+    if current_user_id() is None:
+        return json_response({"error": "Authentication required"}, 401)
+    return None
+
+
+@api_bp.errorhandler(psycopg2.Error)
+def handle_database_error(error):
+    return json_response({"error": "Database error"}, 500)
+
+
+@api_bp.route("/tasks", methods=["GET"])
+def list_tasks():
+    """
+    List the logged-in user's tasks as JSON.
+
+    With ?ids=1,2,3 the given tasks are fetched in one query; otherwise one
+    keyset page is returned using the same cursors, filters and sorts as
+    the HTML list. Both honour ?fields= to trim the payload.
+    """
+    error, fields = parse_fields(request.args.get("fields"))
+    if error:
+        return json_response({"error": error}, 400)
+
+    user_id = current_user_id()
+    if request.args.get("ids"):
+        error, ids = parse_ids(request.args["ids"])
+        if error:
+            return json_response({"error": error}, 400)
+        # Other users' tasks are reported as missing
+        rows = execute_query(
+            """
+            SELECT id, title, description, completed_at, created_at, updated_at
+            FROM tasks
+            WHERE id = ANY(%s) AND user_id = %s
+            """,
+            (ids, user_id),
+            prepare=True,
+        )
+        found = {row["id"]: row for row in rows}
+        return json_response(
+            {
+                "tasks": [serialize_task(found[i], fields) for i in ids if i in found],
+                "missing": [i for i in ids if i not in found],
+            }
+        )
+
+    errors, options = parse_list_options(request.args)
+    if errors:
+        return json_response({"errors": errors}, 400)
+    per_page = parse_page_size(request.args.get("per_page"))
+    after = decode_cursor(request.args.get("after"), options["sort"])
+    before = decode_cursor(request.args.get("before"), options["sort"])
+    tasks, next_cursor, prev_cursor = get_cache().get_or_load(
+        tasks_cache_namespace(user_id),
+        page_cache_key(after, before, per_page, options, current_tasks_version()),
+        lambda: fetch_task_page(
+            user_id, after=after, before=before, per_page=per_page, options=options
+        ),
+    )
+    return json_response(
+        {
+            "tasks": [serialize_task(task, fields) for task in tasks],
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor,
+        }
+    )
+
+
+@api_bp.route("/tasks/search", methods=["GET"])
+def search_tasks():
+    """
+    Search tasks with ?q=, best match first.
+
+    Partially typed words match as prefixes, so this also serves typeahead.
+    Further pages are fetched with ?after=<next_cursor>.
+    """
+    error, fields = parse_fields(request.args.get("fields"))
+    if error:
+        return json_response({"error": error}, 400)
+
+    tasks, next_cursor = cached_search(
+        current_user_id(),
+        request.args.get("q", ""),
+        decode_search_cursor(request.args.get("after")),
+        parse_page_size(request.args.get("per_page")),
+        current_tasks_version(),
+    )
+    return json_response(
+        {
+            "tasks": [serialize_task(task, fields) for task in tasks],
+            "next_cursor": next_cursor,
+        }
+    )
+
+
+@api_bp.route("/tasks", methods=["POST"])
+def create_task():
+    """Create a task from a JSON body."""
+    data = read_json_body()
+    if data is None:
+        return json_response({"error": "Expected a JSON object"}, 400)
+
+    errors, cleaned_data = validate_task_form(task_form_from_record(data))
+    completed = validate_completed(data, errors)
+    if errors:
+        return json_response({"errors": errors}, 400)
+
+    user_id = current_user_id()
+    task = insert_task(
+        cleaned_data["title"], cleaned_data["description"] or None, completed, user_id
+    )
+    if task is None:
+        return json_response({"error": "Failed to create task"}, 500)
+    get_cache().invalidate(tasks_cache_namespace(user_id))
+    return json_response(
+        serialize_task(task),
+        201,
+        headers={"Location": url_for("api.get_task", task_id=task["id"])},
+    )
+
+
+@api_bp.route("/tasks/<int:task_id>", methods=["GET"])
+def get_task(task_id):
+    """Return a single task."""
+    error, fields = parse_fields(request.args.get("fields"))
+    if error:
+        return json_response({"error": error}, 400)
+
+    task = fetch_task(current_user_id(), task_id)
+    if task is None:
+        return json_response({"error": "Task not found"}, 404)
+    return json_response(serialize_task(task, fields))
+
+
+@api_bp.route("/tasks/<int:task_id>", methods=["PUT"])
+def replace_task(task_id):
+    """
+    Replace a task; omitted optional fields are cleared.
+
+    Like PATCH, accepts "updated_at" in the body as an optimistic
+    concurrency precondition and answers 409 when it is stale.
+    """
+    data = read_json_body()
+    if data is None:
+        return json_response({"error": "Expected a JSON object"}, 400)
+
+    errors, cleaned_data = validate_task_form(task_form_from_record(data))
+    completed = validate_completed(data, errors)
+    version = read_version(data, errors)
+    if errors:
+        return json_response({"errors": errors}, 400)
+
+    return _update_task(
+        task_id,
+        {
+            "title": cleaned_data["title"],
+            "description": cleaned_data["description"] or None,
+            "completed": completed,
+        },
+        version,
+    )
+
+
+@api_bp.route("/tasks/<int:task_id>", methods=["PATCH"])
+def update_task(task_id):
+    """Update only the fields present in the JSON body."""
+    data = read_json_body()
+    if data is None:
+        return json_response({"error": "Expected a JSON object"}, 400)
+
+    errors = {}
+    changes = {}
+    form_data = task_form_from_record(data)
+    if "title" in data:
+        changes["title"] = form_data["title"].strip()
+        if error := validate_title(changes["title"]):
+            errors["title"] = error
+    if "description" in data:
+        changes["description"] = form_data["description"].strip() or None
+        if error := validate_description(changes["description"]):
+            errors["description"] = error
+    if "completed" in data:
+        changes["completed"] = validate_completed(data, errors)
+    version = read_version(data, errors)
+    if errors:
+        return json_response({"errors": errors}, 400)
+    if not changes:
+        return json_response({"error": "No updatable fields given"}, 400)
+
+    return _update_task(task_id, changes, version)
+
+
+def read_version(data, errors):
+    """
+    Read the optional "updated_at" precondition from a JSON body.
+
+    When given, the write only applies if the task still has that updated_at.
+    """
+    if data.get("updated_at") is None:
+        return None
+    version = parse_version(data["updated_at"])
+    if version is None:
+        errors["updated_at"] = "updated_at must be an ISO 8601 datetime"
+    return version
+
+
+def _update_task(task_id, changes, version):
+    status, task = update_task_record(
+        current_user_id(), task_id, changes, expected_updated_at=version
+    )
+    if status == "not_found":
+        return json_response({"error": "Task not found"}, 404)
+    if status == "conflict":
+        return json_response({"error": "Task was modified by another request"}, 409)
+    return json_response(serialize_task(task))
+
+
+@api_bp.route("/tasks/<int:task_id>", methods=["DELETE"])
+def delete_task(task_id):
+    """Delete a task, honouring an optional ?updated_at= precondition."""
+    version = None
+    if request.args.get("updated_at"):
+        version = parse_version(request.args["updated_at"])
+        if version is None:
+            return json_response({"error": "Invalid updated_at"}, 400)
+
+    status = delete_task_record(current_user_id(), task_id, expected_updated_at=version)
+    if status == "not_found":
+        return json_response({"error": "Task not found"}, 404)
+    if status == "conflict":
+        return json_response({"error": "Task was modified by another request"}, 409)
+    return Response(status=204)
@@ -1,5 +1,20 @@
 import os
+from collections.abc import Mapping
 from flask import Flask, Blueprint, render_template
+import batching
+import cache
+import db
+import db_async
+import fragments
+import instrumentation
+import live
+import metrics
+import passwords
+import ratelimit
+from api_routes import api_bp
+from async_routes import async_tasks_bp
+from auth import auth_bp
+from jobs import jobs_bp
 from tasks_routes import tasks_bp
 
 main_bp = Blueprint("main", __name__)
@@ -12,21 +27,49 @@ def index():
 
 def register_routes(app):
     app.register_blueprint(main_bp)
+    app.register_blueprint(auth_bp)
     app.register_blueprint(tasks_bp)
+    app.register_blueprint(api_bp)
+    app.register_blueprint(jobs_bp)
+    app.register_blueprint(metrics.metrics_bp)
+    # Async views need psycopg 3 and flask[async] (the "async" extra)
+    if db_async.AVAILABLE:
+        app.register_blueprint(async_tasks_bp)
 
 
-def create_app(config_name=None):
-    if config_name is None:
-        config_name = os.environ.get("FLASK_ENV", "default")
+def create_app(config=None):
+    """
+    Create the app, applying `config` before any extension reads it.
 
+    Every extension takes its settings from app.config in init_app, falling
+    back to the environment, so overrides have to be in place by then.
+
+    Args:
+        config: Optional mapping of config keys, or an object whose
+            uppercase attributes are config keys (as for from_object)
+
+    Returns:
+        Flask app
+    """
     app = Flask(__name__)
     app.config["SECRET_KEY"] = os.environ.get(
         "SECRET_KEY", "dev-secret-key-change-in-production"
     )
-    # app.config.from_object(config[config_name])
+    if isinstance(config, Mapping):
+        app.config.from_mapping(config)
+    elif config is not None:
+        app.config.from_object(config)
 
     # Initialize extensions
-    # db.init_app(app)
+    db.init_app(app)
+    cache.init_app(app)
+    instrumentation.init_app(app)
+    metrics.init_app(app)
+    passwords.init_app(app)
+    live.init_app(app)
+    fragments.init_app(app)
+    batching.init_app(app)
+    ratelimit.init_app(app)
 
     # Register blueprints
     register_routes(app)
@@ -45,6 +88,9 @@ def create_app(config_name=None):
 # CRUD  => Create Read Update Delete
 # ^
 # HTTP Verbs / HTTP methods
+#
+# The JSON versions of these routes live under /api/tasks (api_routes.py)
+# and async versions of the list/create views under /async/tasks
 
 if __name__ == "__main__":
     app = create_app()
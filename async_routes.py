@@ -0,0 +1,137 @@
+import asyncio
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import make_response
+from auth import current_user_id, login_required
+from cache import get_cache
+import batching
+import db_async
+import psycopg2
+from tasks_routes import (
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_SORT,
+    build_task_page_query,
+    create_task_query,
+    decode_cursor,
+    insert_task,
+    is_not_modified,
+    list_query_args,
+    page_cache_key,
+    paginate_task_rows,
+    parse_list_options,
+    parse_page_size,
+    tasks_cache_namespace,
+    tasks_validators,
+    validate_task_form,
+    with_validators,
+)
+
+# Async versions of the task views, served from the psycopg 3 pool in
+# db_async. Registered only when psycopg 3 is installed (see app.py).
+# Groundwork for an ASGI server: under WSGI each request still holds a worker
+# thread, and the queries of a request are awaited one after another.
+async_tasks_bp = Blueprint("async_tasks", __name__, url_prefix="/async/tasks")
+async_tasks_bp.before_request(login_required)
+
+
+async def current_tasks_version():
+    """Async version of tasks_routes.current_tasks_version."""
+    try:
+        return await db_async.get_table_version("tasks", current_user_id())
+    except db_async.Error:
+        return None
+
+
+async def fetch_task_page(
+    user_id, after=None, before=None, per_page=DEFAULT_PAGE_SIZE, options=None
+):
+    """Async version of tasks_routes.fetch_task_page."""
+    query, params = build_task_page_query(user_id, after, before, per_page, options)
+    rows = await db_async.execute_query(query, params)
+    sort = (options or {}).get("sort", DEFAULT_SORT)
+    return paginate_task_rows(rows, after, before, per_page, sort)
+
+
+@async_tasks_bp.route("/", methods=["GET"])
+async def list_tasks():
+    """Display one page of tasks; same cache and validators as /tasks."""
+    version = await current_tasks_version()
+    etag, last_modified = tasks_validators(version)
+    if etag and is_not_modified(etag, last_modified):
+        return with_validators(make_response("", 304), etag, last_modified)
+
+    errors, options = parse_list_options(request.args)
+    if errors:
+        for error_msg in errors.values():
+            flash(error_msg, "error")
+        return render_template("tasks/index.html", tasks=[]), 400
+
+    per_page = parse_page_size(request.args.get("per_page"))
+    after = decode_cursor(request.args.get("after"), options["sort"])
+    before = decode_cursor(request.args.get("before"), options["sort"])
+    user_id = current_user_id()
+    try:
+        tasks, next_cursor, prev_cursor = await get_cache().get_or_load_async(
+            tasks_cache_namespace(user_id),
+            page_cache_key(after, before, per_page, options, version),
+            lambda: fetch_task_page(
+                user_id, after=after, before=before, per_page=per_page, options=options
+            ),
+        )
+    except db_async.Error:
+        flash("Database error: Unable to load tasks", "error")
+        return render_template("tasks/index.html", tasks=[]), 500
+
+    response = make_response(
+        render_template(
+            "tasks/index.html",
+            tasks=tasks,
+            next_cursor=next_cursor,
+            prev_cursor=prev_cursor,
+            per_page=per_page,
+            page_args=list_query_args(options),
+            list_endpoint="async_tasks.list_tasks",
+        )
+    )
+    return with_validators(response, etag, last_modified)
+
+
+@async_tasks_bp.route("/", methods=["POST"])
+async def create_task():
+    """Handle task creation."""
+    errors, cleaned_data = validate_task_form(request.form)
+
+    if errors:
+        for field, error_msg in errors.items():
+            flash(error_msg, "error")
+        return (
+            render_template("tasks/new.html", errors=errors, form_data=request.form),
+            400,
+        )
+
+    user_id = current_user_id()
+    params = (
+        cleaned_data["title"],
+        cleaned_data["description"] or None,
+        False,
+        user_id,
+    )
+    try:
+        if batching.enabled():
+            # Coalesced with the sync views' creates, through the sync pool
+            task = await asyncio.to_thread(insert_task, *params)
+        else:
+            rows = await db_async.execute_update(create_task_query(), params)
+            task = rows[0] if rows else None
+    except (db_async.Error, psycopg2.Error) as db_error:
+        flash("Database error: Unable to create task", "error")
+        return render_template("tasks/new.html", errors={"db": str(db_error)}), 500
+
+    if not task:
+        flash("Failed to create task", "error")
+        return (
+            render_template("tasks/new.html", errors={"db": "Failed to create task"}),
+            500,
+        )
+    get_cache().invalidate(tasks_cache_namespace(user_id))
+    flash("Task created successfully!", "success")
+    return redirect(url_for("async_tasks.list_tasks"))
@@ -0,0 +1,248 @@
+"""Session-based login against the users table."""
+
+import logging
+
+import click
+import psycopg2
+from flask import (
+    Blueprint,
+    flash,
+    redirect,
+    render_template,
+    request,
+    session,
+    url_for,
+)
+
+import passwords
+from db import execute_query, execute_update
+
+auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
+
+MIN_PASSWORD_LENGTH = 8
+# Seconds a client is asked to wait when the hashing queue is full
+OVERLOADED_RETRY_AFTER = 1
+
+logger = logging.getLogger(__name__)
+
+
+def current_user_id():
+    """Return the id of the logged-in user, or None."""
+    return session.get("user_id")
+
+
+def redirect_to_login():
+    """Redirect to the login form, coming back to the current page afterwards."""
+    return redirect(url_for("auth.login", next=request.full_path.rstrip("?")))
+
+
+def login_required():
+    """
+    before_request hook for blueprints whose views need a logged-in user.
+
+    Anonymous requests are sent to the login form.
+    """
+    if current_user_id() is None:
+        return redirect_to_login()
+    return None
+
+
+def safe_next_url(value):
+    """Return `value` if it is a local path to redirect to, otherwise None."""
+    # "//host" and "/\host" are protocol-relative URLs to another site
+    if value and value.startswith("/") and not value.startswith(("//", "/\\")):
+        return value
+    return None
+
+
+def normalize_email(email):
+    return (email or "").strip().lower()
+
+
+def validate_credentials(email, password):
+    """
+    Validate registration input.
+
+    Returns:
+        Dict of field errors, empty when the input is valid
+    """
+    errors = {}
+    if not email or "@" not in email:
+        errors["email"] = "A valid email address is required"
+    elif len(email) > 255:
+        errors["email"] = "Email must be 255 characters or less"
+    if len(password or "") < MIN_PASSWORD_LENGTH:
+        errors["password"] = (
+            f"Password must be at least {MIN_PASSWORD_LENGTH} characters"
+        )
+    return errors
+
+
+def authenticate(email, password):
+    """
+    Check an email and password against the users table.
+
+    Unknown emails are still checked against a dummy hash, so a failed login
+    takes as long whether or not the account exists. A correct password
+    whose hash was made with other cost parameters is rehashed with the
+    current ones.
+
+    Returns:
+        The user row (id, email), or None if the credentials are wrong
+
+    Raises:
+        passwords.HashingOverloaded: If the hashing queue is full
+    """
+    rows = execute_query(
+        "SELECT id, email, hashed_password FROM users WHERE email = %s",
+        (normalize_email(email),),
+        prepare=True,
+    )
+    if not rows:
+        passwords.verify_password(passwords.dummy_hash(), password or "")
+        return None
+    user = rows[0]
+    if not passwords.verify_password(user["hashed_password"], password or ""):
+        return None
+    if passwords.needs_rehash(user["hashed_password"]):
+        rehash_password(user, password)
+    return {"id": user["id"], "email": user["email"]}
+
+
+def rehash_password(user, password):
+    """
+    Replace a user's hash with one made with the current cost parameters.
+
+    The update only applies if the hash is still the one that was checked,
+    so a concurrent password change wins. Failures are logged and leave the
+    old hash in place; the login itself has already succeeded.
+    """
+    try:
+        execute_update(
+            """
+            UPDATE users SET hashed_password = %s, updated_at = now()
+            WHERE id = %s AND hashed_password = %s
+            RETURNING id
+            """,
+            (
+                passwords.hash_password(password),
+                user["id"],
+                user["hashed_password"],
+            ),
+        )
+    except (psycopg2.Error, passwords.HashingOverloaded):
+        logger.warning("Could not rehash the password of user %s", user["id"])
+
+
+def create_user(email, password):
+    """
+    Insert a user with a hashed password.
+
+    Returns:
+        The new user row (id, email), or None if the email is already taken
+    """
+    result = execute_update(
+        """
+        INSERT INTO users (email, hashed_password)
+        VALUES (%s, %s)
+        ON CONFLICT (email) DO NOTHING
+        RETURNING id, email
+        """,
+        (normalize_email(email), passwords.hash_password(password)),
+    )
+    return dict(result[0]) if result else None
+
+
+def log_in(user):
+    """Start a session for `user`."""
+    # A fresh session on login, so a session planted before it can't be reused
+    session.clear()
+    session["user_id"] = user["id"]
+    session["email"] = user["email"]
+
+
+def overloaded(template, **context):
+    """Answer 503 with Retry-After when passwords can't be checked right now."""
+    flash("Too many sign-ins right now, please try again in a moment", "error")
+    body = render_template(template, **context)
+    return body, 503, {"Retry-After": str(OVERLOADED_RETRY_AFTER)}
+
+
+@auth_bp.route("/login", methods=["GET"])
+def login():
+    """Display the login form."""
+    return render_template("auth/login.html", next_url=request.args.get("next", ""))
+
+
+@auth_bp.route("/login", methods=["POST"])
+def login_submit():
+    """Log a user in with their email and password."""
+    next_url = request.form.get("next", "")
+    try:
+        user = authenticate(request.form.get("email"), request.form.get("password"))
+    except psycopg2.Error:
+        flash("Database error: Unable to log in", "error")
+        return render_template("auth/login.html", next_url=next_url), 500
+    except passwords.HashingOverloaded:
+        return overloaded("auth/login.html", next_url=next_url)
+    if user is None:
+        flash("Invalid email or password", "error")
+        return render_template("auth/login.html", next_url=next_url), 401
+
+    log_in(user)
+    return redirect(safe_next_url(next_url) or url_for("tasks.list_tasks"))
+
+
+@auth_bp.route("/logout", methods=["POST"])
+def logout():
+    """End the current session."""
+    session.clear()
+    flash("You have been logged out", "success")
+    return redirect(url_for("auth.login"))
+
+
+@auth_bp.route("/register", methods=["GET"])
+def register():
+    """Display the sign-up form."""
+    return render_template("auth/register.html")
+
+
+@auth_bp.route("/register", methods=["POST"])
+def register_submit():
+    """Create an account and log it in."""
+    email = normalize_email(request.form.get("email"))
+    password = request.form.get("password", "")
+    errors = validate_credentials(email, password)
+    if errors:
+        for error_msg in errors.values():
+            flash(error_msg, "error")
+        return render_template("auth/register.html", errors=errors), 400
+
+    try:
+        user = create_user(email, password)
+    except psycopg2.Error:
+        flash("Database error: Unable to create account", "error")
+        return render_template("auth/register.html"), 500
+    except passwords.HashingOverloaded:
+        return overloaded("auth/register.html")
+    if user is None:
+        flash("An account with that email already exists", "error")
+        return render_template("auth/register.html"), 409
+
+    log_in(user)
+    flash("Welcome!", "success")
+    return redirect(url_for("tasks.list_tasks"))
+
+
+@auth_bp.cli.command("create-user")
+@click.argument("email")
+@click.password_option()
+def create_user_command(email, password):
+    """Create a user account."""
+    errors = validate_credentials(normalize_email(email), password)
+    if errors:
+        raise click.UsageError("; ".join(errors.values()))
+    user = create_user(email, password)
+    if user is None:
+        raise click.ClickException(f"{email} is already registered")
+    click.echo(f"Created user {user['id']} ({user['email']})")
@@ -0,0 +1,235 @@
+"""Opt-in coalescing of concurrent single-row inserts into multi-row ones."""
+
+import itertools
+import os
+import threading
+
+import psycopg2
+
+import db
+import instrumentation
+
+# Settings, overridable per app through app.config (see init_app)
+WRITE_BATCH_ENABLED = os.environ.get("WRITE_BATCH_ENABLED", "0") == "1"
+# Seconds the first insert of a batch waits for others to join it; this is
+# added to the latency of every batched insert
+WRITE_BATCH_WINDOW = float(os.environ.get("WRITE_BATCH_WINDOW", 0.003))
+# Inserts per batch; a full batch runs without waiting out the window
+WRITE_BATCH_MAX_ROWS = int(os.environ.get("WRITE_BATCH_MAX_ROWS", 50))
+
+# Errors caused by one row's values rather than the database; a batch that
+# fails with one is retried row by row so only the offending caller sees it
+ROW_ERRORS = (psycopg2.IntegrityError, psycopg2.DataError)
+
+
+class BatchError(psycopg2.Error):
+    """
+    Raised in each caller of a batch that failed as a whole, with the
+    original error as its __cause__.
+
+    Every caller gets its own exception, rather than one instance raised in
+    several threads at once. It is a psycopg2.Error so views handle it like
+    the database error it stands for.
+    """
+
+
+class _Batch:
+    """Inserts collected in one window, and their outcome."""
+
+    __slots__ = ("params", "rows", "errors", "shared_error", "full", "done")
+
+    def __init__(self):
+        self.params = []
+        self.rows = []
+        self.errors = []
+        # Whether every caller was given the same error
+        self.shared_error = False
+        self.full = threading.Event()
+        self.done = threading.Event()
+
+
+class InsertBatcher:
+    """
+    Coalesces concurrent single-row inserts into one multi-row statement.
+
+    The first caller of a batch waits up to `window` seconds (or until
+    `max_rows` callers have joined), then runs the whole batch through
+    execute_update as one statement and one commit, while the others wait
+    for it. Every caller gets back its own row, or its own exception, as if
+    it had inserted alone. No thread is started; a lone insert simply waits
+    out the window.
+
+    `build_query(count)` returns the statement inserting `count` rows. It
+    takes the parameters of each row in turn and must return each row with
+    an `ordinal` column, the 0-based position of its parameters, by which
+    rows are handed back to their callers.
+    """
+
+    def __init__(
+        self,
+        name,
+        build_query,
+        window=WRITE_BATCH_WINDOW,
+        max_rows=WRITE_BATCH_MAX_ROWS,
+    ):
+        self.name = name
+        self.build_query = build_query
+        self.window = window
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._open = None
+        self._batches = 0
+        self._rows = 0
+        self._retried = 0
+
+    def submit(self, params):
+        """
+        Insert one row, batched with whatever arrives within the window.
+
+        Args:
+            params: Parameters of the row, as for build_query(1)
+
+        Returns:
+            The inserted row
+        """
+        with self._lock:
+            batch = self._open
+            leader = batch is None
+            if leader:
+                batch = self._open = _Batch()
+            index = len(batch.params)
+            batch.params.append(params)
+            if len(batch.params) >= self.max_rows:
+                # Closed; the next caller starts a new batch
+                self._open = None
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._open is batch:
+                    self._open = None
+            self._run(batch)
+        else:
+            batch.done.wait()
+
+        error = batch.errors[index]
+        if error is not None:
+            if batch.shared_error:
+                raise BatchError(f"{self.name} batch failed: {error}") from error
+            raise error
+        # The leader's execute_update only marked the leader's session
+        db.note_write()
+        return batch.rows[index]
+
+    def _run(self, batch):
+        count = len(batch.params)
+        try:
+            batch.rows = self._insert(batch.params)
+            batch.errors = [None] * count
+        except ROW_ERRORS as error:
+            if count == 1:
+                batch.errors = [error]
+            else:
+                self._run_singly(batch)
+        except Exception as error:
+            # Not down to any one row; every caller sees it
+            batch.errors = [error] * count
+            batch.shared_error = count > 1
+        finally:
+            with self._lock:
+                self._batches += 1
+                self._rows += count
+            batch.done.set()
+        instrumentation.record_batch(self.name, count)
+
+    def _run_singly(self, batch):
+        with self._lock:
+            self._retried += 1
+        batch.rows = [None] * len(batch.params)
+        batch.errors = [None] * len(batch.params)
+        for index, params in enumerate(batch.params):
+            try:
+                batch.rows[index] = self._insert([params])[0]
+            except Exception as error:
+                batch.errors[index] = error
+
+    def _insert(self, params):
+        # Not prepared: every batch size is a statement of its own
+        rows = db.execute_update(
+            self.build_query(len(params)), tuple(itertools.chain(*params))
+        )
+        by_ordinal = {row["ordinal"]: row for row in rows}
+        if len(rows) != len(params) or sorted(by_ordinal) != list(range(len(params))):
+            raise RuntimeError(
+                f"{self.name} batch of {len(params)} returned ordinals "
+                f"{sorted(by_ordinal)}"
+            )
+        return [by_ordinal[ordinal] for ordinal in range(len(params))]
+
+    def stats(self):
+        """Return batch and row counts."""
+        with self._lock:
+            return {
+                "batches": self._batches,
+                "rows": self._rows,
+                "avg_rows": self._rows / self._batches if self._batches else 0.0,
+                "retried_singly": self._retried,
+            }
+
+
+_settings = {
+    "enabled": WRITE_BATCH_ENABLED,
+    "window": WRITE_BATCH_WINDOW,
+    "max_rows": WRITE_BATCH_MAX_ROWS,
+}
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(name, build_query):
+    """
+    Return the process-wide InsertBatcher called `name`, creating it on
+    first use.
+
+    Returns:
+        InsertBatcher, or None if write batching is disabled
+    """
+    if not _settings["enabled"]:
+        return None
+    batcher = _batchers.get(name)
+    if batcher is None:
+        with _batchers_lock:
+            batcher = _batchers.get(name)
+            if batcher is None:
+                batcher = _batchers[name] = InsertBatcher(
+                    name, build_query, _settings["window"], _settings["max_rows"]
+                )
+    return batcher
+
+
+def enabled():
+    """Whether write batching is on (WRITE_BATCH_ENABLED)."""
+    return _settings["enabled"]
+
+
+def stats():
+    """Return the stats of every batcher, by name."""
+    return {name: batcher.stats() for name, batcher in list(_batchers.items())}
+
+
+def init_app(app):
+    """
+    Configure write batching for `app`.
+
+    Recognised keys are WRITE_BATCH_ENABLED, WRITE_BATCH_WINDOW and
+    WRITE_BATCH_MAX_ROWS.
+    """
+    _settings.update(
+        enabled=app.config.get("WRITE_BATCH_ENABLED", WRITE_BATCH_ENABLED),
+        window=app.config.get("WRITE_BATCH_WINDOW", WRITE_BATCH_WINDOW),
+        max_rows=app.config.get("WRITE_BATCH_MAX_ROWS", WRITE_BATCH_MAX_ROWS),
+    )
+    with _batchers_lock:
+        _batchers.clear()
+    app.extensions["write_batching"] = _settings
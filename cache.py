@@ -0,0 +1,276 @@
+"""Read-through query cache with namespace invalidation."""
+
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+# Cache settings, overridable per app through app.config (see init_app)
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory")
+CACHE_URL = os.environ.get("CACHE_URL", "redis://localhost:6379/0")
+CACHE_TTL = float(os.environ.get("CACHE_TTL", 30))
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", 1024))
+
+_MISSING = object()
+
+_cache = None
+
+
+class BaseCache:
+    """
+    Read-through cache keyed by namespace and key parts.
+
+    Every namespace carries a version number that is part of each key, so
+    invalidating a namespace is a single version bump: entries written under
+    the old version are never read again and simply age out. This also makes
+    a load that races with a write harmless, since its result is stored under
+    the version that was current before the write.
+    """
+
+    def __init__(self, default_ttl=CACHE_TTL):
+        self.default_ttl = default_ttl
+        self._stats_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def get_or_load(self, namespace, key_parts, loader, ttl=None):
+        """
+        Return the cached value for `key_parts`, calling `loader` on a miss.
+
+        Args:
+            namespace: Group of keys invalidated together (e.g. "tasks")
+            key_parts: Iterable of values identifying the entry
+            loader: Zero-argument callable producing the value
+            ttl: Seconds to keep the value (defaults to default_ttl)
+        """
+        key = self._key(namespace, key_parts)
+        value = self._get(key)
+        if value is not _MISSING:
+            self._count("_hits")
+            return value
+
+        self._count("_misses")
+        value = loader()
+        self._set(key, value, self.default_ttl if ttl is None else ttl)
+        return value
+
+    async def get_or_load_async(self, namespace, key_parts, loader, ttl=None):
+        """Like get_or_load, but `loader` returns an awaitable."""
+        key = self._key(namespace, key_parts)
+        value = self._get(key)
+        if value is not _MISSING:
+            self._count("_hits")
+            return value
+
+        self._count("_misses")
+        value = await loader()
+        self._set(key, value, self.default_ttl if ttl is None else ttl)
+        return value
+
+    def invalidate(self, namespace):
+        """Drop every entry of `namespace`."""
+        self._bump_version(namespace)
+        self._count("_invalidations")
+
+    def stats(self):
+        """Return hit/miss/invalidation counters."""
+        with self._stats_lock:
+            return {
+                "backend": self.backend,
+                "hits": self._hits,
+                "misses": self._misses,
+                "invalidations": self._invalidations,
+            }
+
+    def _key(self, namespace, key_parts):
+        version = self._get_version(namespace)
+        return ":".join([namespace, f"v{version}", *map(str, key_parts)])
+
+    def _count(self, counter):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+class NullCache(BaseCache):
+    """Cache that stores nothing; every lookup calls the loader."""
+
+    backend = "none"
+
+    def _get(self, key):
+        return _MISSING
+
+    def _set(self, key, value, ttl):
+        pass
+
+    def _get_version(self, namespace):
+        return 0
+
+    def _bump_version(self, namespace):
+        pass
+
+
+class LRUCache(BaseCache):
+    """
+    In-process LRU cache with per-entry TTL.
+
+    Entries are private to the worker process, so after a write other
+    processes may serve stale data for up to the TTL; use RedisCache when
+    invalidation has to reach every worker.
+    """
+
+    backend = "memory"
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, default_ttl=CACHE_TTL):
+        super().__init__(default_ttl)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._evictions = 0
+        self._expirations = 0
+
+    def stats(self):
+        stats = super().stats()
+        with self._lock:
+            stats.update(
+                entries=len(self._entries),
+                max_entries=self.max_entries,
+                evictions=self._evictions,
+                expirations=self._expirations,
+            )
+        return stats
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._expirations += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def _get_version(self, namespace):
+        with self._lock:
+            return self._versions.get(namespace, 0)
+
+    def _bump_version(self, namespace):
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+
+
+class RedisCache(BaseCache):
+    """
+    Cache stored in a Redis-compatible server shared by all workers.
+
+    Namespace versions live in the server too, so an invalidation in one
+    process is seen by all of them. Server errors are treated as misses so
+    an unavailable cache never fails a request.
+    """
+
+    backend = "redis"
+
+    def __init__(self, client, default_ttl=CACHE_TTL, prefix="taskmanager:"):
+        super().__init__(default_ttl)
+        import redis
+
+        self._client = client
+        self._prefix = prefix
+        self._errors = redis.RedisError
+        self._error_count = 0
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        import redis
+
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def stats(self):
+        stats = super().stats()
+        with self._stats_lock:
+            stats["errors"] = self._error_count
+        return stats
+
+    def _get(self, key):
+        try:
+            data = self._client.get(self._prefix + key)
+        except self._errors:
+            self._count("_error_count")
+            return _MISSING
+        return _MISSING if data is None else pickle.loads(data)
+
+    def _set(self, key, value, ttl):
+        try:
+            self._client.set(
+                self._prefix + key, pickle.dumps(value), px=max(1, int(ttl * 1000))
+            )
+        except self._errors:
+            self._count("_error_count")
+
+    def _get_version(self, namespace):
+        try:
+            return int(self._client.get(f"{self._prefix}version:{namespace}") or 0)
+        except self._errors:
+            self._count("_error_count")
+            return 0
+
+    def _bump_version(self, namespace):
+        try:
+            self._client.incr(f"{self._prefix}version:{namespace}")
+        except self._errors:
+            self._count("_error_count")
+
+
+def create_cache(backend=CACHE_BACKEND, url=CACHE_URL, **kwargs):
+    """
+    Build a cache for `backend` ("memory", "redis" or "none").
+
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    if backend == "memory":
+        return LRUCache(**kwargs)
+    if backend == "redis":
+        kwargs.pop("max_entries", None)
+        return RedisCache.from_url(url, **kwargs)
+    if backend == "none":
+        return NullCache(kwargs.get("default_ttl", CACHE_TTL))
+    raise ValueError(f"Unknown cache backend: {backend}")
+
+
+def get_cache():
+    """Return the shared cache, creating an in-memory one on first use."""
+    global _cache
+    if _cache is None:
+        _cache = create_cache()
+    return _cache
+
+
+def init_app(app):
+    """
+    Configure the shared cache from app.config.
+
+    Recognised keys are CACHE_BACKEND, CACHE_URL, CACHE_TTL and
+    CACHE_MAX_ENTRIES.
+    """
+    global _cache
+    _cache = create_cache(
+        app.config.get("CACHE_BACKEND", CACHE_BACKEND),
+        app.config.get("CACHE_URL", CACHE_URL),
+        max_entries=app.config.get("CACHE_MAX_ENTRIES", CACHE_MAX_ENTRIES),
+        default_ttl=app.config.get("CACHE_TTL", CACHE_TTL),
+    )
+    app.extensions["cache"] = _cache
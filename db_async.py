@@ -0,0 +1,212 @@
+"""
+Asyncio counterpart of db.py built on psycopg 3 and its async pool.
+
+The pool lives on a dedicated event loop thread. Flask runs each async view
+in an event loop of its own, and a psycopg 3 connection belongs to the loop
+that opened it, so every unit of work (checkout, queries, commit and
+return) is handed whole to the pool's loop with run_on_db_loop. One pool
+therefore serves every request. The caller's context variables travel with
+the work, so query instrumentation still sees the request. psycopg 3 is
+optional (the "async" extra); AVAILABLE tells whether it is installed.
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+
+import db
+import instrumentation
+
+try:
+    import psycopg
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+except ImportError:  # pragma: no cover - exercised when psycopg 3 is absent
+    psycopg = None
+    AVAILABLE = False
+    Error = None
+else:
+    AVAILABLE = True
+    # Base class of every psycopg 3 (and pool) error, like psycopg2.Error
+    Error = psycopg.Error
+
+_loop = None
+_pool = None
+_lock = threading.Lock()
+
+
+def _get_loop():
+    """Return the event loop owning the pool, starting its thread if needed."""
+    global _loop
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=loop.run_forever, name="db-async", daemon=True
+            ).start()
+            _loop = loop
+        return _loop
+
+
+async def run_on_db_loop(coro):
+    """Await `coro` on the pool's event loop from any other event loop."""
+    loop = _get_loop()
+    if asyncio.get_running_loop() is loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+
+def _build_pool(settings):
+    if not AVAILABLE:
+        raise RuntimeError(
+            "The async data layer needs psycopg 3 (pip install .[async])"
+        )
+    settings = {**db.POOL_SETTINGS, **settings}
+    return AsyncConnectionPool(
+        db.DATABASE_URL,
+        min_size=settings["min_size"],
+        max_size=settings["max_size"],
+        timeout=settings["timeout"],
+        max_lifetime=settings["max_age"],
+        max_idle=settings["max_idle"],
+        kwargs={"row_factory": dict_row},
+        open=False,
+    )
+
+
+async def get_pool():
+    """Return the shared async pool, opening it on first use."""
+    global _pool
+    if _pool is None:
+        pool = _build_pool({})
+        await run_on_db_loop(pool.open())
+        with _lock:
+            if _pool is None:
+                _pool, pool = pool, None
+        if pool is not None:
+            # Another request opened a pool first
+            await run_on_db_loop(pool.close())
+    return _pool
+
+
+async def close_pool():
+    """Close the shared async pool; the next use opens a fresh one."""
+    global _pool
+    with _lock:
+        previous, _pool = _pool, None
+    if previous is not None:
+        await run_on_db_loop(previous.close())
+
+
+def pool_stats():
+    """Return usage counters of the async pool, or {} if it is not open."""
+    return _pool.get_stats() if _pool is not None else {}
+
+
+@asynccontextmanager
+async def get_cursor(commit=True):
+    """
+    Async context manager for a database cursor.
+    Checks a connection out of the async pool and commits or rolls back
+    when the block exits, like db.get_cursor.
+
+    Only usable on the pool's loop: wrap the unit of work in a coroutine and
+    await it through run_on_db_loop.
+
+    Args:
+        commit: Whether to commit when the block exits cleanly
+
+    Raises:
+        RuntimeError: If called from another event loop
+    """
+    if asyncio.get_running_loop() is not _get_loop():
+        raise RuntimeError(
+            "db_async.get_cursor must run on the pool's loop (see run_on_db_loop)"
+        )
+    pool = await get_pool()
+    started = time.perf_counter()
+    conn = await pool.getconn()
+    instrumentation.record_acquire(time.perf_counter() - started)
+    try:
+        async with conn.cursor() as cursor:
+            yield cursor
+        if commit:
+            await conn.commit()
+        else:
+            await conn.rollback()
+    except Error:
+        if not conn.closed:
+            try:
+                await conn.rollback()
+            except Error:
+                # The pool notices the broken connection and replaces it
+                pass
+        raise
+    finally:
+        await pool.putconn(conn)
+
+
+async def _execute(cursor, query, params):
+    started = time.perf_counter()
+    try:
+        await cursor.execute(query, params or ())
+    finally:
+        rows = cursor.rowcount if cursor.rowcount >= 0 else None
+        instrumentation.record_query(query, time.perf_counter() - started, rows)
+
+
+async def execute_query(query, params=None, commit=False):
+    """
+    Execute a SELECT query and return results.
+
+    Args:
+        query: SQL query string
+        params: Query parameters (tuple or list)
+        commit: Whether to commit (usually False for SELECT)
+
+    Returns:
+        List of result rows as dictionaries
+    """
+    return await run_on_db_loop(_fetch(query, params, commit))
+
+
+async def _fetch(query, params, commit):
+    async with get_cursor(commit=commit) as cursor:
+        await _execute(cursor, query, params)
+        return await cursor.fetchall()
+
+
+async def get_table_version(table_name, user_id):
+    """Async version of db.get_table_version."""
+    rows = await execute_query(
+        "SELECT version, updated_at FROM table_versions "
+        "WHERE table_name = %s AND user_id = %s",
+        (table_name, user_id),
+    )
+    return rows[0] if rows else None
+
+
+async def execute_update(query, params=None):
+    """
+    Execute an INSERT, UPDATE, or DELETE query.
+    Automatically commits the transaction.
+
+    Args:
+        query: SQL query string
+        params: Query parameters (tuple or list)
+
+    Returns:
+        List of returned rows (from RETURNING clause) or empty list
+    """
+    rows = await run_on_db_loop(_write(query, params))
+    db.note_write()
+    return rows
+
+
+async def _write(query, params):
+    async with get_cursor(commit=True) as cursor:
+        await _execute(cursor, query, params)
+        if cursor.description:
+            return await cursor.fetchall()
+        return []
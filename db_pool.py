@@ -0,0 +1,282 @@
+"""Thread-safe PostgreSQL connection pool used behind db.get_cursor."""
+
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+
+class PoolTimeout(PoolError):
+    """Raised when no connection becomes available before the checkout timeout."""
+
+
+class _PooledConnection:
+    """Bookkeeping for a single connection owned by the pool."""
+
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn, now):
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    """
+    Bounded pool of database connections.
+
+    Connections are created lazily up to max_size. Checkout blocks for up to
+    `timeout` seconds when every connection is in use. Idle connections are
+    health checked before reuse and recycled once they exceed max_age, or
+    max_idle while the pool holds more than min_size connections.
+
+    Args:
+        connect: Zero-argument callable returning a new DB-API connection
+        min_size: Connections kept open even when idle
+        max_size: Upper bound on open connections
+        timeout: Seconds to wait for a free connection before PoolTimeout
+        max_age: Seconds after which a connection is closed and replaced
+        max_idle: Seconds an idle connection above min_size is kept around
+        check_interval: Idle seconds after which a connection is pinged
+            with SELECT 1 before being handed out
+    """
+
+    def __init__(
+        self,
+        connect,
+        min_size=1,
+        max_size=10,
+        timeout=30.0,
+        max_age=3600.0,
+        max_idle=600.0,
+        check_interval=30.0,
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size")
+
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_age = max_age
+        self.max_idle = max_idle
+        self.check_interval = check_interval
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._in_use = {}
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+        self._pid = os.getpid()
+
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._created = 0
+        self._discarded = 0
+
+    def getconn(self, timeout=None):
+        """
+        Check out a connection, blocking until one is available.
+
+        Raises:
+            PoolTimeout: If no connection frees up within the timeout
+            PoolError: If the pool has been closed
+        """
+        if timeout is None:
+            timeout = self.timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        while True:
+            entry = self._reserve(deadline)
+            if entry is None:
+                entry = self._open()
+            elif not self._is_healthy(entry):
+                self._discard(entry)
+                continue
+
+            waited = time.monotonic() - started
+            with self._cond:
+                self._in_use[id(entry.conn)] = entry
+                self._checkouts += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            return entry.conn
+
+    def putconn(self, conn, discard=False):
+        """
+        Return a connection to the pool.
+
+        Any open transaction is rolled back. Broken, expired or explicitly
+        discarded connections are closed instead of being reused.
+        """
+        with self._cond:
+            entry = self._in_use.pop(id(conn), None)
+        if entry is None:
+            raise PoolError("Trying to put back a connection not owned by the pool")
+
+        if not discard and not conn.closed:
+            try:
+                status = conn.get_transaction_status()
+                if status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+
+        now = time.monotonic()
+        if (
+            discard
+            or conn.closed
+            or self._closed
+            or self._pid != os.getpid()
+            or now - entry.created_at > self.max_age
+        ):
+            self._discard(entry)
+            return
+
+        entry.last_used = now
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+
+    def close(self):
+        """Close all idle connections and refuse further checkouts."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        self._close_all(idle)
+
+    def stats(self):
+        """Return a snapshot of pool usage counters."""
+        with self._cond:
+            checkouts = self._checkouts
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "checkouts": checkouts,
+                "timeouts": self._timeouts,
+                "connections_created": self._created,
+                "connections_discarded": self._discarded,
+                "wait_time_total": self._wait_total,
+                "wait_time_max": self._wait_max,
+                "wait_time_avg": self._wait_total / checkouts if checkouts else 0.0,
+            }
+
+    def _reserve(self, deadline):
+        """
+        Pick an idle connection or reserve a slot for a new one.
+
+        Returns:
+            An idle entry, or None when the caller owns a freshly reserved
+            slot and must open a new connection.
+        """
+        expired = []
+        try:
+            with self._cond:
+                self._reset_after_fork()
+                while True:
+                    if self._closed:
+                        raise PoolError("Connection pool is closed")
+
+                    # Oldest idle connections sit at the left; recycle those
+                    # first, then reuse the most recently returned one.
+                    now = time.monotonic()
+                    while self._idle and self._is_expired(self._idle[0], now):
+                        expired.append(self._idle.popleft())
+                        self._size -= 1
+                        self._discarded += 1
+                    while self._idle:
+                        entry = self._idle.pop()
+                        if now - entry.created_at <= self.max_age:
+                            return entry
+                        expired.append(entry)
+                        self._size -= 1
+                        self._discarded += 1
+
+                    if self._size < self.max_size:
+                        self._size += 1
+                        return None
+
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            f"Timed out waiting for a database connection "
+                            f"(max_size={self.max_size})"
+                        )
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+        finally:
+            self._close_all(expired)
+
+    def _open(self):
+        try:
+            conn = self._connect()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._created += 1
+        return _PooledConnection(conn, time.monotonic())
+
+    def _is_expired(self, entry, now):
+        if now - entry.created_at > self.max_age:
+            return True
+        return now - entry.last_used > self.max_idle and self._size > self.min_size
+
+    def _is_healthy(self, entry):
+        if entry.conn.closed:
+            return False
+        if time.monotonic() - entry.last_used < self.check_interval:
+            return True
+        try:
+            with entry.conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            entry.conn.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def _discard(self, entry):
+        with self._cond:
+            self._size -= 1
+            self._discarded += 1
+            self._cond.notify()
+        self._close_all([entry])
+
+    def _reset_after_fork(self):
+        # Connections must not be shared across processes (e.g. gunicorn
+        # preload); a forked child forgets the parent's sockets and starts over.
+        pid = os.getpid()
+        if pid != self._pid:
+            self._pid = pid
+            self._idle.clear()
+            self._in_use.clear()
+            self._size = 0
+
+    @staticmethod
+    def _close_all(entries):
+        for entry in entries:
+            try:
+                entry.conn.close()
+            except psycopg2.Error:
+                pass
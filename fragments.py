@@ -0,0 +1,81 @@
+"""Cache of pre-rendered task cards, spliced into task list pages."""
+
+import os
+import time
+
+from flask import current_app
+from markupsafe import Markup
+
+import instrumentation
+from cache import LRUCache
+
+# Settings, overridable per app through app.config (see init_app)
+# Cards kept in memory; roughly 1.5 KB each
+FRAGMENT_CACHE_MAX_ENTRIES = int(os.environ.get("FRAGMENT_CACHE_MAX_ENTRIES", 5000))
+# Seconds a card is kept; cards are keyed by version, so this only ages out
+# cards of tasks that are no longer shown
+FRAGMENT_CACHE_TTL = float(os.environ.get("FRAGMENT_CACHE_TTL", 3600))
+FRAGMENT_CACHE_ENABLED = os.environ.get("FRAGMENT_CACHE_ENABLED", "1") == "1"
+
+TASK_CARD_TEMPLATE = "tasks/_task_card.html"
+
+_cache = LRUCache(FRAGMENT_CACHE_MAX_ENTRIES, FRAGMENT_CACHE_TTL)
+_enabled = FRAGMENT_CACHE_ENABLED
+
+
+def task_card(task):
+    """
+    Return the rendered card of `task`.
+
+    Cards are cached by (id, updated_at). Every write to a task moves its
+    updated_at (see the tasks_set_updated_at trigger), so a cached card is
+    never stale and needs no invalidation; only new or changed tasks go
+    through Jinja. A card renders nothing specific to the viewer.
+    """
+    if not _enabled:
+        return _render_card(task)
+    hit = True
+
+    def render():
+        nonlocal hit
+        hit = False
+        return _render_card(task)
+
+    card = _cache.get_or_load(
+        "task_card", (task["id"], task["updated_at"].isoformat()), render
+    )
+    if hit:
+        instrumentation.record_fragment(TASK_CARD_TEMPLATE, True)
+    return card
+
+
+def _render_card(task):
+    started = time.perf_counter()
+    template = current_app.jinja_env.get_template(TASK_CARD_TEMPLATE)
+    card = Markup(template.render(task=task))
+    instrumentation.record_fragment(
+        TASK_CARD_TEMPLATE, False, time.perf_counter() - started
+    )
+    return card
+
+
+def stats():
+    """Return hit/miss/eviction counters of the card cache."""
+    return {**_cache.stats(), "enabled": _enabled}
+
+
+def init_app(app):
+    """
+    Configure the card cache and expose task_card() to templates.
+
+    Recognised keys are FRAGMENT_CACHE_ENABLED, FRAGMENT_CACHE_MAX_ENTRIES
+    and FRAGMENT_CACHE_TTL.
+    """
+    global _cache, _enabled
+    _enabled = app.config.get("FRAGMENT_CACHE_ENABLED", FRAGMENT_CACHE_ENABLED)
+    _cache = LRUCache(
+        app.config.get("FRAGMENT_CACHE_MAX_ENTRIES", FRAGMENT_CACHE_MAX_ENTRIES),
+        app.config.get("FRAGMENT_CACHE_TTL", FRAGMENT_CACHE_TTL),
+    )
+    app.jinja_env.globals["task_card"] = task_card
+    app.extensions["fragments"] = _cache
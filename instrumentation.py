@@ -0,0 +1,210 @@
+"""Per-request database query instrumentation and slow-query log."""
+
+import logging
+import os
+import re
+import time
+
+from flask import g, has_app_context, has_request_context, request
+
+# Settings, overridable per app through app.config (see init_app)
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", 200))
+SLOW_QUERY_EXPLAIN = os.environ.get("SLOW_QUERY_EXPLAIN", "") == "1"
+SLOW_QUERY_LOG = os.environ.get("SLOW_QUERY_LOG")
+
+# Individual queries kept per request; later ones still count towards totals
+MAX_RECORDED_QUERIES = 100
+
+slow_query_logger = logging.getLogger("taskmanager.slow_queries")
+
+# Callables notified of every statement as (sql, duration, rows), of every
+# pool checkout as (duration), of every prepared statement run as (event),
+# "prepare" or "execute", of every cached fragment lookup as
+# (template, hit, duration), and of every batched insert as (name, rows);
+# see metrics.init_app
+query_listeners = []
+acquire_listeners = []
+statement_listeners = []
+fragment_listeners = []
+batch_listeners = []
+
+_threshold = SLOW_QUERY_THRESHOLD_MS / 1000
+_explain = SLOW_QUERY_EXPLAIN
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_RE = re.compile(r"%s|%\(\w+\)s")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_sql(query):
+    """
+    Reduce a statement to its shape for logging and grouping.
+
+    Literals and placeholders become "?" and whitespace is collapsed, so the
+    same query issued with different values normalizes to the same text.
+    """
+    if isinstance(query, bytes):
+        query = query.decode("utf-8", "replace")
+    query = _STRING_RE.sub("?", str(query))
+    query = _NUMBER_RE.sub("?", query)
+    query = _PLACEHOLDER_RE.sub("?", query)
+    return _SPACE_RE.sub(" ", query).strip()
+
+
+class QueryRecord:
+    """Timing of a single statement."""
+
+    __slots__ = ("sql", "duration", "rows")
+
+    def __init__(self, sql, duration, rows):
+        self.sql = sql
+        self.duration = duration
+        self.rows = rows
+
+
+class RequestStats:
+    """Queries and connection checkouts made while handling one request."""
+
+    def __init__(self):
+        self.queries = []
+        self.query_count = 0
+        self.query_time = 0.0
+        self.acquire_count = 0
+        self.acquire_time = 0.0
+
+    def add_query(self, sql, duration, rows):
+        self.query_count += 1
+        self.query_time += duration
+        if len(self.queries) < MAX_RECORDED_QUERIES:
+            self.queries.append(QueryRecord(normalize_sql(sql), duration, rows))
+
+    def add_acquire(self, duration):
+        self.acquire_count += 1
+        self.acquire_time += duration
+
+    def server_timing(self, total=None):
+        """Format the totals (and the whole request's `total`) as Server-Timing."""
+        metrics = [
+            f'db;dur={self.query_time * 1000:.2f};desc="{self.query_count} queries"',
+            f"db-acquire;dur={self.acquire_time * 1000:.2f}",
+        ]
+        if total is not None:
+            metrics.append(f"app;dur={total * 1000:.2f}")
+        return ", ".join(metrics)
+
+
+def current_stats():
+    """Return the RequestStats of the current request, or None outside one."""
+    if not has_app_context():
+        return None
+    return g.get("query_stats")
+
+
+def record_query(sql, duration, rows=None, explain=None):
+    """
+    Record one executed statement.
+
+    Args:
+        sql: Statement text as sent to the driver
+        duration: Wall time in seconds
+        rows: Rows returned or affected, None if unknown
+        explain: Optional zero-argument callable returning the plan lines;
+            called only for slow queries when EXPLAIN capture is enabled
+    """
+    stats = current_stats()
+    if stats is not None:
+        stats.add_query(sql, duration, rows)
+    for listener in query_listeners:
+        listener(sql, duration, rows)
+    if duration >= _threshold:
+        log_slow_query(sql, duration, rows, explain if _explain else None)
+
+
+def record_acquire(duration):
+    """Record the time spent checking a connection out of a pool."""
+    stats = current_stats()
+    if stats is not None:
+        stats.add_acquire(duration)
+    for listener in acquire_listeners:
+        listener(duration)
+
+
+def record_statement(event):
+    """
+    Record a prepared statement run: "prepare" (first on its connection) or
+    "execute" (reusing the prepared plan).
+    """
+    for listener in statement_listeners:
+        listener(event)
+
+
+def record_fragment(template, hit, duration=None):
+    """
+    Record a cached fragment lookup.
+
+    Args:
+        template: Name of the fragment's template
+        hit: Whether the fragment came from the cache
+        duration: Render time in seconds on a miss
+    """
+    for listener in fragment_listeners:
+        listener(template, hit, duration)
+
+
+def record_batch(name, rows):
+    """Record a batched insert of `rows` rows by the batcher called `name`."""
+    for listener in batch_listeners:
+        listener(name, rows)
+
+
+def log_slow_query(sql, duration, rows, explain=None):
+    """Write a slow statement, and its plan when `explain` is given, to the log."""
+    message = f"{duration * 1000:.1f} ms rows={rows} {normalize_sql(sql)}"
+    if has_request_context():
+        message = f"{request.method} {request.path} {message}"
+    plan = explain() if explain else None
+    if plan:
+        message += "\n" + "\n".join(plan)
+    slow_query_logger.warning(message)
+
+
+def _start_request():
+    g.query_stats = RequestStats()
+    g.request_started = time.perf_counter()
+
+
+def _add_server_timing(response):
+    stats = current_stats()
+    if stats is not None:
+        total = time.perf_counter() - g.request_started
+        response.headers.add("Server-Timing", stats.server_timing(total))
+    return response
+
+
+def init_app(app):
+    """
+    Collect query stats per request and configure the slow-query log.
+
+    Recognised keys are SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_EXPLAIN (run
+    EXPLAIN for slow statements) and SLOW_QUERY_LOG (file to append to;
+    otherwise the "taskmanager.slow_queries" logger propagates as usual).
+    """
+    global _threshold, _explain
+    _threshold = app.config.get("SLOW_QUERY_THRESHOLD_MS", SLOW_QUERY_THRESHOLD_MS)
+    _threshold /= 1000
+    _explain = app.config.get("SLOW_QUERY_EXPLAIN", SLOW_QUERY_EXPLAIN)
+
+    log_path = app.config.get("SLOW_QUERY_LOG", SLOW_QUERY_LOG)
+    if log_path:
+        log_path = os.path.abspath(log_path)
+        if not any(
+            getattr(handler, "baseFilename", None) == log_path
+            for handler in slow_query_logger.handlers
+        ):
+            handler = logging.FileHandler(log_path)
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            slow_query_logger.addHandler(handler)
+
+    app.before_request(_start_request)
+    app.after_request(_add_server_timing)
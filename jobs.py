@@ -0,0 +1,443 @@
+"""Background jobs in a Postgres table, claimed with FOR UPDATE SKIP LOCKED."""
+
+import logging
+import os
+import random
+import select
+import signal
+import socket
+import threading
+import time
+import traceback
+
+import click
+import psycopg2
+from flask import Blueprint, current_app
+from psycopg2.extras import Json
+
+import db
+
+jobs_bp = Blueprint("jobs", __name__)
+
+# Settings, overridable per app through app.config (see Worker.from_app)
+# Jobs run at once by one worker process; keep it within DB_POOL_MAX_SIZE
+JOB_CONCURRENCY = int(os.environ.get("JOB_CONCURRENCY", 4))
+# Seconds an idle worker waits without a notification before looking again,
+# and between checks for abandoned jobs
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", 30))
+# Seconds a job may stay running before it is assumed lost with its worker
+JOB_LOCK_TIMEOUT = float(os.environ.get("JOB_LOCK_TIMEOUT", 600))
+# Seconds failed jobs are kept for inspection, and queued jobs that no
+# worker ever claimed (e.g. none is running) are kept before being dropped
+JOB_FAILED_RETENTION = float(os.environ.get("JOB_FAILED_RETENTION", 7 * 86400))
+JOB_UNCLAIMED_RETENTION = float(os.environ.get("JOB_UNCLAIMED_RETENTION", 86400))
+# Whether creating a task queues a task_created job; off by default, since
+# its handler only logs and the jobs would pile up without a worker
+TASK_CREATED_JOBS = os.environ.get("TASK_CREATED_JOBS", "0") == "1"
+# Runs of a job before it is marked failed
+JOB_MAX_ATTEMPTS = 5
+# Retry delays double from JOB_RETRY_BASE seconds up to JOB_RETRY_MAX
+JOB_RETRY_BASE = 2.0
+JOB_RETRY_MAX = 600.0
+
+# Channel the jobs_notify trigger signals on every insert into jobs
+CHANNEL = "jobs"
+
+# Seconds between prune_jobs() runs by a worker
+_PRUNE_INTERVAL = 3600
+
+logger = logging.getLogger("taskmanager.jobs")
+
+# Job kind -> handler, see job()
+handlers = {}
+
+
+def job(kind):
+    """
+    Register the decorated function as the handler of `kind` jobs.
+
+    Handlers are called with the job payload as keyword arguments, inside an
+    app context. A handler that raises is retried with backoff, so it must be
+    safe to run more than once.
+    """
+
+    def register(fn):
+        handlers[kind] = fn
+        return fn
+
+    return register
+
+
+def enqueue(kind, payload=None, delay=0, max_attempts=JOB_MAX_ATTEMPTS, cursor=None):
+    """
+    Queue a job.
+
+    Args:
+        kind: Registered job kind
+        payload: JSON-serializable dict passed to the handler
+        delay: Seconds before the job may run
+        max_attempts: Runs before the job is marked failed
+        cursor: Cursor from db.get_cursor; the job is then only queued if
+            that cursor's transaction commits
+
+    Returns:
+        Id of the new job
+    """
+    query = """
+        INSERT INTO jobs (kind, payload, run_at, max_attempts)
+        VALUES (%s, %s, now() + make_interval(secs => %s), %s)
+        RETURNING id
+    """
+    params = (kind, Json(payload or {}), delay, max_attempts)
+    if cursor is not None:
+        cursor.execute(query, params)
+        return cursor.fetchone()["id"]
+    return db.execute_update(query, params, prepare=True)[0]["id"]
+
+
+def claim_job(worker_name):
+    """
+    Take the oldest due job, marking it running.
+
+    SKIP LOCKED lets concurrent workers each take a different job without
+    waiting on one another. The claim is committed straight away, so no
+    transaction stays open while the job runs.
+
+    Returns:
+        The job row, or None if no job is due
+    """
+    rows = db.execute_update(
+        """
+        UPDATE jobs
+        SET status = 'running', attempts = attempts + 1,
+            locked_at = now(), locked_by = %s
+        WHERE id = (
+            SELECT id FROM jobs
+            WHERE status = 'queued' AND run_at <= now()
+            ORDER BY run_at, id
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, kind, payload, attempts, max_attempts
+        """,
+        (worker_name,),
+        prepare=True,
+    )
+    return rows[0] if rows else None
+
+
+def retry_delay(attempts, base=JOB_RETRY_BASE, cap=JOB_RETRY_MAX):
+    """Seconds to wait before running a job again after `attempts` runs."""
+    delay = min(cap, base * 2 ** (attempts - 1))
+    # Jitter spreads out retries of jobs that failed together
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def run_job(job):
+    """
+    Run a claimed job and record the outcome.
+
+    A job that succeeds is deleted. One that raises is queued again after
+    retry_delay(), or marked failed once it has used up its attempts.
+    """
+    handler = handlers.get(job["kind"])
+    if handler is None:
+        _fail_job(job, f"No handler for job kind {job['kind']!r}", retry=False)
+        return
+    try:
+        handler(**job["payload"])
+    except Exception:
+        logger.exception("Job %s (%s) failed", job["id"], job["kind"])
+        _fail_job(job, traceback.format_exc(), retry=True)
+        return
+    db.execute_update("DELETE FROM jobs WHERE id = %s", (job["id"],), prepare=True)
+
+
+def _fail_job(job, error, retry):
+    if retry and job["attempts"] < job["max_attempts"]:
+        db.execute_update(
+            """
+            UPDATE jobs
+            SET status = 'queued', run_at = now() + make_interval(secs => %s),
+                last_error = %s, locked_at = NULL, locked_by = NULL
+            WHERE id = %s
+            """,
+            (retry_delay(job["attempts"]), error, job["id"]),
+            prepare=True,
+        )
+    else:
+        db.execute_update(
+            """
+            UPDATE jobs
+            SET status = 'failed', last_error = %s, locked_at = NULL, locked_by = NULL
+            WHERE id = %s
+            """,
+            (error, job["id"]),
+            prepare=True,
+        )
+
+
+def requeue_abandoned(lock_timeout=JOB_LOCK_TIMEOUT):
+    """
+    Queue again the jobs left running longer than `lock_timeout` seconds,
+    e.g. by a worker that was killed. Jobs out of attempts are marked failed.
+
+    Returns:
+        Number of jobs queued again
+    """
+    rows = db.execute_update(
+        """
+        UPDATE jobs
+        SET status = CASE WHEN attempts < max_attempts
+                          THEN 'queued' ELSE 'failed' END,
+            last_error = 'Abandoned by worker ' || locked_by,
+            locked_at = NULL, locked_by = NULL
+        WHERE status = 'running'
+          AND locked_at < now() - make_interval(secs => %s)
+        RETURNING status
+        """,
+        (lock_timeout,),
+    )
+    return sum(1 for row in rows if row["status"] == "queued")
+
+
+def prune_jobs(
+    failed_retention=JOB_FAILED_RETENTION, unclaimed_retention=JOB_UNCLAIMED_RETENTION
+):
+    """
+    Delete failed jobs older than `failed_retention` seconds, and queued jobs
+    never claimed within `unclaimed_retention` seconds of falling due.
+
+    Returns:
+        Number of jobs deleted
+    """
+    rows = db.execute_update(
+        """
+        DELETE FROM jobs
+        WHERE (status = 'failed'
+               AND run_at < now() - make_interval(secs => %s))
+           OR (status = 'queued' AND attempts = 0
+               AND run_at < now() - make_interval(secs => %s))
+        RETURNING id
+        """,
+        (failed_retention, unclaimed_retention),
+    )
+    return len(rows)
+
+
+def seconds_until_next_job():
+    """Seconds until the next queued job is due, or None if none is queued."""
+    rows = db.execute_query(
+        """
+        SELECT EXTRACT(EPOCH FROM min(run_at) - now()) AS wait
+        FROM jobs WHERE status = 'queued'
+        """,
+        prepare=True,
+        primary=True,
+    )
+    wait = rows[0]["wait"] if rows else None
+    return None if wait is None else float(wait)
+
+
+def job_counts():
+    """Return {(kind, status): count} over the jobs table."""
+    rows = db.execute_query(
+        "SELECT kind, status, count(*) AS jobs FROM jobs GROUP BY kind, status"
+    )
+    return {(row["kind"], row["status"]): row["jobs"] for row in rows}
+
+
+class Worker:
+    """
+    Runs queued jobs on a fixed number of threads.
+
+    Idle threads sleep until a NOTIFY on CHANNEL, the due time of the next
+    delayed job or the poll interval, whichever comes first, so new jobs
+    start without polling the table. One extra connection, held by the
+    thread calling run(), listens for the notifications.
+    """
+
+    def __init__(
+        self,
+        app,
+        concurrency=JOB_CONCURRENCY,
+        poll_interval=JOB_POLL_INTERVAL,
+        lock_timeout=JOB_LOCK_TIMEOUT,
+        failed_retention=JOB_FAILED_RETENTION,
+        unclaimed_retention=JOB_UNCLAIMED_RETENTION,
+    ):
+        self.app = app
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lock_timeout = lock_timeout
+        self.failed_retention = failed_retention
+        self.unclaimed_retention = unclaimed_retention
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self._stopping = threading.Event()
+        self._wakeup = threading.Condition()
+        # Bumped on every wake-up, so a thread that finds the queue empty
+        # can tell whether it missed a notification before it went to sleep
+        self._generation = 0
+
+    @classmethod
+    def from_app(cls, app, **overrides):
+        """
+        Build a worker from app.config.
+
+        Recognised keys are JOB_CONCURRENCY, JOB_POLL_INTERVAL,
+        JOB_LOCK_TIMEOUT, JOB_FAILED_RETENTION and JOB_UNCLAIMED_RETENTION;
+        non-None `overrides` win over both.
+        """
+        settings = {
+            "concurrency": app.config.get("JOB_CONCURRENCY", JOB_CONCURRENCY),
+            "poll_interval": app.config.get("JOB_POLL_INTERVAL", JOB_POLL_INTERVAL),
+            "lock_timeout": app.config.get("JOB_LOCK_TIMEOUT", JOB_LOCK_TIMEOUT),
+            "failed_retention": app.config.get(
+                "JOB_FAILED_RETENTION", JOB_FAILED_RETENTION
+            ),
+            "unclaimed_retention": app.config.get(
+                "JOB_UNCLAIMED_RETENTION", JOB_UNCLAIMED_RETENTION
+            ),
+        }
+        settings.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(app, **settings)
+
+    def run(self):
+        """Run jobs until stop() is called."""
+        threads = [
+            threading.Thread(target=self._work, name=f"job-worker-{n}", daemon=True)
+            for n in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            self._listen()
+        finally:
+            self.stop()
+            # Jobs in progress are allowed to finish
+            for thread in threads:
+                thread.join()
+
+    def stop(self):
+        """Ask the worker to stop once the jobs in progress finish."""
+        self._stopping.set()
+        self.wake()
+
+    def wake(self):
+        """Wake idle threads to look for due jobs."""
+        with self._wakeup:
+            self._generation += 1
+            self._wakeup.notify_all()
+
+    def _work(self):
+        with self.app.app_context():
+            while not self._stopping.is_set():
+                generation = self._generation
+                try:
+                    job = claim_job(self.name)
+                    if job is not None:
+                        run_job(job)
+                        continue
+                    wait = seconds_until_next_job()
+                except psycopg2.Error:
+                    logger.exception("Job worker database error")
+                    wait = None
+                timeout = self.poll_interval
+                if wait is not None:
+                    timeout = min(max(wait, 0), timeout)
+                with self._wakeup:
+                    if self._generation == generation:
+                        self._wakeup.wait(timeout)
+
+    def _listen(self):
+        while not self._stopping.is_set():
+            conn = None
+            try:
+                conn = db.get_connection()
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CHANNEL}")
+                # Catch up on jobs queued while nobody was listening
+                self.wake()
+                self._wait_for_notifications(conn)
+            except psycopg2.Error:
+                logger.exception("Job notification connection failed")
+                self._stopping.wait(1)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def _wait_for_notifications(self, conn):
+        next_check = next_prune = time.monotonic()
+        while not self._stopping.is_set():
+            now = time.monotonic()
+            if now >= next_check:
+                self._requeue_abandoned()
+                next_check = now + self.poll_interval
+            if now >= next_prune:
+                self._prune()
+                next_prune = now + _PRUNE_INTERVAL
+            # Short timeouts so stop() is noticed promptly
+            timeout = min(next_check - now, 1.0)
+            if select.select([conn], [], [], timeout)[0]:
+                conn.poll()
+                if conn.notifies:
+                    conn.notifies.clear()
+                    self.wake()
+
+    def _requeue_abandoned(self):
+        try:
+            if requeue_abandoned(self.lock_timeout):
+                self.wake()
+        except psycopg2.Error:
+            logger.exception("Could not requeue abandoned jobs")
+
+    def _prune(self):
+        try:
+            pruned = prune_jobs(self.failed_retention, self.unclaimed_retention)
+        except psycopg2.Error:
+            logger.exception("Could not prune old jobs")
+            return
+        if pruned:
+            logger.info("Pruned %s old jobs", pruned)
+
+
+@job("task_created")
+def task_created(task_id, user_id):
+    """Follow-up work for a new task, queued by its INSERT (TASK_CREATED_JOBS)."""
+    # Notifications, reminders and reindexing of new tasks hook in here
+    logger.info("Task %s created by user %s", task_id, user_id)
+
+
+@jobs_bp.cli.command("work")
+@click.option("--concurrency", "-c", type=int, default=None, help="Job threads.")
+def work_command(concurrency):
+    """Run queued jobs until interrupted."""
+    worker = Worker.from_app(current_app._get_current_object(), concurrency=concurrency)
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    click.echo(f"Worker {worker.name} running {worker.concurrency} job threads")
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        pass
+    click.echo("Worker stopped")
+
+
+@jobs_bp.cli.command("status")
+def status_command():
+    """Show job counts by kind and status."""
+    counts = job_counts()
+    if not counts:
+        click.echo("No jobs")
+    for (kind, status), count in sorted(counts.items()):
+        click.echo(f"{kind:<30} {status:<10} {count}")
+
+
+@jobs_bp.cli.command("prune")
+def prune_command():
+    """Delete old failed jobs and queued jobs no worker claimed."""
+    pruned = prune_jobs(
+        current_app.config.get("JOB_FAILED_RETENTION", JOB_FAILED_RETENTION),
+        current_app.config.get("JOB_UNCLAIMED_RETENTION", JOB_UNCLAIMED_RETENTION),
+    )
+    click.echo(f"Pruned {pruned} jobs")
@@ -0,0 +1,261 @@
+"""Live task change events, fanned out from one shared LISTEN connection."""
+
+import json
+import logging
+import os
+import queue
+import select
+import threading
+
+import psycopg2
+
+import db
+
+# Settings, overridable per app through app.config (see init_app)
+# Off by default: every open stream holds a server thread for as long as the
+# page stays open
+LIVE_UPDATES_ENABLED = os.environ.get("LIVE_UPDATES_ENABLED", "0") == "1"
+# Open streams allowed per process; further clients get a 503
+LIVE_MAX_SUBSCRIBERS = int(os.environ.get("LIVE_MAX_SUBSCRIBERS", 50))
+# Seconds between keep-alive comments on an idle event stream
+LIVE_HEARTBEAT = float(os.environ.get("LIVE_HEARTBEAT", 15))
+# Events buffered per subscriber; a client that falls further behind gets a
+# single "reload" event instead
+LIVE_QUEUE_SIZE = int(os.environ.get("LIVE_QUEUE_SIZE", 100))
+
+# Channel the tasks_notify_* triggers signal on
+CHANNEL = "tasks_changed"
+
+# Sent when a subscriber may have missed events and should reload
+RELOAD = {"op": "reload"}
+
+# Seconds a client turned away at LIVE_MAX_SUBSCRIBERS is asked to wait
+RETRY_AFTER = 30
+
+_enabled = LIVE_UPDATES_ENABLED
+
+logger = logging.getLogger("taskmanager.live")
+
+
+class HubFull(Exception):
+    """Raised when a process already serves LIVE_MAX_SUBSCRIBERS streams."""
+
+
+class Subscription:
+    """One client's queue of change events."""
+
+    def __init__(self, hub, user_id, queue_size):
+        self.hub = hub
+        self.user_id = user_id
+        self._events = queue.Queue(maxsize=queue_size)
+        self._overflowed = False
+
+    def get(self, timeout=None):
+        """
+        Wait for the next event.
+
+        Returns:
+            Event dict, or None if nothing arrived within `timeout` seconds
+        """
+        if self._overflowed:
+            # Drain what is left; the client reloads and needs none of it
+            self._overflowed = False
+            while not self._events.empty():
+                self._events.get_nowait()
+            return RELOAD
+        try:
+            return self._events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def put(self, event):
+        try:
+            self._events.put_nowait(event)
+        except queue.Full:
+            self._overflowed = True
+
+    def close(self):
+        """Stop receiving events."""
+        self.hub.unsubscribe(self)
+
+
+class TaskChangeHub:
+    """
+    Fans out tasks_changed notifications to the subscribed clients.
+
+    A single connection, held by a background thread started on the first
+    subscription, LISTENs on CHANNEL and hands each notification to the
+    subscriptions of the task owner, so any number of watching clients cost
+    one database connection and no queries. At most `max_subscribers`
+    subscriptions are open at once.
+    """
+
+    def __init__(
+        self, queue_size=LIVE_QUEUE_SIZE, max_subscribers=LIVE_MAX_SUBSCRIBERS
+    ):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+        self._count = 0
+        self._rejected = 0
+        self._thread = None
+        self._stopping = threading.Event()
+        self._notifications = 0
+
+    def subscribe(self, user_id):
+        """
+        Return a Subscription to the changes of `user_id`'s tasks.
+
+        Raises:
+            HubFull: `max_subscribers` subscriptions are already open
+        """
+        subscription = Subscription(self, user_id, self.queue_size)
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                self._rejected += 1
+                raise HubFull()
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+            self._count += 1
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._listen, name="live-listener", daemon=True
+                )
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None and subscription in subscriptions:
+                subscriptions.discard(subscription)
+                self._count -= 1
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def stats(self):
+        """Return subscriber and notification counts."""
+        with self._lock:
+            return {
+                "users": len(self._subscriptions),
+                "subscribers": self._count,
+                "rejected": self._rejected,
+                "notifications": self._notifications,
+                "listening": self._thread is not None,
+            }
+
+    def stop(self):
+        self._stopping.set()
+
+    def dispatch(self, payload):
+        """Hand one notification payload to the owner's subscriptions."""
+        try:
+            event = json.loads(payload)
+            user_id = event.pop("user_id")
+        except (ValueError, TypeError, KeyError):
+            logger.warning("Ignoring malformed %s payload %r", CHANNEL, payload)
+            return
+        with self._lock:
+            self._notifications += 1
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    def _broadcast(self, event):
+        with self._lock:
+            subscriptions = [s for group in self._subscriptions.values() for s in group]
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    def _listen(self):
+        reconnecting = False
+        while not self._stopping.is_set():
+            conn = None
+            try:
+                # LISTEN needs a session of its own, outside the pool
+                conn = db.get_connection()
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CHANNEL}")
+                if reconnecting:
+                    # Changes made while the connection was down are lost
+                    self._broadcast(RELOAD)
+                reconnecting = True
+                self._wait_for_notifications(conn)
+            except psycopg2.Error:
+                logger.exception("Live task listener connection failed")
+                reconnecting = True
+                self._stopping.wait(1)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def _wait_for_notifications(self, conn):
+        while not self._stopping.is_set():
+            if select.select([conn], [], [], 1.0)[0]:
+                conn.poll()
+                while conn.notifies:
+                    self.dispatch(conn.notifies.pop(0).payload)
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub():
+    """Return the process-wide TaskChangeHub, creating it on first use."""
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                _hub = TaskChangeHub()
+    return _hub
+
+
+def enabled():
+    """Whether live updates are on (LIVE_UPDATES_ENABLED)."""
+    return _enabled
+
+
+def format_event(event):
+    """Encode an event as a Server-Sent Events message."""
+    return f"event: {event['op']}\ndata: {json.dumps(event)}\n\n"
+
+
+def event_stream(subscription, heartbeat=LIVE_HEARTBEAT):
+    """
+    Yield the events of `subscription` as Server-Sent Events, with a
+    keep-alive comment every `heartbeat` idle seconds.
+
+    The subscription is closed when the generator is closed (the client
+    went away).
+    """
+    try:
+        # Reconnect after 5s if the stream drops
+        yield "retry: 5000\n\n"
+        while True:
+            event = subscription.get(timeout=heartbeat)
+            yield ": keep-alive\n\n" if event is None else format_event(event)
+    finally:
+        subscription.close()
+
+
+def init_app(app):
+    """
+    Configure the live event hub for `app`.
+
+    Recognised keys are LIVE_UPDATES_ENABLED, LIVE_HEARTBEAT,
+    LIVE_QUEUE_SIZE and LIVE_MAX_SUBSCRIBERS.
+    """
+    global _hub, _enabled
+    _enabled = app.config.get("LIVE_UPDATES_ENABLED", LIVE_UPDATES_ENABLED)
+    hub = TaskChangeHub(
+        queue_size=app.config.get("LIVE_QUEUE_SIZE", LIVE_QUEUE_SIZE),
+        max_subscribers=app.config.get("LIVE_MAX_SUBSCRIBERS", LIVE_MAX_SUBSCRIBERS),
+    )
+    with _hub_lock:
+        previous, _hub = _hub, hub
+    if previous is not None:
+        previous.stop()
+    app.jinja_env.globals["live_updates_enabled"] = enabled
+    app.extensions["live"] = hub
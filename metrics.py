@@ -0,0 +1,432 @@
+"""Request, database and template metrics in Prometheus text format."""
+
+import atexit
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import (
+    Blueprint,
+    Response,
+    before_render_template,
+    g,
+    has_request_context,
+    request,
+    template_rendered,
+)
+
+import instrumentation
+
+# Directory shared by all worker processes; each one writes its samples there
+# and /metrics sums them. Unset means single-process mode.
+METRICS_DIR = os.environ.get("METRICS_DIR")
+# Minimum seconds between two snapshots written by the same process
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", 1))
+# Seconds after its last write that an earlier run's snapshot is deleted;
+# long enough for the old master of a zero-downtime restart to drain
+_STALE_RUN_AGE = 3600
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS = {
+    "http_requests_total": ("counter", "HTTP requests by endpoint, method and status"),
+    "http_request_errors_total": ("counter", "HTTP responses with status >= 400"),
+    "http_request_duration_seconds": ("histogram", "HTTP request latency"),
+    "db_query_duration_seconds": ("histogram", "Database statement latency"),
+    "db_pool_acquire_seconds": ("histogram", "Connection pool checkout time"),
+    "db_prepared_statements_total": (
+        "counter",
+        "Prepared statement runs by event (prepare or execute)",
+    ),
+    "db_write_batches_total": ("counter", "Batched insert statements by batcher"),
+    "db_write_batch_rows_total": ("counter", "Rows inserted by batched statements"),
+    "template_render_seconds": ("histogram", "Template render time"),
+    "template_fragments_total": (
+        "counter",
+        "Cached fragment lookups by template and result (hit or miss)",
+    ),
+    "template_fragment_render_seconds": (
+        "histogram",
+        "Render time of fragments missing from the cache",
+    ),
+}
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+class Registry:
+    """
+    Counters and histograms sharded per thread.
+
+    Each thread writes only to its own shard, so recording a sample takes no
+    lock; the shard list is locked only when a thread records its first
+    sample and when samples are collected. Shards of threads that have
+    exited are folded into one at both points, so thread-per-request
+    servers don't grow the list forever even if nobody scrapes.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []
+        self._retired = ({}, {})
+
+    def inc(self, name, labels=(), amount=1):
+        """Add `amount` to the counter `name` with `labels` (name/value pairs)."""
+        counters = self._shard()[0]
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        """Record `value` in the histogram `name` with `labels`."""
+        histograms = self._shard()[1]
+        key = (name, labels)
+        histogram = histograms.get(key)
+        if histogram is None:
+            # Per-bucket counts (last one is +Inf), then sum
+            histogram = histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        histogram[bisect_left(self.buckets, value)] += 1
+        histogram[-1] += value
+
+    def collect(self):
+        """
+        Return merged samples of every thread.
+
+        Returns:
+            (counters, histograms) tuple of dicts keyed by (name, labels)
+        """
+        with self._lock:
+            self._retire_dead_shards()
+            merged = ({}, {})
+            _merge(merged, self._retired)
+            for _, shard in self._shards:
+                _merge(merged, shard)
+        return merged
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = ({}, {})
+            with self._lock:
+                self._retire_dead_shards()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _retire_dead_shards(self):
+        # Called with the lock held
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                _merge(self._retired, shard)
+        self._shards = alive
+
+
+def _merge(target, source):
+    counters, histograms = target
+    # Copy first; the owning thread may be adding keys concurrently
+    for key, value in list(source[0].items()):
+        counters[key] = counters.get(key, 0) + value
+    for key, values in list(source[1].items()):
+        if key in histograms:
+            histograms[key] = [a + b for a, b in zip(histograms[key], values)]
+        else:
+            histograms[key] = list(values)
+
+
+registry = Registry()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def render(counters, histograms, buckets=LATENCY_BUCKETS):
+    """Render merged samples in the Prometheus text exposition format."""
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "counter":
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+            continue
+        for (metric, labels), values in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip((*buckets, "+Inf"), values):
+                cumulative += count
+                bucket_labels = _format_labels((*labels, ("le", bound)))
+                lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {values[-1]}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+class _ProcessStore:
+    """
+    Snapshot files written by each worker process into METRICS_DIR.
+
+    Files are named after the run, i.e. the parent (master) process of the
+    workers, as well as the worker. Only the current run's files are summed,
+    so counts left by an earlier start of the server are never added in;
+    other runs' files are deleted once they have not been written for
+    _STALE_RUN_AGE seconds. Snapshots of exited workers are folded into the
+    run's "retired" file, so recycling workers (e.g. gunicorn's
+    max_requests) doesn't add a file per worker ever started.
+    """
+
+    def __init__(self, directory, flush_interval=METRICS_FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._last_flush = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def maybe_flush(self):
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        self._write(self._path(os.getpid()), registry.collect())
+
+    def collect(self):
+        """Sum the snapshots of this run's processes, including exited ones."""
+        merged = ({}, {})
+        run_prefix = f"metrics-{_run_id()}-"
+        # Exclusive so no other worker folds a snapshot while it is summed
+        with open(self._path("retired") + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._retire_exited()
+            for path in glob.glob(os.path.join(self.directory, "metrics-*")):
+                if not os.path.basename(path).startswith(run_prefix):
+                    self._remove_if_stale(path)
+                    continue
+                if not path.endswith(".json"):
+                    continue
+                samples = self._read(path)
+                if samples is not None:
+                    _merge(merged, samples)
+        return merged
+
+    def _retire_exited(self):
+        # Called with the run's lock held
+        retired_path = self._path("retired")
+        retired = None
+        folded = []
+        for path in glob.glob(self._path("*")):
+            if not _has_exited(path):
+                continue
+            samples = self._read(path)
+            if samples is None:
+                continue
+            if retired is None:
+                retired = self._read(retired_path) or ({}, {})
+            _merge(retired, samples)
+            folded.append(path)
+        if not folded:
+            return
+        self._write(retired_path, retired)
+        for path in folded:
+            os.remove(path)
+
+    def _path(self, worker):
+        return os.path.join(self.directory, f"metrics-{_run_id()}-{worker}.json")
+
+    def _read(self, path):
+        try:
+            with open(path) as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return (
+            {_key(n, labels): v for n, labels, v in payload["counters"]},
+            {_key(n, labels): v for n, labels, v in payload["histograms"]},
+        )
+
+    def _write(self, path, samples):
+        counters, histograms = samples
+        payload = {
+            "counters": [[n, labels, v] for (n, labels), v in counters.items()],
+            "histograms": [[n, labels, v] for (n, labels), v in histograms.items()],
+        }
+        # Write then rename so readers never see a partial file
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+
+    def _remove_if_stale(self, path):
+        try:
+            if time.time() - os.path.getmtime(path) >= _STALE_RUN_AGE:
+                os.remove(path)
+        except OSError:
+            # Removed by another worker first
+            pass
+
+
+def _has_exited(path):
+    # "metrics-{run}-{pid}.json"; the retired file has no pid
+    worker = os.path.basename(path)[: -len(".json")].rsplit("-", 1)[-1]
+    if not worker.isdigit() or int(worker) == os.getpid():
+        return False
+    try:
+        os.kill(int(worker), 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        # Alive, but owned by another user
+        pass
+    return False
+
+
+def _run_id():
+    # Workers of a pre-forking server share their master's pid; a restart
+    # of the server gets a new master and so a new run
+    return os.getppid()
+
+
+def _key(name, labels):
+    return name, tuple(tuple(pair) for pair in labels)
+
+
+_store = None
+
+
+def collect():
+    """Return merged samples of this process, or of all of them with METRICS_DIR."""
+    if _store is None:
+        return registry.collect()
+    _store.flush()
+    return _store.collect()
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """Expose metrics in the Prometheus text format."""
+    return Response(render(*collect()), content_type="text/plain; version=0.0.4")
+
+
+def _endpoint_label():
+    # Unmatched URLs share one label so probes can't blow up cardinality
+    if has_request_context():
+        return request.endpoint or "unmatched"
+    return "none"
+
+
+def _start_request():
+    g.metrics_started = time.perf_counter()
+
+
+def _record_request(response):
+    started = g.pop("metrics_started", None)
+    if started is None:
+        return response
+    endpoint = _endpoint_label()
+    status = response.status_code
+    registry.inc(
+        "http_requests_total",
+        (("endpoint", endpoint), ("method", request.method), ("status", status)),
+    )
+    if status >= 400:
+        registry.inc("http_request_errors_total", (("status", status),))
+    registry.observe(
+        "http_request_duration_seconds",
+        (("endpoint", endpoint),),
+        time.perf_counter() - started,
+    )
+    if _store is not None:
+        _store.maybe_flush()
+    return response
+
+
+def _record_query(sql, duration, rows):
+    registry.observe(
+        "db_query_duration_seconds", (("endpoint", _endpoint_label()),), duration
+    )
+
+
+def _record_acquire(duration):
+    registry.observe("db_pool_acquire_seconds", (), duration)
+
+
+def _record_statement(event):
+    registry.inc("db_prepared_statements_total", (("event", event),))
+
+
+def _record_batch(name, rows):
+    labels = (("batcher", name),)
+    registry.inc("db_write_batches_total", labels)
+    registry.inc("db_write_batch_rows_total", labels, rows)
+
+
+def _record_fragment(template, hit, duration):
+    labels = (("template", template),)
+    registry.inc(
+        "template_fragments_total", (*labels, ("result", "hit" if hit else "miss"))
+    )
+    if duration is not None:
+        registry.observe("template_fragment_render_seconds", labels, duration)
+
+
+def _start_render(sender, template, context, **extra):
+    if has_request_context():
+        g.setdefault("metrics_render_started", []).append(time.perf_counter())
+
+
+def _finish_render(sender, template, context, **extra):
+    if has_request_context() and g.get("metrics_render_started"):
+        started = g.metrics_render_started.pop()
+        registry.observe(
+            "template_render_seconds",
+            (("template", template.name),),
+            time.perf_counter() - started,
+        )
+
+
+def init_app(app):
+    """
+    Record request, database and template metrics for `app`.
+
+    Recognised keys are METRICS_DIR (enables multi-process aggregation for
+    pre-forking servers such as gunicorn) and METRICS_FLUSH_INTERVAL.
+    """
+    global _store
+    directory = app.config.get("METRICS_DIR", METRICS_DIR)
+    if directory:
+        _store = _ProcessStore(
+            directory, app.config.get("METRICS_FLUSH_INTERVAL", METRICS_FLUSH_INTERVAL)
+        )
+        atexit.register(_store.flush)
+    else:
+        _store = None
+
+    app.before_request(_start_request)
+    app.after_request(_record_request)
+    before_render_template.connect(_start_render, app)
+    template_rendered.connect(_finish_render, app)
+    if _record_query not in instrumentation.query_listeners:
+        instrumentation.query_listeners.append(_record_query)
+    if _record_acquire not in instrumentation.acquire_listeners:
+        instrumentation.acquire_listeners.append(_record_acquire)
+    if _record_statement not in instrumentation.statement_listeners:
+        instrumentation.statement_listeners.append(_record_statement)
+    if _record_fragment not in instrumentation.fragment_listeners:
+        instrumentation.fragment_listeners.append(_record_fragment)
+    if _record_batch not in instrumentation.batch_listeners:
+        instrumentation.batch_listeners.append(_record_batch)
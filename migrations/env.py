@@ -9,6 +9,11 @@ from alembic import context
 # access to the values within the .ini file in use.
 config = context.config
 
+# `alembic -x db_url=...` migrates another database (e.g. the benchmark one)
+db_url = context.get_x_argument(as_dictionary=True).get("db_url")
+if db_url:
+    config.set_main_option("sqlalchemy.url", db_url)
+
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
 if config.config_file_name is not None:
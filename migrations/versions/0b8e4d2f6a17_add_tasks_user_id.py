@@ -0,0 +1,85 @@
+"""add tasks user_id
+
+Revision ID: 0b8e4d2f6a17
+Revises: f1c3a7e9d5b2
+Create Date: 2026-10-17 19:03:47.551920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b8e4d2f6a17'
+down_revision: Union[str, Sequence[str], None] = 'f1c3a7e9d5b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable because existing tasks have no owner; every task query is
+    # scoped to the logged-in user, so unowned tasks are simply not listed.
+    op.add_column(
+        'tasks',
+        sa.Column(
+            'user_id',
+            sa.Integer,
+            sa.ForeignKey('users.id', ondelete='CASCADE'),
+            nullable=True,
+        ),
+    )
+    # Every list query is now "WHERE user_id = ? ... ORDER BY <col>, id", so
+    # the per-sort indexes lead with user_id: a page touches only the
+    # caller's rows. This one also serves the FK lookups of ON DELETE CASCADE.
+    op.execute(
+        "CREATE INDEX ix_tasks_user_id_created_at_id "
+        "ON tasks (user_id, created_at DESC, id DESC)"
+    )
+    op.create_index(
+        'ix_tasks_user_id_updated_at_id', 'tasks', ['user_id', 'updated_at', 'id']
+    )
+    op.create_index('ix_tasks_user_id_title_id', 'tasks', ['user_id', 'title', 'id'])
+    op.create_index(
+        'ix_tasks_user_id_open_created_at_id',
+        'tasks',
+        ['user_id', 'created_at', 'id'],
+        postgresql_where=sa.text('completed_at IS NULL'),
+    )
+    op.create_index(
+        'ix_tasks_user_id_completed_created_at_id',
+        'tasks',
+        ['user_id', 'created_at', 'id'],
+        postgresql_where=sa.text('completed_at IS NOT NULL'),
+    )
+    # Superseded by the user-scoped indexes above
+    op.drop_index('ix_tasks_completed_created_at_id', table_name='tasks')
+    op.drop_index('ix_tasks_open_created_at_id', table_name='tasks')
+    op.drop_index('ix_tasks_title_id', table_name='tasks')
+    op.drop_index('ix_tasks_updated_at_id', table_name='tasks')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_tasks_updated_at_id', 'tasks', ['updated_at', 'id'])
+    op.create_index('ix_tasks_title_id', 'tasks', ['title', 'id'])
+    op.create_index(
+        'ix_tasks_open_created_at_id',
+        'tasks',
+        ['created_at', 'id'],
+        postgresql_where=sa.text('completed_at IS NULL'),
+    )
+    op.create_index(
+        'ix_tasks_completed_created_at_id',
+        'tasks',
+        ['created_at', 'id'],
+        postgresql_where=sa.text('completed_at IS NOT NULL'),
+    )
+    op.drop_index('ix_tasks_user_id_completed_created_at_id', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_open_created_at_id', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_title_id', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_updated_at_id', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_created_at_id', table_name='tasks')
+    op.drop_column('tasks', 'user_id')
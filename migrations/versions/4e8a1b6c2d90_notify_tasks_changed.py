@@ -0,0 +1,67 @@
+"""notify tasks changed
+
+Revision ID: 4e8a1b6c2d90
+Revises: 9d4c2a7e1f35
+Create Date: 2026-10-17 17:22:48.103556
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e8a1b6c2d90'
+down_revision: Union[str, Sequence[str], None] = '9d4c2a7e1f35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+OPERATIONS = ('insert', 'update', 'delete')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Feeds the live task stream (live.py). Statement-level with transition
+    # tables, so a bulk COPY sends one notification per owner instead of one
+    # per row. Ids are only listed for small changes; NOTIFY payloads are
+    # capped at 8000 bytes and a large import is better reloaded anyway.
+    op.execute(
+        """
+        CREATE FUNCTION notify_tasks_changed() RETURNS trigger AS $$
+        DECLARE
+            change record;
+        BEGIN
+            FOR change IN
+                SELECT user_id, count(*) AS total, array_agg(id ORDER BY id) AS ids
+                FROM changed
+                WHERE user_id IS NOT NULL
+                GROUP BY user_id
+            LOOP
+                PERFORM pg_notify('tasks_changed', json_build_object(
+                    'op', lower(TG_OP),
+                    'user_id', change.user_id,
+                    'ids', CASE WHEN change.total <= 50 THEN change.ids END
+                )::text);
+            END LOOP;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for operation in OPERATIONS:
+        table = 'OLD' if operation == 'delete' else 'NEW'
+        op.execute(
+            f"""
+            CREATE TRIGGER tasks_notify_{operation}
+            AFTER {operation.upper()} ON tasks
+            REFERENCING {table} TABLE AS changed
+            FOR EACH STATEMENT EXECUTE FUNCTION notify_tasks_changed()
+            """
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for operation in OPERATIONS:
+        op.execute(f"DROP TRIGGER tasks_notify_{operation} ON tasks")
+    op.execute("DROP FUNCTION notify_tasks_changed()")
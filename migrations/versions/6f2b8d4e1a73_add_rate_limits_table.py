@@ -0,0 +1,40 @@
+"""add rate limits table
+
+Revision ID: 6f2b8d4e1a73
+Revises: 4e8a1b6c2d90
+Create Date: 2026-10-17 19:41:06.215874
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6f2b8d4e1a73'
+down_revision: Union[str, Sequence[str], None] = '4e8a1b6c2d90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Token buckets shared by every worker when RATE_LIMIT_BACKEND=postgres
+    # (see ratelimit.py). Unlogged: every limited request writes a row, and
+    # losing the buckets in a crash only resets them to full.
+    op.create_table(
+        'rate_limits',
+        sa.Column('key', sa.String(255), primary_key=True),
+        sa.Column('tokens', sa.Float, nullable=False),
+        sa.Column('allowed', sa.Boolean, nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        prefixes=['UNLOGGED'],
+    )
+    op.create_index('ix_rate_limits_updated_at', 'rate_limits', ['updated_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_rate_limits_updated_at', table_name='rate_limits')
+    op.drop_table('rate_limits')
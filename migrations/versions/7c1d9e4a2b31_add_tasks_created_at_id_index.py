@@ -0,0 +1,35 @@
+"""add tasks created_at id index
+
+Revision ID: 7c1d9e4a2b31
+Revises: 2af04ce18000
+Create Date: 2026-10-17 09:12:05.318442
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1d9e4a2b31'
+down_revision: Union[str, Sequence[str], None] = '2af04ce18000'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keyset pagination compares (created_at, id) row values; a NULL
+    # created_at would silently drop rows from every page but the first.
+    op.execute("UPDATE tasks SET created_at = now() WHERE created_at IS NULL")
+    op.alter_column('tasks', 'created_at', existing_type=sa.DateTime, nullable=False)
+    # Serves ORDER BY created_at DESC, id DESC (scanned backwards) and the
+    # (created_at, id) < (...) seek used for each page.
+    op.create_index('ix_tasks_created_at_id', 'tasks', ['created_at', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_created_at_id', table_name='tasks')
+    op.alter_column('tasks', 'created_at', existing_type=sa.DateTime, nullable=True)
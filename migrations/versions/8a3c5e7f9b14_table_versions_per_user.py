@@ -0,0 +1,130 @@
+"""table versions per user
+
+Revision ID: 8a3c5e7f9b14
+Revises: 6f2b8d4e1a73
+Create Date: 2026-10-18 09:12:44.530219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a3c5e7f9b14'
+down_revision: Union[str, Sequence[str], None] = '6f2b8d4e1a73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Transition tables of each per-row-owner trigger; a trigger with
+# transition tables can only fire on one event
+OPERATIONS = {
+    'insert': 'NEW TABLE AS new_rows',
+    'update': 'OLD TABLE AS old_rows NEW TABLE AS new_rows',
+    'delete': 'OLD TABLE AS old_rows',
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # One version per (table, owner) instead of one per table: writers of
+    # different users no longer queue on a single row lock, and a write
+    # only changes its owner's ETag. No foreign key to users, so the
+    # cascade from deleting a user can still bump the version.
+    op.execute("DROP TRIGGER tasks_bump_version ON tasks")
+    op.execute("DELETE FROM table_versions")
+    op.add_column(
+        'table_versions', sa.Column('user_id', sa.Integer, nullable=False)
+    )
+    op.drop_constraint('table_versions_pkey', 'table_versions', type_='primary')
+    op.create_primary_key(
+        'table_versions_pkey', 'table_versions', ['table_name', 'user_id']
+    )
+    op.execute(
+        "INSERT INTO table_versions (table_name, user_id) "
+        "SELECT 'tasks', id FROM users"
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+        DECLARE
+            owners integer[];
+        BEGIN
+            IF TG_OP = 'TRUNCATE' THEN
+                UPDATE table_versions
+                SET version = version + 1, updated_at = clock_timestamp()
+                WHERE table_name = TG_TABLE_NAME;
+                RETURN NULL;
+            ELSIF TG_OP = 'INSERT' THEN
+                SELECT array_agg(DISTINCT user_id) INTO owners FROM new_rows;
+            ELSIF TG_OP = 'DELETE' THEN
+                SELECT array_agg(DISTINCT user_id) INTO owners FROM old_rows;
+            ELSE
+                SELECT array_agg(DISTINCT user_id) INTO owners
+                FROM (
+                    SELECT user_id FROM new_rows
+                    UNION SELECT user_id FROM old_rows
+                ) AS changed;
+            END IF;
+            -- Owners in id order, so statements touching several owners
+            -- lock their rows in the same order and can't deadlock
+            INSERT INTO table_versions AS tracked
+                (table_name, user_id, version, updated_at)
+            SELECT TG_TABLE_NAME, owner_id, 1, clock_timestamp()
+            FROM unnest(owners) AS owner_id
+            WHERE owner_id IS NOT NULL
+            ORDER BY owner_id
+            ON CONFLICT (table_name, user_id) DO UPDATE
+            SET version = tracked.version + 1, updated_at = EXCLUDED.updated_at;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for operation, tables in OPERATIONS.items():
+        op.execute(
+            f"""
+            CREATE TRIGGER tasks_bump_version_{operation}
+            AFTER {operation.upper()} ON tasks
+            REFERENCING {tables}
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()
+            """
+        )
+    op.execute(
+        """
+        CREATE TRIGGER tasks_bump_version_truncate
+        AFTER TRUNCATE ON tasks
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for operation in (*OPERATIONS, 'truncate'):
+        op.execute(f"DROP TRIGGER tasks_bump_version_{operation} ON tasks")
+    op.execute("DELETE FROM table_versions")
+    op.drop_constraint('table_versions_pkey', 'table_versions', type_='primary')
+    op.drop_column('table_versions', 'user_id')
+    op.create_primary_key('table_versions_pkey', 'table_versions', ['table_name'])
+    op.execute("INSERT INTO table_versions (table_name) VALUES ('tasks')")
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE table_versions
+            SET version = version + 1, updated_at = clock_timestamp()
+            WHERE table_name = TG_TABLE_NAME;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER tasks_bump_version
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON tasks
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()
+        """
+    )
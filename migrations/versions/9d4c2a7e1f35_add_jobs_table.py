@@ -0,0 +1,94 @@
+"""add jobs table
+
+Revision ID: 9d4c2a7e1f35
+Revises: 0b8e4d2f6a17
+Create Date: 2026-10-17 16:05:12.481930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4c2a7e1f35'
+down_revision: Union[str, Sequence[str], None] = '0b8e4d2f6a17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Deferred work for jobs.py. Finished jobs are deleted, so the table only
+    # holds queued, running and failed ones.
+    op.create_table(
+        'jobs',
+        sa.Column('id', sa.BigInteger, primary_key=True, autoincrement=True),
+        sa.Column('kind', sa.String(100), nullable=False),
+        sa.Column(
+            'payload',
+            postgresql.JSONB,
+            nullable=False,
+            server_default=sa.text("'{}'::jsonb"),
+        ),
+        sa.Column(
+            'status', sa.String(20), nullable=False, server_default='queued'
+        ),
+        sa.Column('attempts', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('max_attempts', sa.Integer, nullable=False, server_default='5'),
+        sa.Column(
+            'run_at',
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.func.now(),
+        ),
+        sa.Column('locked_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('locked_by', sa.String(100), nullable=True),
+        sa.Column('last_error', sa.Text, nullable=True),
+        sa.Column(
+            'created_at',
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.func.now(),
+        ),
+        sa.CheckConstraint(
+            "status IN ('queued', 'running', 'failed')", name='ck_jobs_status'
+        ),
+    )
+    # Workers claim the oldest due job; the partial index holds only the
+    # queued rows, so claiming stays cheap however many jobs have failed
+    op.create_index(
+        'ix_jobs_queued_run_at_id',
+        'jobs',
+        ['run_at', 'id'],
+        postgresql_where=sa.text("status = 'queued'"),
+    )
+    # Wakes idle workers when jobs are inserted. Statement-level, and NOTIFY
+    # only fires on commit, so a rolled back enqueue wakes nobody.
+    op.execute(
+        """
+        CREATE FUNCTION notify_jobs() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('jobs', '');
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER jobs_notify
+        AFTER INSERT ON jobs
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_jobs()
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER jobs_notify ON jobs")
+    op.execute("DROP FUNCTION notify_jobs()")
+    op.drop_index('ix_jobs_queued_run_at_id', table_name='jobs')
+    op.drop_table('jobs')
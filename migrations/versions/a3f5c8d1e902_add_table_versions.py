@@ -0,0 +1,64 @@
+"""add table versions
+
+Revision ID: a3f5c8d1e902
+Revises: 7c1d9e4a2b31
+Create Date: 2026-10-17 11:40:27.905113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f5c8d1e902'
+down_revision: Union[str, Sequence[str], None] = '7c1d9e4a2b31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # One row per tracked table, bumped on every write statement. Reading it
+    # is a primary key lookup, which makes it a cheap ETag/Last-Modified
+    # validator compared to max(updated_at) or count(*) over the table.
+    op.create_table(
+        'table_versions',
+        sa.Column('table_name', sa.String(63), primary_key=True),
+        sa.Column('version', sa.BigInteger, nullable=False, server_default='0'),
+        sa.Column(
+            'updated_at',
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.func.now(),
+        ),
+    )
+    op.execute("INSERT INTO table_versions (table_name) VALUES ('tasks')")
+    op.execute(
+        """
+        CREATE FUNCTION bump_table_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE table_versions
+            SET version = version + 1, updated_at = clock_timestamp()
+            WHERE table_name = TG_TABLE_NAME;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    # Statement-level, so a bulk COPY or multi-row INSERT bumps it once
+    op.execute(
+        """
+        CREATE TRIGGER tasks_bump_version
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON tasks
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER tasks_bump_version ON tasks")
+    op.execute("DROP FUNCTION bump_table_version()")
+    op.drop_table('table_versions')
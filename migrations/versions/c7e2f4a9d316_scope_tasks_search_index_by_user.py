@@ -0,0 +1,43 @@
+"""scope tasks search index by user
+
+Revision ID: c7e2f4a9d316
+Revises: 8a3c5e7f9b14
+Create Date: 2026-10-18 10:03:27.118405
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e2f4a9d316'
+down_revision: Union[str, Sequence[str], None] = '8a3c5e7f9b14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # btree_gin lets a GIN index hold the scalar user_id next to the
+    # tsvector, so a search only visits the caller's matches instead of
+    # every user's and filtering them afterwards. It ships with Postgres
+    # (contrib) and is trusted, so the database owner can create it.
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+    op.create_index(
+        'ix_tasks_user_id_search_vector',
+        'tasks',
+        ['user_id', 'search_vector'],
+        postgresql_using='gin',
+    )
+    # Every search is scoped to one user, so the unscoped index is dead weight
+    op.drop_index('ix_tasks_search_vector', table_name='tasks')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(
+        'ix_tasks_search_vector', 'tasks', ['search_vector'], postgresql_using='gin'
+    )
+    op.drop_index('ix_tasks_user_id_search_vector', table_name='tasks')
+    # The extension is left installed; other objects may depend on it
@@ -0,0 +1,52 @@
+"""maintain tasks updated_at
+
+Revision ID: d2b7e6f04c18
+Revises: a3f5c8d1e902
+Create Date: 2026-10-17 13:05:51.226730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2b7e6f04c18'
+down_revision: Union[str, Sequence[str], None] = 'a3f5c8d1e902'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("UPDATE tasks SET updated_at = created_at WHERE updated_at IS NULL")
+    op.alter_column('tasks', 'updated_at', existing_type=sa.DateTime, nullable=False)
+
+    # updated_at doubles as the optimistic concurrency token for task edits,
+    # so every UPDATE must move it. clock_timestamp() rather than now() so two
+    # updates inside one transaction still get distinct values.
+    op.execute(
+        """
+        CREATE FUNCTION set_updated_at() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at = clock_timestamp();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER tasks_set_updated_at
+        BEFORE UPDATE ON tasks
+        FOR EACH ROW EXECUTE FUNCTION set_updated_at()
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('tasks', 'updated_at', existing_type=sa.DateTime, nullable=True)
+    op.execute("DROP TRIGGER tasks_set_updated_at ON tasks")
+    op.execute("DROP FUNCTION set_updated_at()")
@@ -0,0 +1,30 @@
+"""drop unscoped created_at index
+
+Revision ID: d9b4e1f7a2c5
+Revises: c7e2f4a9d316
+Create Date: 2026-10-18 11:26:51.407392
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9b4e1f7a2c5'
+down_revision: Union[str, Sequence[str], None] = 'c7e2f4a9d316'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Every list query is scoped by user_id and served by
+    # ix_tasks_user_id_created_at_id; the unscoped index only added work to
+    # every task insert and update.
+    op.drop_index('ix_tasks_created_at_id', table_name='tasks')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_tasks_created_at_id', 'tasks', ['created_at', 'id'])
@@ -0,0 +1,44 @@
+"""add tasks search vector
+
+Revision ID: e5a1c9f3b7d2
+Revises: d2b7e6f04c18
+Create Date: 2026-10-17 15:42:10.904117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a1c9f3b7d2'
+down_revision: Union[str, Sequence[str], None] = 'd2b7e6f04c18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Generated so it can never drift from title/description. Title matches
+    # are weighted above description matches for ts_rank. The 'english'
+    # configuration must match SEARCH_CONFIG in tasks_routes.py so search
+    # terms are stemmed the same way. Adding a stored column rewrites the
+    # table.
+    op.execute(
+        """
+        ALTER TABLE tasks ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(description, '')), 'B')
+        ) STORED
+        """
+    )
+    op.create_index(
+        'ix_tasks_search_vector', 'tasks', ['search_vector'], postgresql_using='gin'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_search_vector', table_name='tasks')
+    op.drop_column('tasks', 'search_vector')
@@ -0,0 +1,50 @@
+"""add task filter indexes
+
+Revision ID: f1c3a7e9d5b2
+Revises: e5a1c9f3b7d2
+Create Date: 2026-10-17 17:20:33.617204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c3a7e9d5b2'
+down_revision: Union[str, Sequence[str], None] = 'e5a1c9f3b7d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # One (column, id) index per ?sort= column, so every sorted page is an
+    # ordered index scan that stops after LIMIT rows; ix_tasks_created_at_id
+    # already covers sort=created.
+    op.create_index('ix_tasks_updated_at_id', 'tasks', ['updated_at', 'id'])
+    op.create_index('ix_tasks_title_id', 'tasks', ['title', 'id'])
+    # Open and completed tasks listed by creation date (the default sort) get
+    # partial indexes holding only their rows; the predicates must match the
+    # ones emitted by task_filter_conditions exactly.
+    op.create_index(
+        'ix_tasks_open_created_at_id',
+        'tasks',
+        ['created_at', 'id'],
+        postgresql_where=sa.text('completed_at IS NULL'),
+    )
+    op.create_index(
+        'ix_tasks_completed_created_at_id',
+        'tasks',
+        ['created_at', 'id'],
+        postgresql_where=sa.text('completed_at IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_completed_created_at_id', table_name='tasks')
+    op.drop_index('ix_tasks_open_created_at_id', table_name='tasks')
+    op.drop_index('ix_tasks_title_id', table_name='tasks')
+    op.drop_index('ix_tasks_updated_at_id', table_name='tasks')
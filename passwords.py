@@ -0,0 +1,196 @@
+"""Password hashing on a bounded worker pool with tunable cost."""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+
+from werkzeug.security import (
+    DEFAULT_PBKDF2_ITERATIONS,
+    check_password_hash,
+    generate_password_hash,
+)
+
+# Settings, overridable per app through app.config (see init_app).
+# The method uses werkzeug's syntax: "scrypt:N:r:p" or "pbkdf2:hash:iterations".
+PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+# Hashes computed at once; hashlib releases the GIL, so this is the number of
+# cores password checks may occupy
+PASSWORD_HASH_WORKERS = int(
+    os.environ.get("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1))
+)
+# Hashes queued or running before new ones are refused
+PASSWORD_HASH_MAX_PENDING = int(
+    os.environ.get("PASSWORD_HASH_MAX_PENDING", PASSWORD_HASH_WORKERS * 8)
+)
+# Seconds a caller waits for a queue slot before giving up
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.environ.get("PASSWORD_HASH_QUEUE_TIMEOUT", 2))
+
+
+class HashingOverloaded(Exception):
+    """Raised when the hashing queue stays full for the whole queue timeout."""
+
+
+def canonical_method(method):
+    """
+    Spell out the defaults of a werkzeug hash method, e.g. "scrypt" becomes
+    "scrypt:32768:8:1", as it appears in the stored hashes.
+
+    Raises:
+        ValueError: If the method is not scrypt or pbkdf2
+    """
+    name, *args = method.split(":")
+    if name == "scrypt":
+        n, r, p = map(int, args) if args else (2**15, 8, 1)
+        return f"scrypt:{n}:{r}:{p}"
+    if name == "pbkdf2":
+        hash_name = args[0] if args else "sha256"
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{iterations}"
+    raise ValueError(f"Unsupported password hash method {method!r}")
+
+
+class PasswordHasher:
+    """
+    Hashes and checks passwords on a fixed number of worker threads.
+
+    A password check costs tens of milliseconds of CPU by design. Running
+    it on a small pool caps how many cores logins can take, so a burst of
+    logins queues up instead of starving every other request, and the
+    queue itself is bounded so callers fail fast once it is full.
+    """
+
+    def __init__(
+        self,
+        method=PASSWORD_HASH_METHOD,
+        workers=PASSWORD_HASH_WORKERS,
+        max_pending=PASSWORD_HASH_MAX_PENDING,
+        queue_timeout=PASSWORD_HASH_QUEUE_TIMEOUT,
+    ):
+        self.method = canonical_method(method)
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hash"
+        )
+        self._slots = threading.BoundedSemaphore(max(max_pending, workers))
+        self._stats_lock = threading.Lock()
+        self._hashes = 0
+        self._rejected = 0
+        self._hash_time = 0.0
+
+    def hash(self, password):
+        """Hash `password` with the configured method."""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, hashed, password):
+        """Check `password` against a stored hash, whatever its method."""
+        return self._run(check_password_hash, hashed, password)
+
+    def needs_rehash(self, hashed):
+        """Tell whether a stored hash was made with other cost parameters."""
+        return hashed.split("$", 1)[0] != self.method
+
+    def stats(self):
+        """Return hash counts and average hash time."""
+        with self._stats_lock:
+            return {
+                "method": self.method,
+                "workers": self.workers,
+                "hashes": self._hashes,
+                "rejected": self._rejected,
+                "avg_hash_ms": (
+                    self._hash_time / self._hashes * 1000 if self._hashes else None
+                ),
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._stats_lock:
+                self._rejected += 1
+            raise HashingOverloaded("Too many password checks in progress")
+        try:
+            future = self._executor.submit(self._timed, fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def _timed(self, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._stats_lock:
+                self._hashes += 1
+                self._hash_time += elapsed
+
+
+_hasher = None
+_hasher_lock = threading.Lock()
+
+
+def get_hasher():
+    """Return the process-wide PasswordHasher, creating it on first use."""
+    global _hasher
+    if _hasher is None:
+        with _hasher_lock:
+            if _hasher is None:
+                _hasher = PasswordHasher()
+    return _hasher
+
+
+def hash_password(password):
+    """Hash `password` on the hashing pool."""
+    return get_hasher().hash(password)
+
+
+def verify_password(hashed, password):
+    """Check `password` against `hashed` on the hashing pool."""
+    return get_hasher().verify(hashed, password)
+
+
+def needs_rehash(hashed):
+    """Tell whether `hashed` should be replaced with the current method."""
+    return get_hasher().needs_rehash(hashed)
+
+
+@cache
+def _dummy_hash(method):
+    return generate_password_hash("not-a-real-password", method)
+
+
+def dummy_hash():
+    """A hash with the current cost, to check against for unknown accounts."""
+    return _dummy_hash(get_hasher().method)
+
+
+def init_app(app):
+    """
+    Configure password hashing for `app`.
+
+    Recognised keys are PASSWORD_HASH_METHOD, PASSWORD_HASH_WORKERS,
+    PASSWORD_HASH_MAX_PENDING and PASSWORD_HASH_QUEUE_TIMEOUT.
+    """
+    global _hasher
+    hasher = PasswordHasher(
+        method=app.config.get("PASSWORD_HASH_METHOD", PASSWORD_HASH_METHOD),
+        workers=app.config.get("PASSWORD_HASH_WORKERS", PASSWORD_HASH_WORKERS),
+        max_pending=app.config.get(
+            "PASSWORD_HASH_MAX_PENDING", PASSWORD_HASH_MAX_PENDING
+        ),
+        queue_timeout=app.config.get(
+            "PASSWORD_HASH_QUEUE_TIMEOUT", PASSWORD_HASH_QUEUE_TIMEOUT
+        ),
+    )
+    with _hasher_lock:
+        previous, _hasher = _hasher, hasher
+    if previous is not None:
+        previous.shutdown()
+    app.extensions["passwords"] = hasher
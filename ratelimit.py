@@ -0,0 +1,309 @@
+"""Per-client rate limiting of writes and a global cap on in-flight requests."""
+
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import psycopg2
+from flask import Response, current_app, g, jsonify, request
+
+import db
+from auth import current_user_id
+
+# Settings, overridable per app through app.config (see init_app)
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "1") == "1"
+# "memory" keeps buckets per process; "postgres" shares them between workers
+# through the rate_limits table, at the cost of one write per limited request
+RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "memory")
+# Sustained writes per second allowed to each client (user, or IP address
+# when anonymous), and how many may arrive at once after a quiet spell
+RATE_LIMIT_RATE = float(os.environ.get("RATE_LIMIT_RATE", 5))
+RATE_LIMIT_BURST = float(os.environ.get("RATE_LIMIT_BURST", 20))
+# Buckets kept by the memory backend; the least recently used client is
+# forgotten beyond this, which only refills its bucket
+RATE_LIMIT_MAX_KEYS = int(os.environ.get("RATE_LIMIT_MAX_KEYS", 10000))
+
+# Requests handled at once by this process. Nearly every view holds a pooled
+# connection for part of its time, so far beyond the pool size they would
+# only queue for one; 0 means twice DB_POOL_MAX_SIZE.
+ADMISSION_MAX_IN_FLIGHT = int(os.environ.get("ADMISSION_MAX_IN_FLIGHT", 0))
+# Seconds a request waits for a slot before it is turned away with a 503
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", 0.1))
+# Seconds an overloaded client is asked to wait
+ADMISSION_RETRY_AFTER = 1
+
+# Methods that count against a client's rate limit
+LIMITED_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+# Endpoints outside admission control: static files, the scrape endpoint
+# that has to work while overloaded, and event streams that stay open for
+# hours without holding a connection (capped by LIVE_MAX_SUBSCRIBERS instead)
+ADMISSION_EXEMPT = ("static", "metrics.metrics", "tasks.task_events")
+
+# Seconds between deletions of idle rows by the postgres backend
+_PRUNE_INTERVAL = 60
+
+logger = logging.getLogger("taskmanager.ratelimit")
+
+
+class TokenBucketLimiter:
+    """
+    In-process token buckets, one per client key.
+
+    A bucket holds up to `burst` tokens and refills at `rate` per second;
+    each request takes one. Buckets live in this process only, so with N
+    workers a client gets up to N times the rate.
+    """
+
+    backend = "memory"
+
+    def __init__(self, rate, burst, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def take(self, key):
+        """
+        Take a token from `key`'s bucket.
+
+        Returns:
+            (allowed, retry_after) tuple; retry_after is the seconds until a
+            token is available, 0 when allowed
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = self.burst
+            else:
+                tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / self.rate
+
+    def stats(self):
+        with self._lock:
+            return {"backend": self.backend, "keys": len(self._buckets)}
+
+
+# Refill the bucket for the time since its last request, then take a token
+# if there is one; a single statement, so concurrent workers can't both take
+# the last token
+TAKE_TOKEN_QUERY = """
+    INSERT INTO rate_limits AS bucket (key, tokens, allowed, updated_at)
+    VALUES (%s, %s::float8 - 1, true, now())
+    ON CONFLICT (key) DO UPDATE SET (tokens, allowed, updated_at) = (
+        SELECT CASE WHEN refill >= 1 THEN refill - 1 ELSE refill END,
+               refill >= 1,
+               now()
+        FROM (
+            SELECT LEAST(
+                %s::float8,
+                bucket.tokens
+                    + EXTRACT(EPOCH FROM now() - bucket.updated_at)::float8
+                    * %s::float8
+            ) AS refill
+        ) AS refilled
+    )
+    RETURNING allowed, tokens
+"""
+
+# Buckets idle long enough to have refilled are the same as no bucket
+PRUNE_QUERY = """
+    DELETE FROM rate_limits WHERE updated_at < now() - %s::float8 * interval '1 second'
+"""
+
+
+class PostgresTokenBucketLimiter(TokenBucketLimiter):
+    """
+    Token buckets in the rate_limits table, shared by every worker.
+
+    Database errors let the request through: the limiter must not turn a
+    database hiccup into an outage of its own. Bucket writes go through
+    get_cursor rather than db.execute_update, whose note_write() would pin
+    every limited client's reads to the primary and set a session cookie
+    on each response.
+    """
+
+    backend = "postgres"
+
+    def __init__(self, rate, burst, max_keys=RATE_LIMIT_MAX_KEYS):
+        super().__init__(rate, burst, max_keys)
+        self._pruned_at = time.monotonic()
+
+    def take(self, key):
+        try:
+            self._maybe_prune()
+            with db.get_cursor(commit=True) as cursor:
+                db.execute_prepared(
+                    cursor, TAKE_TOKEN_QUERY, (key, self.burst, self.burst, self.rate)
+                )
+                rows = cursor.fetchall()
+        except psycopg2.Error:
+            logger.exception("Rate limit check failed; allowing the request")
+            return True, 0.0
+        allowed, tokens = rows[0]["allowed"], rows[0]["tokens"]
+        return allowed, 0.0 if allowed else (1 - tokens) / self.rate
+
+    def _maybe_prune(self):
+        with self._lock:
+            if time.monotonic() - self._pruned_at < _PRUNE_INTERVAL:
+                return
+            self._pruned_at = time.monotonic()
+        with db.get_cursor(commit=True) as cursor:
+            cursor.execute(PRUNE_QUERY, (self.burst / self.rate,))
+
+    def stats(self):
+        return {"backend": self.backend}
+
+
+class AdmissionController:
+    """
+    Caps the requests this process handles at once.
+
+    A request that can't get a slot within `queue_timeout` seconds is shed
+    with a 503 at once, instead of queueing for a pooled connection until
+    DB_POOL_TIMEOUT while the database is already saturated.
+    """
+
+    def __init__(self, max_in_flight, queue_timeout=ADMISSION_QUEUE_TIMEOUT):
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._admitted = 0
+        self._shed = 0
+
+    def acquire(self):
+        """Take a slot; returns False if none freed up within queue_timeout."""
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self._shed += 1
+            return False
+        with self._lock:
+            self._in_flight += 1
+            self._admitted += 1
+        return True
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def stats(self):
+        """Return in-flight, admitted and shed request counts."""
+        with self._lock:
+            return {
+                "max_in_flight": self.max_in_flight,
+                "in_flight": self._in_flight,
+                "admitted": self._admitted,
+                "shed": self._shed,
+            }
+
+
+def create_limiter(backend, rate, burst, max_keys=RATE_LIMIT_MAX_KEYS):
+    """
+    Build a limiter for `backend` ("memory" or "postgres").
+
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    if backend == "memory":
+        return TokenBucketLimiter(rate, burst, max_keys)
+    if backend == "postgres":
+        return PostgresTokenBucketLimiter(rate, burst, max_keys)
+    raise ValueError(f"Unknown rate limit backend: {backend}")
+
+
+def client_key():
+    """Rate limit key of the current request: the user, else the IP address."""
+    user_id = current_user_id()
+    if user_id is not None:
+        return f"user:{user_id}"
+    # Behind a proxy this is the proxy unless ProxyFix is configured
+    return f"ip:{request.remote_addr}"
+
+
+def reject(status, message, retry_after):
+    """Answer `status` with Retry-After, as JSON for the API."""
+    headers = {"Retry-After": str(max(1, math.ceil(retry_after)))}
+    if request.blueprint == "api":
+        return jsonify({"error": message}), status, headers
+    return Response(message, status, headers, mimetype="text/plain")
+
+
+def _admit():
+    state = current_app.extensions["ratelimit"]
+    admission, limiter = state["admission"], state["limiter"]
+    if admission is not None and request.endpoint not in ADMISSION_EXEMPT:
+        if not admission.acquire():
+            return reject(
+                503, "Server busy, please retry shortly", ADMISSION_RETRY_AFTER
+            )
+        g.admission_slot = admission
+    if limiter is not None and request.method in LIMITED_METHODS:
+        allowed, retry_after = limiter.take(client_key())
+        if not allowed:
+            return reject(429, "Too many requests", retry_after)
+    return None
+
+
+def _hold_until_closed(response):
+    # Teardown runs before a streamed body is sent, so the slot goes back
+    # when the server closes the response instead
+    admission = g.pop("admission_slot", None)
+    if admission is not None:
+        response.call_on_close(admission.release)
+    return response
+
+
+def _release(exc):
+    # Only reached with the slot still taken if no response was produced
+    admission = g.pop("admission_slot", None)
+    if admission is not None:
+        admission.release()
+
+
+def init_app(app):
+    """
+    Rate limit writes and cap in-flight requests for every blueprint of `app`.
+
+    Recognised keys are RATE_LIMIT_ENABLED, RATE_LIMIT_BACKEND,
+    RATE_LIMIT_RATE, RATE_LIMIT_BURST, RATE_LIMIT_MAX_KEYS,
+    ADMISSION_MAX_IN_FLIGHT (negative disables the cap) and
+    ADMISSION_QUEUE_TIMEOUT.
+    """
+    limiter = None
+    if app.config.get("RATE_LIMIT_ENABLED", RATE_LIMIT_ENABLED):
+        limiter = create_limiter(
+            app.config.get("RATE_LIMIT_BACKEND", RATE_LIMIT_BACKEND),
+            app.config.get("RATE_LIMIT_RATE", RATE_LIMIT_RATE),
+            app.config.get("RATE_LIMIT_BURST", RATE_LIMIT_BURST),
+            app.config.get("RATE_LIMIT_MAX_KEYS", RATE_LIMIT_MAX_KEYS),
+        )
+    max_in_flight = app.config.get("ADMISSION_MAX_IN_FLIGHT", ADMISSION_MAX_IN_FLIGHT)
+    if max_in_flight == 0:
+        max_in_flight = 2 * app.config.get(
+            "DB_POOL_MAX_SIZE", db.POOL_SETTINGS["max_size"]
+        )
+    admission = None
+    if max_in_flight > 0:
+        admission = AdmissionController(
+            max_in_flight,
+            app.config.get("ADMISSION_QUEUE_TIMEOUT", ADMISSION_QUEUE_TIMEOUT),
+        )
+
+    app.extensions["ratelimit"] = {"limiter": limiter, "admission": admission}
+    app.before_request(_admit)
+    app.after_request(_hold_until_closed)
+    app.teardown_request(_release)
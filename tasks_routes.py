@@ -1,8 +1,138 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
-from db import execute_query, execute_update
+import csv
+import functools
+import io
+import json
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    render_template,
+    stream_template,
+    request,
+    redirect,
+    url_for,
+    flash,
+    jsonify,
+    make_response,
+    session,
+    abort,
+)
+from db import (
+    copy_in,
+    copy_to,
+    execute_query,
+    execute_update,
+    get_table_version,
+    stream_copy,
+    stream_query,
+)
+from auth import current_user_id, login_required
+from cache import get_cache
+from ratelimit import reject
+import batching
+import click
+import jobs
+import live
 import psycopg2
 
 tasks_bp = Blueprint("tasks", __name__, url_prefix="/tasks")
+# Every task view works on the logged-in user's tasks
+tasks_bp.before_request(login_required)
+
+# Prefix of the per-user cache namespaces holding task list pages; see
+# tasks_cache_namespace
+TASKS_CACHE_NAMESPACE = "tasks"
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+# ?sort= values and the column each one orders by. Every column has a
+# (user_id, column, id) index (plus partial ones for the status filters), so
+# any combination of sort and filters is served by an index scan over the
+# caller's own tasks.
+SORT_COLUMNS = {"created": "created_at", "updated": "updated_at", "title": "title"}
+DEFAULT_SORT = "created"
+# Sorts that default to descending order (newest first)
+SORT_DESCENDING = ("created", "updated")
+# ?status= values mapped to the "completed" filter
+STATUS_FILTERS = {"all": None, "open": False, "completed": True}
+
+# Streamed responses are flushed in pieces of roughly this many characters
+STREAM_CHUNK_SIZE = 64 * 1024
+
+EXPORT_FORMATS = ("csv", "ndjson")
+EXPORT_MIMETYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+IMPORT_FORMATS = ("csv", "ndjson")
+# Per-row errors beyond this many are counted but not listed in the response
+MAX_REPORTED_IMPORT_ERRORS = 1000
+
+# Text search configuration of tasks.search_vector (see its migration)
+SEARCH_CONFIG = "english"
+# Words of a search beyond this many are ignored
+MAX_SEARCH_TERMS = 8
+_SEARCH_TERM_RE = re.compile(r"\w+")
+
+ALL_TASKS_QUERY = """
+    SELECT id, title, description, completed_at, created_at, updated_at
+    FROM tasks
+    WHERE user_id = %s
+    ORDER BY created_at DESC, id DESC
+"""
+
+
+@dataclass(slots=True)
+class Task:
+    """
+    A task row, built from the columns of ALL_TASKS_QUERY in that order.
+
+    Task lists are read with row_type=Task: a slotted instance is half the
+    size of a DictRow and needs no dict copy to be cached, so long lists and
+    streamed pages allocate and collect less. Subscripts (task["title"])
+    still work, so code shared with dict rows needn't care.
+    """
+
+    id: int
+    title: str
+    description: str | None
+    completed_at: datetime | None
+    created_at: datetime
+    updated_at: datetime
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+
+def validate_title(title):
+    """Return the error message for an invalid stripped title, or None."""
+    if not title:
+        return "Title is required"
+    if len(title) > 255:
+        return "Title must be 255 characters or less"
+    return None
+
+
+def tasks_cache_namespace(user_id):
+    """
+    Cache namespace of one user's task pages.
+
+    Each user has their own, so a write only invalidates the writer's pages.
+    """
+    return f"{TASKS_CACHE_NAMESPACE}:{user_id}"
+
+
+def validate_description(description):
+    """Return the error message for an invalid stripped description, or None."""
+    if description and len(description) > 255:
+        return "Description must be 255 characters or less"
+    return None
 
 
 def validate_task_form(form_data):
@@ -17,24 +147,125 @@ def validate_task_form(form_data):
     description = form_data.get("description", "").strip()
 
     # Validate title
-    if not title:
-        errors["title"] = "Title is required"
-    elif len(title) > 255:
-        errors["title"] = "Title must be 255 characters or less"
+    title_error = validate_title(title)
+    if title_error:
+        errors["title"] = title_error
 
     # Validate description
-    if description and len(description) > 255:
-        errors["description"] = "Description must be 255 characters or less"
+    description_error = validate_description(description)
+    if description_error:
+        errors["description"] = description_error
 
     return errors, {"title": title, "description": description}
 
 
+def task_form_from_record(record):
+    """Coerce a parsed JSON/CSV record into string form data for validation."""
+    return {
+        field: "" if record.get(field) is None else str(record.get(field))
+        for field in ("title", "description")
+    }
+
+
 @tasks_bp.route("/new", methods=["GET"])
 def new_task():
     """Display task creation form."""
     return render_template("tasks/new.html")
 
 
+# Queues a "task_created" job (see jobs.py) for every row of the `task` CTE
+# in the same statement, so follow-up work costs the request no extra
+# round-trip and is only queued if the task is committed
+QUEUE_TASK_CREATED_JOBS = """, queued AS (
+        INSERT INTO jobs (kind, payload)
+        SELECT 'task_created',
+               jsonb_build_object('task_id', id, 'user_id', user_id)
+        FROM task
+    )"""
+
+# Inserts a task (title, description, completed, user_id)
+CREATE_TASK_QUERY_TEMPLATE = """
+    WITH task AS (
+        INSERT INTO tasks (title, description, completed_at, user_id)
+        VALUES (%s, %s, CASE WHEN %s THEN now() END, %s)
+        RETURNING id, title, description, completed_at, created_at, updated_at,
+                  user_id
+    ){queued}
+    SELECT id, title, description, completed_at, created_at, updated_at
+    FROM task
+"""
+CREATE_TASK_QUERY = CREATE_TASK_QUERY_TEMPLATE.format(queued="")
+CREATE_TASK_QUEUING_JOB_QUERY = CREATE_TASK_QUERY_TEMPLATE.format(
+    queued=QUEUE_TASK_CREATED_JOBS
+)
+
+
+def build_create_tasks_query(count, queue_jobs=False):
+    """
+    CREATE_TASK_QUERY for `count` tasks in one statement (see batching.py).
+
+    Takes the four parameters of each task in turn, and returns each task
+    with the 0-based `ordinal` of its parameters. Ids are drawn from the
+    sequence per row before the insert, so the ordinal is joined back on id
+    rather than inferred from insertion order.
+    """
+    values = ", ".join(f"({ordinal}, %s, %s, %s, %s)" for ordinal in range(count))
+    queued = QUEUE_TASK_CREATED_JOBS if queue_jobs else ""
+    return f"""
+        WITH new_task AS (
+            SELECT nextval(pg_get_serial_sequence('tasks', 'id')) AS id, new_task.*
+            FROM (VALUES {values})
+                AS new_task (ordinal, title, description, completed, user_id)
+        ), task AS (
+            INSERT INTO tasks (id, title, description, completed_at, user_id)
+            SELECT id, title, description, CASE WHEN completed THEN now() END,
+                   user_id
+            FROM new_task
+            RETURNING id, title, description, completed_at, created_at,
+                      updated_at, user_id
+        ){queued}
+        SELECT new_task.ordinal, id, task.title, task.description,
+               task.completed_at, task.created_at, task.updated_at
+        FROM task JOIN new_task USING (id)
+    """
+
+
+def queues_task_created_jobs():
+    """Whether creating a task queues a task_created job (TASK_CREATED_JOBS)."""
+    return current_app.config.get("TASK_CREATED_JOBS", jobs.TASK_CREATED_JOBS)
+
+
+def create_task_query():
+    """CREATE_TASK_QUERY, also queueing the job with TASK_CREATED_JOBS."""
+    if queues_task_created_jobs():
+        return CREATE_TASK_QUEUING_JOB_QUERY
+    return CREATE_TASK_QUERY
+
+
+def insert_task(title, description, completed, user_id):
+    """
+    Insert a task, queueing its task_created job with TASK_CREATED_JOBS.
+
+    With WRITE_BATCH_ENABLED, concurrent calls are coalesced into one
+    multi-row insert and one commit (see batching.InsertBatcher).
+
+    Returns:
+        The new task row, or None if nothing was inserted
+    """
+    params = (title, description, completed, user_id)
+    if queues_task_created_jobs():
+        batcher = batching.get_batcher(
+            "tasks_with_jobs",
+            functools.partial(build_create_tasks_query, queue_jobs=True),
+        )
+    else:
+        batcher = batching.get_batcher("tasks", build_create_tasks_query)
+    if batcher is not None:
+        return batcher.submit(params)
+    rows = execute_update(create_task_query(), params, prepare=True)
+    return rows[0] if rows else None
+
+
 @tasks_bp.route("/", methods=["POST"])
 def create_task():
     """Handle task creation."""
@@ -51,15 +282,13 @@ def create_task():
 
     try:
         # Insert task into database
-        query = """
-            INSERT INTO tasks (title, description)
-            VALUES (%s, %s)
-            RETURNING id, title, description, completed_at, created_at, updated_at
-        """
-        params = (cleaned_data["title"], cleaned_data["description"] or None)
-        result = execute_update(query, params)
+        user_id = current_user_id()
+        task = insert_task(
+            cleaned_data["title"], cleaned_data["description"] or None, False, user_id
+        )
 
-        if result:
+        if task:
+            get_cache().invalidate(tasks_cache_namespace(user_id))
             flash("Task created successfully!", "success")
             return redirect(url_for("tasks.list_tasks"))
         else:
@@ -76,18 +305,1051 @@ def create_task():
         return render_template("tasks/new.html", errors={"db": str(db_error)}), 500
 
 
+def parse_version(value):
+    """
+    Parse the updated_at concurrency token submitted with an edit.
+
+    Returns:
+        datetime, or None if the token is missing or malformed
+    """
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def fetch_task(user_id, task_id):
+    """Return one of the user's tasks, or None if they have no such task."""
+    rows = execute_query(
+        """
+        SELECT id, title, description, completed_at, created_at, updated_at
+        FROM tasks
+        WHERE id = %s AND user_id = %s
+        """,
+        (task_id, user_id),
+        prepare=True,
+    )
+    return rows[0] if rows else None
+
+
+def _missing_task_status(user_id, task_id, expected_updated_at):
+    # Only reached when a write matched no row; tell a stale token apart from
+    # a task that is gone. This costs a query on the failure path only.
+    if expected_updated_at is None:
+        return "not_found"
+    rows = execute_query(
+        "SELECT 1 FROM tasks WHERE id = %s AND user_id = %s",
+        (task_id, user_id),
+        prepare=True,
+        # A replica may not have seen the write that made the token stale
+        primary=True,
+    )
+    return "conflict" if rows else "not_found"
+
+
+def update_task_record(user_id, task_id, changes, expected_updated_at=None):
+    """
+    Apply whitelisted changes to a task in one UPDATE ... RETURNING.
+
+    With expected_updated_at the row is only updated if it still carries
+    that version (optimistic concurrency), so there is no read-modify-write.
+    updated_at itself is moved by the tasks_set_updated_at trigger.
+
+    Args:
+        user_id: Owner of the task; other users' tasks are "not_found"
+        task_id: Task to update
+        changes: Dict with any of title, description, completed
+        expected_updated_at: updated_at value the client last saw
+
+    Returns:
+        (status, task) tuple; status is "updated", "conflict" or
+        "not_found" and task is the updated row or None
+    """
+    assignments = []
+    params = []
+    for field in ("title", "description"):
+        if field in changes:
+            assignments.append(f"{field} = %s")
+            params.append(changes[field])
+    if "completed" in changes:
+        # Keep the original completion time when re-completing a task
+        assignments.append(
+            "completed_at = CASE WHEN %s THEN COALESCE(completed_at, now()) END"
+        )
+        params.append(changes["completed"])
+
+    conditions = ["id = %s", "user_id = %s"]
+    params.extend((task_id, user_id))
+    if expected_updated_at is not None:
+        conditions.append("updated_at = %s")
+        params.append(expected_updated_at)
+
+    result = execute_update(
+        f"""
+        UPDATE tasks
+        SET {", ".join(assignments)}
+        WHERE {" AND ".join(conditions)}
+        RETURNING id, title, description, completed_at, created_at, updated_at
+        """,
+        params,
+        prepare=True,
+    )
+    if not result:
+        return _missing_task_status(user_id, task_id, expected_updated_at), None
+    get_cache().invalidate(tasks_cache_namespace(user_id))
+    return "updated", result[0]
+
+
+def delete_task_record(user_id, task_id, expected_updated_at=None):
+    """
+    Delete one of the user's tasks, optionally only if it still has the
+    given updated_at.
+
+    Returns:
+        "deleted", "conflict" or "not_found"
+    """
+    query = "DELETE FROM tasks WHERE id = %s AND user_id = %s"
+    params = [task_id, user_id]
+    if expected_updated_at is not None:
+        query += " AND updated_at = %s"
+        params.append(expected_updated_at)
+
+    result = execute_update(query + " RETURNING id", params, prepare=True)
+    if not result:
+        return _missing_task_status(user_id, task_id, expected_updated_at)
+    get_cache().invalidate(tasks_cache_namespace(user_id))
+    return "deleted"
+
+
+CONFLICT_MESSAGE = "This task was changed by someone else. Please review and retry."
+
+
+@tasks_bp.route("/<int:task_id>/edit", methods=["GET"])
+def edit_task(task_id):
+    """Display task edit form."""
+    try:
+        task = fetch_task(current_user_id(), task_id)
+    except psycopg2.Error:
+        flash("Database error: Unable to load task", "error")
+        return redirect(url_for("tasks.list_tasks"))
+    if task is None:
+        abort(404)
+
+    return render_template(
+        "tasks/edit.html",
+        task_id=task_id,
+        version=task["updated_at"].isoformat(),
+        form_data={"title": task["title"], "description": task["description"] or ""},
+    )
+
+
+@tasks_bp.route("/<int:task_id>", methods=["POST"])
+def update_task(task_id):
+    """Handle task edits, refusing them if the task changed in the meantime."""
+    errors, cleaned_data = validate_task_form(request.form)
+    version = parse_version(request.form.get("updated_at"))
+    if version is None:
+        errors["updated_at"] = "Missing or invalid task version"
+
+    def render_form(status, version_token):
+        return (
+            render_template(
+                "tasks/edit.html",
+                task_id=task_id,
+                version=version_token,
+                errors=errors,
+                form_data=request.form,
+            ),
+            status,
+        )
+
+    if errors:
+        for field, error_msg in errors.items():
+            flash(error_msg, "error")
+        return render_form(400, request.form.get("updated_at", ""))
+
+    try:
+        status, task = update_task_record(
+            current_user_id(),
+            task_id,
+            {
+                "title": cleaned_data["title"],
+                "description": cleaned_data["description"] or None,
+            },
+            expected_updated_at=version,
+        )
+        if status == "not_found":
+            abort(404)
+        if status == "conflict":
+            # Keep the user's input but offer the current version, so saving
+            # again is a deliberate overwrite of the other change
+            current = fetch_task(current_user_id(), task_id)
+            if current is None:
+                abort(404)
+            flash(CONFLICT_MESSAGE, "error")
+            return render_form(409, current["updated_at"].isoformat())
+
+        flash("Task updated successfully!", "success")
+        return redirect(url_for("tasks.list_tasks"))
+
+    except psycopg2.Error as db_error:
+        flash("Database error: Unable to update task", "error")
+        errors["db"] = str(db_error)
+        return render_form(500, request.form.get("updated_at", ""))
+
+
+@tasks_bp.route("/<int:task_id>/complete", methods=["POST"])
+def complete_task(task_id):
+    """Mark a task completed (or reopen it with completed=0)."""
+    completed = request.form.get("completed", "1") != "0"
+    try:
+        status, task = update_task_record(
+            current_user_id(),
+            task_id,
+            {"completed": completed},
+            expected_updated_at=parse_version(request.form.get("updated_at")),
+        )
+    except psycopg2.Error:
+        flash("Database error: Unable to update task", "error")
+        return redirect(url_for("tasks.list_tasks"))
+
+    if status == "not_found":
+        abort(404)
+    if status == "conflict":
+        flash(CONFLICT_MESSAGE, "error")
+    elif completed:
+        flash("Task completed!", "success")
+    else:
+        flash("Task reopened", "success")
+    return redirect(url_for("tasks.list_tasks"))
+
+
+@tasks_bp.route("/<int:task_id>/delete", methods=["POST"])
+def delete_task(task_id):
+    """Delete a task unless it changed since the list was rendered."""
+    try:
+        status = delete_task_record(
+            current_user_id(),
+            task_id,
+            expected_updated_at=parse_version(request.form.get("updated_at")),
+        )
+    except psycopg2.Error:
+        flash("Database error: Unable to delete task", "error")
+        return redirect(url_for("tasks.list_tasks"))
+
+    if status == "not_found":
+        abort(404)
+    if status == "conflict":
+        flash(CONFLICT_MESSAGE, "error")
+    else:
+        flash("Task deleted", "success")
+    return redirect(url_for("tasks.list_tasks"))
+
+
+def encode_cursor(task, sort=DEFAULT_SORT):
+    """Encode a task's (sort value, id) key as an opaque page cursor."""
+    value = task[SORT_COLUMNS[sort]]
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return f"{value},{task['id']}"
+
+
+def decode_cursor(value, sort=DEFAULT_SORT):
+    """
+    Decode a page cursor produced by encode_cursor for the same sort.
+
+    Returns:
+        (sort value, id) tuple, or None if the cursor is missing or malformed
+    """
+    if not value:
+        return None
+    try:
+        # rsplit: titles may contain commas, ids never do
+        key, task_id = value.rsplit(",", 1)
+        if sort != "title":
+            key = datetime.fromisoformat(key)
+        return key, int(task_id)
+    except ValueError:
+        return None
+
+
+def parse_page_size(value):
+    """Clamp a requested page size to 1..MAX_PAGE_SIZE, defaulting if invalid."""
+    try:
+        per_page = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(per_page, MAX_PAGE_SIZE))
+
+
+def parse_list_options(args):
+    """
+    Parse task list filters and ordering from request arguments.
+
+    Recognised arguments are status (all, open or completed), created_after,
+    created_before, sort (created, updated or title) and order (asc or desc).
+
+    Returns:
+        (errors_dict, options_dict) tuple; options always carry "sort" and
+        "descending" and only the filters that were given
+    """
+    errors = {}
+    options = {}
+
+    status = args.get("status", "all").lower()
+    if status in STATUS_FILTERS:
+        if STATUS_FILTERS[status] is not None:
+            options["completed"] = STATUS_FILTERS[status]
+    else:
+        errors["status"] = "status must be all, open or completed"
+    parse_created_range(args, errors, options)
+
+    sort = args.get("sort", DEFAULT_SORT).lower()
+    if sort not in SORT_COLUMNS:
+        errors["sort"] = f"sort must be one of {', '.join(SORT_COLUMNS)}"
+        sort = DEFAULT_SORT
+    options["sort"] = sort
+
+    order = args.get("order", "").lower()
+    if order in ("asc", "desc"):
+        options["descending"] = order == "desc"
+    elif order:
+        errors["order"] = "order must be asc or desc"
+    options.setdefault("descending", sort in SORT_DESCENDING)
+
+    return errors, options
+
+
+def parse_created_range(args, errors, filters):
+    """Parse created_after/created_before arguments into `filters`."""
+    for field in ("created_after", "created_before"):
+        value = args.get(field)
+        if not value:
+            continue
+        try:
+            filters[field] = datetime.fromisoformat(value)
+        except ValueError:
+            errors[field] = f"{field} must be an ISO 8601 date or datetime"
+
+
+def task_filter_conditions(
+    user_id=None, completed=None, created_after=None, created_before=None
+):
+    """
+    Build the WHERE conditions for the task filters.
+
+    Only fixed SQL fragments are emitted; filter values are passed as params.
+    Status filters are written exactly like the predicates of the partial
+    indexes on tasks so the planner can match them.
+
+    Args:
+        user_id: Keep only this user's tasks; None means every user's
+
+    Returns:
+        (conditions_list, params_list) tuple
+    """
+    conditions = []
+    params = []
+    if user_id is not None:
+        conditions.append("user_id = %s")
+        params.append(user_id)
+    if completed is True:
+        conditions.append("completed_at IS NOT NULL")
+    elif completed is False:
+        conditions.append("completed_at IS NULL")
+    if created_after:
+        conditions.append("created_at >= %s")
+        params.append(created_after)
+    if created_before:
+        conditions.append("created_at < %s")
+        params.append(created_before)
+    return conditions, params
+
+
+def list_query_args(options):
+    """Return the request arguments that reproduce non-default list options."""
+    args = {}
+    if "completed" in options:
+        args["status"] = "completed" if options["completed"] else "open"
+    for field in ("created_after", "created_before"):
+        if options.get(field):
+            args[field] = options[field].isoformat()
+    sort = options.get("sort", DEFAULT_SORT)
+    if sort != DEFAULT_SORT:
+        args["sort"] = sort
+    if options.get("descending", True) != (sort in SORT_DESCENDING):
+        args["order"] = "desc" if options["descending"] else "asc"
+    return args
+
+
+def build_task_page_query(
+    user_id, after=None, before=None, per_page=DEFAULT_PAGE_SIZE, options=None
+):
+    """
+    Build the keyset query for one page of a user's tasks.
+
+    Rows are located by seeking on a (user_id, sort column, id) index rather
+    than with OFFSET, so every page costs the same regardless of its position
+    and only the user's own rows are read.
+    One extra row is requested to find out whether another page exists.
+    Only whitelisted columns and fixed SQL fragments end up in the query.
+
+    Args:
+        user_id: Owner of the tasks
+        after: (sort value, id) key; return tasks that come after it
+        before: (sort value, id) key; return tasks that come before it
+        per_page: Number of tasks per page
+        options: Dict from parse_list_options; newest first when omitted
+
+    Returns:
+        (query, params) tuple
+    """
+    options = options or {}
+    sort = options.get("sort", DEFAULT_SORT)
+    column = SORT_COLUMNS[sort]
+    descending = options.get("descending", sort in SORT_DESCENDING)
+    conditions, params = task_filter_conditions(
+        user_id,
+        options.get("completed"),
+        options.get("created_after"),
+        options.get("created_before"),
+    )
+
+    # Paging backwards walks the index the other way and is flipped back
+    # into display order by paginate_task_rows
+    backwards = bool(before) and not after
+    if backwards:
+        descending = not descending
+    key = before if backwards else after
+    if key:
+        conditions.append(f"({column}, id) {'<' if descending else '>'} (%s, %s)")
+        params.extend(key)
+    params.append(per_page + 1)
+
+    direction = "DESC" if descending else "ASC"
+    query = f"""
+        SELECT id, title, description, completed_at, created_at, updated_at
+        FROM tasks
+        WHERE {' AND '.join(conditions)}
+        ORDER BY {column} {direction}, id {direction}
+        LIMIT %s
+    """
+    return query, tuple(params)
+
+
+def paginate_task_rows(
+    rows, after=None, before=None, per_page=DEFAULT_PAGE_SIZE, sort=DEFAULT_SORT
+):
+    """
+    Turn the rows of build_task_page_query into a display-ordered page.
+
+    Returns:
+        (tasks, next_cursor, prev_cursor) tuple; cursors are None at the ends
+    """
+    has_more = len(rows) > per_page
+    # Task instances (or plain dicts from db_async), which any cache
+    # backend can pickle
+    tasks = rows[:per_page]
+    if not tasks:
+        return tasks, None, None
+
+    if before and not after:
+        tasks.reverse()
+        next_cursor = encode_cursor(tasks[-1], sort)
+        prev_cursor = encode_cursor(tasks[0], sort) if has_more else None
+    else:
+        next_cursor = encode_cursor(tasks[-1], sort) if has_more else None
+        prev_cursor = encode_cursor(tasks[0], sort) if after else None
+    return tasks, next_cursor, prev_cursor
+
+
+def fetch_task_page(
+    user_id, after=None, before=None, per_page=DEFAULT_PAGE_SIZE, options=None
+):
+    """
+    Fetch one page of a user's tasks using keyset pagination.
+
+    Returns:
+        (tasks, next_cursor, prev_cursor) tuple; cursors are None at the ends
+    """
+    query, params = build_task_page_query(user_id, after, before, per_page, options)
+    sort = (options or {}).get("sort", DEFAULT_SORT)
+    return paginate_task_rows(
+        execute_query(query, params, prepare=True, row_type=Task),
+        after,
+        before,
+        per_page,
+        sort,
+    )
+
+
+def page_cache_key(after, before, per_page, options, version=None):
+    """
+    Cache key parts of one task list page, within tasks_cache_namespace.
+
+    Args:
+        version: The user's tasks version row (see current_tasks_version),
+            or None if unknown. Keying on it means a write made through
+            another process, which can't clear this process's cache, still
+            misses here instead of serving a stale page under a fresh ETag.
+    """
+    return (
+        "page",
+        version_number(version),
+        after,
+        before,
+        per_page,
+        *sorted((options or {}).items()),
+    )
+
+
+def version_number(version):
+    """The version counter of a tasks version row, or None if unknown."""
+    return version["version"] if version is not None else None
+
+
+def current_tasks_version():
+    """
+    Look up the logged-in user's tasks version.
+
+    Returns:
+        Row with version and updated_at, or None if it can't be read
+    """
+    try:
+        return get_table_version("tasks", current_user_id())
+    except psycopg2.Error:
+        return None
+
+
+def tasks_validators(version):
+    """
+    Build the validators for task list responses from a tasks version row.
+
+    The version only moves with writes to the user's own tasks; the ETag
+    also names the user, so one user's cached page is never revalidated for
+    another.
+
+    Returns:
+        (etag, last_modified) tuple, or (None, None) if the version is unknown
+        or the response will carry flash messages that must not be cached
+    """
+    if version is None or session.get("_flashes"):
+        return None, None
+    return task_list_etag(current_user_id(), version), version["updated_at"]
+
+
+def task_list_etag(user_id, version):
+    """ETag of a user's task list at a tasks table version."""
+    return f"tasks-{user_id}-{version['version']}"
+
+
+def is_not_modified(etag, last_modified):
+    """Check the request's conditional headers against the validators."""
+    # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def with_validators(response, etag, last_modified):
+    """Attach ETag/Last-Modified and require revalidation on every use."""
+    if etag:
+        response.set_etag(etag, weak=True)
+        response.last_modified = last_modified
+        response.cache_control.no_cache = True
+        # Pages are per user; shared caches must not store them
+        response.cache_control.private = True
+    return response
+
+
+def buffer_chunks(chunks, size=STREAM_CHUNK_SIZE):
+    """Join many small string chunks into pieces of roughly `size` characters."""
+    buffer = []
+    buffered = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield "".join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield "".join(buffer)
+
+
 @tasks_bp.route("/", methods=["GET"])
 def list_tasks():
-    """Display all tasks."""
+    """
+    Display one page of tasks, or every task with ?all=1.
+
+    The page can be filtered and sorted (see parse_list_options).
+    Conditional requests are answered with 304 Not Modified from the tasks
+    version alone, before any task rows are queried or rendered.
+    """
+    version = current_tasks_version()
+    etag, last_modified = tasks_validators(version)
+    if etag and is_not_modified(etag, last_modified):
+        return with_validators(make_response("", 304), etag, last_modified)
+
+    if request.args.get("all"):
+        return with_validators(stream_all_tasks(), etag, last_modified)
+
+    errors, options = parse_list_options(request.args)
+    if errors:
+        for error_msg in errors.values():
+            flash(error_msg, "error")
+        return render_template("tasks/index.html", tasks=[]), 400
+
+    per_page = parse_page_size(request.args.get("per_page"))
+    after = decode_cursor(request.args.get("after"), options["sort"])
+    before = decode_cursor(request.args.get("before"), options["sort"])
+    user_id = current_user_id()
     try:
-        query = """
-            SELECT id, title, description, completed_at, created_at, updated_at
-            FROM tasks
-            ORDER BY created_at DESC
-        """
-        tasks = execute_query(query)
-        return render_template("tasks/index.html", tasks=tasks)
+        tasks, next_cursor, prev_cursor = get_cache().get_or_load(
+            tasks_cache_namespace(user_id),
+            page_cache_key(after, before, per_page, options, version),
+            lambda: fetch_task_page(
+                user_id, after=after, before=before, per_page=per_page, options=options
+            ),
+        )
+        response = make_response(
+            render_template(
+                "tasks/index.html",
+                tasks=tasks,
+                next_cursor=next_cursor,
+                prev_cursor=prev_cursor,
+                per_page=per_page,
+                page_args=list_query_args(options),
+            )
+        )
+        return with_validators(response, etag, last_modified)
 
     except psycopg2.Error:
         flash("Database error: Unable to load tasks", "error")
         return render_template("tasks/index.html", tasks=[]), 500
+
+
+@tasks_bp.route("/events", methods=["GET"])
+def task_events():
+    """
+    Stream changes to the logged-in user's tasks as Server-Sent Events.
+
+    Events carry the operation and, for small changes, the task ids; a
+    "reload" event means some were missed. Every stream in the process is
+    fed by one shared LISTEN connection (see live.py), so watchers don't
+    poll the task list. Off unless LIVE_UPDATES_ENABLED is set; past
+    LIVE_MAX_SUBSCRIBERS open streams, clients get a 503 with Retry-After.
+    """
+    if not live.enabled():
+        abort(404)
+    try:
+        subscription = live.get_hub().subscribe(current_user_id())
+    except live.HubFull:
+        return reject(503, "Too many live update streams", live.RETRY_AFTER)
+    response = Response(
+        live.event_stream(
+            subscription,
+            current_app.config.get("LIVE_HEARTBEAT", live.LIVE_HEARTBEAT),
+        ),
+        mimetype="text/event-stream",
+    )
+    # Also unsubscribes a stream the server never started sending
+    response.call_on_close(subscription.close)
+    response.cache_control.no_cache = True
+    # Stop nginx from buffering the stream
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+def stream_all_tasks():
+    """
+    Render every task of the logged-in user as a streamed response.
+
+    Rows come from a server-side cursor and are rendered as they arrive, so
+    memory stays bounded by one cursor batch. Since the status line has been
+    sent by then, a database error mid-stream truncates the page instead of
+    producing a 500.
+    """
+    tasks = stream_query(ALL_TASKS_QUERY, (current_user_id(),), row_type=Task)
+    return Response(
+        buffer_chunks(stream_template("tasks/index.html", tasks=tasks)),
+        mimetype="text/html",
+    )
+
+
+def build_tsquery(text):
+    """
+    Turn free text into a prefix-matching tsquery, e.g. "writ te" becomes
+    "writ:* & te:*", so partially typed words match for typeahead.
+
+    Only word characters are kept, so user input can never produce a tsquery
+    syntax error.
+
+    Returns:
+        tsquery text, or None if `text` has no searchable words
+    """
+    terms = _SEARCH_TERM_RE.findall(text or "")[:MAX_SEARCH_TERMS]
+    if not terms:
+        return None
+    return " & ".join(f"{term.lower()}:*" for term in terms)
+
+
+def encode_search_cursor(task):
+    """Encode a search result's (rank, id) sort key as an opaque cursor."""
+    return f"{task['rank']!r},{task['id']}"
+
+
+def decode_search_cursor(value):
+    """
+    Decode a cursor produced by encode_search_cursor.
+
+    Returns:
+        (rank, id) tuple, or None if the cursor is missing or malformed
+    """
+    if not value:
+        return None
+    try:
+        rank, task_id = value.split(",", 1)
+        return float(rank), int(task_id)
+    except ValueError:
+        return None
+
+
+def build_search_query(user_id, tsquery, after=None, per_page=DEFAULT_PAGE_SIZE):
+    """
+    Build the query for one page of a user's tasks matching `tsquery`.
+
+    Matches come from the GIN index on (user_id, search_vector), so only the
+    user's own matches are read, and are ordered by ts_rank, ties broken by
+    id. Later pages seek past the (rank, id) of the previous page's last row
+    instead of using OFFSET. One row more than `per_page` is fetched to tell
+    whether there is a next page.
+
+    Args:
+        user_id: Owner of the tasks
+        tsquery: Query text from build_tsquery
+        after: (rank, id) key; return matches ranked below it
+        per_page: Number of tasks per page
+
+    Returns:
+        (query, params) tuple
+    """
+    params = [SEARCH_CONFIG, tsquery, user_id]
+    seek = ""
+    if after:
+        # rank is a real; compare as one so the cursor value round-trips
+        seek = "WHERE (rank, id) < (%s::real, %s)"
+        params.extend(after)
+    params.append(per_page + 1)
+    query = f"""
+        SELECT id, title, description, completed_at, created_at, updated_at, rank
+        FROM (
+            SELECT id, title, description, completed_at, created_at, updated_at,
+                   ts_rank(search_vector, query) AS rank
+            FROM tasks, to_tsquery(%s, %s) AS query
+            WHERE search_vector @@ query AND user_id = %s
+        ) AS matches
+        {seek}
+        ORDER BY rank DESC, id DESC
+        LIMIT %s
+    """
+    return query, params
+
+
+def search_task_page(user_id, tsquery, after=None, per_page=DEFAULT_PAGE_SIZE):
+    """
+    Fetch one page of a user's tasks matching `tsquery`, best match first.
+
+    Returns:
+        (tasks, next_cursor) tuple; next_cursor is None on the last page
+    """
+    query, params = build_search_query(user_id, tsquery, after, per_page)
+    rows = execute_query(query, params, prepare=True)
+    tasks = [dict(row) for row in rows[:per_page]]
+    next_cursor = encode_search_cursor(tasks[-1]) if len(rows) > per_page else None
+    return tasks, next_cursor
+
+
+def cached_search(user_id, text, after, per_page, version=None):
+    """
+    Search a user's tasks through the task list cache.
+
+    Args:
+        version: The user's tasks version row, keyed on as in page_cache_key
+
+    Returns:
+        (tasks, next_cursor) tuple; no tasks when `text` has no words
+    """
+    tsquery = build_tsquery(text)
+    if tsquery is None:
+        return [], None
+    return get_cache().get_or_load(
+        tasks_cache_namespace(user_id),
+        ("search", version_number(version), tsquery, after, per_page),
+        lambda: search_task_page(user_id, tsquery, after=after, per_page=per_page),
+    )
+
+
+@tasks_bp.route("/search", methods=["GET"])
+def search_tasks():
+    """Search task titles and descriptions with ?q=."""
+    query = request.args.get("q", "").strip()
+    per_page = parse_page_size(request.args.get("per_page"))
+    after = decode_search_cursor(request.args.get("after"))
+    try:
+        tasks, next_cursor = cached_search(
+            current_user_id(), query, after, per_page, current_tasks_version()
+        )
+    except psycopg2.Error:
+        flash("Database error: Unable to search tasks", "error")
+        return render_template("tasks/search.html", tasks=[], query=query), 500
+    return render_template(
+        "tasks/search.html",
+        tasks=tasks,
+        query=query,
+        next_cursor=next_cursor,
+        per_page=per_page,
+    )
+
+
+def detect_import_format(requested, filename, mimetype):
+    """
+    Work out the format of an import upload.
+
+    An explicit ?format= wins, then the file extension, then the MIME type.
+
+    Returns:
+        "csv", "ndjson", or None if the requested format is unsupported
+    """
+    if requested:
+        return requested if requested in IMPORT_FORMATS else None
+    if filename and filename.lower().endswith(".csv"):
+        return "csv"
+    if mimetype == "text/csv":
+        return "csv"
+    return "ndjson"
+
+
+def iter_import_rows(stream, fmt):
+    """
+    Parse an uploaded import file row by row.
+
+    Args:
+        stream: Binary file-like object with the upload
+        fmt: "csv" (with a title,description header) or "ndjson"
+
+    Yields:
+        (line_number, row_dict, parse_error) tuples; row_dict is None when
+        the line could not be parsed
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+
+    for line_number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_number, None, "Invalid JSON"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, None, "Expected a JSON object"
+            continue
+        yield line_number, row, None
+
+
+def iter_copy_lines(rows, report, user_id):
+    """
+    Validate parsed import rows and encode the valid ones for COPY.
+
+    Invalid rows are counted and recorded in `report` instead of being loaded.
+
+    Yields:
+        CSV lines of (title, description, user_id) for COPY ... FROM STDIN
+    """
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    for line_number, row, parse_error in rows:
+        if parse_error:
+            errors = {"row": parse_error}
+        else:
+            errors, cleaned_data = validate_task_form(task_form_from_record(row))
+
+        if errors:
+            report["failed"] += 1
+            if len(report["errors"]) < MAX_REPORTED_IMPORT_ERRORS:
+                report["errors"].append({"line": line_number, "errors": errors})
+            continue
+
+        # An unquoted empty field is NULL in COPY CSV, matching create_task
+        writer.writerow(
+            (cleaned_data["title"], cleaned_data["description"] or None, user_id)
+        )
+        report["imported"] += 1
+        yield out.getvalue()
+        out.seek(0)
+        out.truncate()
+
+
+@tasks_bp.route("/import", methods=["POST"])
+def import_tasks():
+    """
+    Bulk-create tasks from a CSV or NDJSON upload.
+
+    Accepts either a multipart "file" field or the raw request body. Rows are
+    validated with validate_task_form; valid ones are loaded with a single
+    COPY in one transaction while invalid ones are reported per line.
+    """
+    upload = request.files.get("file")
+    if upload:
+        stream, filename, mimetype = upload.stream, upload.filename, upload.mimetype
+    else:
+        stream, filename, mimetype = request.stream, None, request.mimetype
+
+    fmt = detect_import_format(request.args.get("format"), filename, mimetype)
+    if fmt is None:
+        return jsonify(error=f"Unsupported format, use one of {IMPORT_FORMATS}"), 400
+
+    report = {"imported": 0, "failed": 0, "errors": []}
+    user_id = current_user_id()
+    started = time.perf_counter()
+    try:
+        copy_in(
+            "COPY tasks (title, description, user_id) FROM STDIN WITH (FORMAT csv)",
+            iter_copy_lines(iter_import_rows(stream, fmt), report, user_id),
+        )
+    except (psycopg2.Error, UnicodeDecodeError, csv.Error) as error:
+        # The COPY ran in a single transaction, so nothing was loaded
+        return (
+            jsonify(
+                error=f"Import failed: {error}", imported=0, failed=report["failed"]
+            ),
+            500 if isinstance(error, psycopg2.Error) else 400,
+        )
+    elapsed = time.perf_counter() - started
+    if report["imported"]:
+        get_cache().invalidate(tasks_cache_namespace(user_id))
+
+    return jsonify(
+        imported=report["imported"],
+        failed=report["failed"],
+        errors=report["errors"],
+        errors_truncated=report["failed"] > len(report["errors"]),
+        elapsed_ms=round(elapsed * 1000, 3),
+        rows_per_second=round(report["imported"] / elapsed) if elapsed else None,
+    )
+
+
+def build_export_query(
+    fmt, user_id=None, completed=None, created_after=None, created_before=None
+):
+    """
+    Build the COPY statement for a task export.
+
+    Only fixed SQL fragments are emitted; filter values are passed as params.
+
+    Args:
+        fmt: "csv" (with header) or "ndjson" (one JSON object per line)
+        user_id: Only this user's tasks; None exports every user's
+        completed: True/False to keep only completed/open tasks
+        created_after: Keep tasks created at or after this datetime
+        created_before: Keep tasks created before this datetime
+
+    Returns:
+        (query, params) tuple
+    """
+    conditions, params = task_filter_conditions(
+        user_id, completed, created_after, created_before
+    )
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    select = f"""
+        SELECT id, title, description, completed_at, created_at, updated_at
+        FROM tasks
+        {where}
+        ORDER BY created_at DESC, id DESC
+    """
+    if fmt == "csv":
+        return f"COPY ({select}) TO STDOUT WITH (FORMAT csv, HEADER)", params
+    # Text-format COPY would backslash-escape the JSON; CSV with quote and
+    # delimiter characters that never occur in JSON output passes it verbatim.
+    return (
+        f"COPY (SELECT row_to_json(t) FROM ({select}) t) TO STDOUT "
+        f"WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')",
+        params,
+    )
+
+
+def parse_export_filters(args):
+    """
+    Parse export filters from request arguments.
+
+    Returns:
+        (errors_dict, filters_dict) tuple
+    """
+    errors = {}
+    filters = {}
+
+    completed = args.get("completed", "").lower()
+    if completed in ("true", "1", "yes"):
+        filters["completed"] = True
+    elif completed in ("false", "0", "no"):
+        filters["completed"] = False
+    elif completed:
+        errors["completed"] = "completed must be true or false"
+    parse_created_range(args, errors, filters)
+
+    return errors, filters
+
+
+@tasks_bp.route("/export", methods=["GET"])
+def export_tasks():
+    """
+    Export the logged-in user's tasks as CSV or NDJSON.
+
+    Postgres formats the rows itself via COPY ... TO STDOUT and the output is
+    piped to the client in chunks, so memory use is constant in table size.
+    """
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        return jsonify(error=f"Unsupported format, use one of {EXPORT_FORMATS}"), 400
+    errors, filters = parse_export_filters(request.args)
+    if errors:
+        return jsonify(errors=errors), 400
+
+    query, params = build_export_query(fmt, user_id=current_user_id(), **filters)
+    return Response(
+        stream_copy(query, params),
+        mimetype=EXPORT_MIMETYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename=tasks.{fmt}"},
+    )
+
+
+@tasks_bp.cli.command("export")
+@click.option("--format", "fmt", type=click.Choice(EXPORT_FORMATS), default="csv")
+@click.option("--completed/--open", default=None, help="Only completed/open tasks.")
+@click.option("--created-after", type=click.DateTime(), default=None)
+@click.option("--created-before", type=click.DateTime(), default=None)
+@click.option("--user-id", type=int, default=None, help="Only this user's tasks.")
+@click.option("--output", "-o", default="-", help="Output file (default stdout).")
+def export_tasks_command(
+    fmt, completed, created_after, created_before, user_id, output
+):
+    """Export tasks as CSV or NDJSON using COPY TO STDOUT."""
+    query, params = build_export_query(
+        fmt,
+        user_id=user_id,
+        completed=completed,
+        created_after=created_after,
+        created_before=created_before,
+    )
+    with click.open_file(output, "wb") as destination:
+        copy_to(query, params, destination)
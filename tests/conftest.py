@@ -6,23 +6,62 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app import create_app
+import db
+
+
+@pytest.fixture(autouse=True)
+def reset_db_pool():
+    """Drop the shared connection pool so tests never share connections."""
+    yield
+    db.close_pool()
+
+
+# Config of every test app
+TEST_CONFIG = {"TESTING": True, "SECRET_KEY": "test-secret-key"}
 
 
 @pytest.fixture
 def app():
     """Create and configure a test Flask app."""
-    app = create_app()
-    app.config["TESTING"] = True
-    app.config["SECRET_KEY"] = "test-secret-key"
-    return app
+    return create_app(TEST_CONFIG)
 
 
 @pytest.fixture
-def client(app):
-    """Create a test client for the Flask app."""
+def make_app():
+    """
+    Return a factory of test apps with extra config keys.
+
+    Extensions keep their settings in module state, so a default test app
+    is created afterwards to put them back.
+    """
+
+    def make(**config):
+        return create_app({**TEST_CONFIG, **config})
+
+    yield make
+    create_app(TEST_CONFIG)
+
+
+# Id of the user the `client` fixture is logged in as
+TEST_USER_ID = 1
+
+
+@pytest.fixture
+def anonymous_client(app):
+    """Create a test client for the Flask app that is not logged in."""
     return app.test_client()
 
 
+@pytest.fixture
+def client(app):
+    """Create a test client logged in as TEST_USER_ID."""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = TEST_USER_ID
+        session["email"] = "user@example.com"
+    return client
+
+
 @pytest.fixture
 def runner(app):
     """Create a test CLI runner for the Flask app."""
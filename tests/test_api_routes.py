@@ -0,0 +1,318 @@
+"""Unit tests for the JSON task API."""
+
+import json
+from unittest.mock import patch
+import psycopg2
+import pytest
+from datetime import datetime
+
+from api_routes import dumps, parse_fields, parse_ids
+from tests.conftest import TEST_USER_ID
+
+
+def make_task(task_id, title="Task"):
+    """Build a task row as returned by the database helpers."""
+    return {
+        "id": task_id,
+        "title": f"{title} {task_id}",
+        "description": None,
+        "completed_at": None,
+        "created_at": datetime(2024, 1, task_id),
+        "updated_at": datetime(2024, 1, task_id),
+    }
+
+
+@pytest.fixture(autouse=True)
+def mock_table_version():
+    """Stub the tasks version lookup so list requests never touch the DB."""
+    with patch("tasks_routes.get_table_version", return_value=None) as mock:
+        yield mock
+
+
+class TestApiHelpers:
+    """Test suite for API parsing and serialization helpers."""
+
+    def test_parse_fields(self):
+        """Test field selection is validated against the task columns."""
+        assert parse_fields("id, title,id") == (None, ("id", "title"))
+        error, fields = parse_fields("id,password")
+        assert "password" in error
+        assert fields is None
+
+    def test_parse_ids(self):
+        """Test ids are parsed, de-duplicated and bounded."""
+        assert parse_ids("3,1,3") == (None, [3, 1])
+        assert parse_ids("1,x")[0] is not None
+        assert parse_ids(",".join(str(i) for i in range(501)))[0] is not None
+
+    def test_dumps_serializes_datetimes(self):
+        """Test datetimes are emitted as ISO 8601 strings."""
+        payload = json.loads(dumps({"at": datetime(2024, 1, 2, 3, 4, 5)}))
+
+        assert payload == {"at": "2024-01-02T03:04:05"}
+
+
+class TestApiListTasks:
+    """Test suite for GET /api/tasks."""
+
+    @patch("api_routes.fetch_task_page")
+    def test_list_tasks_page(self, mock_fetch_task_page, client):
+        """Test a page of tasks is returned with its cursors."""
+        mock_fetch_task_page.return_value = ([make_task(1)], "next", None)
+
+        response = client.get("/api/tasks?per_page=1")
+
+        assert response.status_code == 200
+        assert response.json["tasks"][0]["title"] == "Task 1"
+        assert response.json["next_cursor"] == "next"
+        assert mock_fetch_task_page.call_args.args == (TEST_USER_ID,)
+        assert mock_fetch_task_page.call_args.kwargs["per_page"] == 1
+
+    def test_requires_login(self, anonymous_client):
+        """Test anonymous API calls are refused with a JSON 401."""
+        response = anonymous_client.get("/api/tasks")
+
+        assert response.status_code == 401
+        assert response.json == {"error": "Authentication required"}
+
+    @patch("api_routes.fetch_task_page")
+    def test_list_tasks_fields(self, mock_fetch_task_page, client):
+        """Test ?fields= trims each task to the selected fields."""
+        mock_fetch_task_page.return_value = ([make_task(1)], None, None)
+
+        response = client.get("/api/tasks?fields=id,title")
+
+        assert response.json["tasks"] == [{"id": 1, "title": "Task 1"}]
+
+    @patch("api_routes.fetch_task_page")
+    def test_list_tasks_filters(self, mock_fetch_task_page, client):
+        """Test filters and sort are parsed and invalid ones rejected."""
+        mock_fetch_task_page.return_value = ([], None, None)
+
+        response = client.get("/api/tasks?status=completed&sort=title")
+        bad = client.get("/api/tasks?order=sideways")
+
+        assert response.status_code == 200
+        options = mock_fetch_task_page.call_args.kwargs["options"]
+        assert options["completed"] is True
+        assert options["sort"] == "title"
+        assert bad.status_code == 400
+        assert "order" in bad.json["errors"]
+
+    def test_list_tasks_unknown_field(self, client):
+        """Test an unknown field is rejected."""
+        response = client.get("/api/tasks?fields=secret")
+
+        assert response.status_code == 400
+
+    @patch("api_routes.execute_query")
+    def test_batch_get_by_ids(self, mock_execute_query, client):
+        """Test ?ids= fetches all tasks in one query, in request order."""
+        mock_execute_query.return_value = [make_task(1), make_task(3)]
+
+        response = client.get("/api/tasks?ids=3,2,1&fields=id")
+
+        assert response.json == {"tasks": [{"id": 3}, {"id": 1}], "missing": [2]}
+        mock_execute_query.assert_called_once()
+        query, params = mock_execute_query.call_args[0]
+        assert "id = ANY(%s)" in query
+        assert params == ([3, 2, 1], TEST_USER_ID)
+
+    @patch("api_routes.execute_query")
+    def test_database_error(self, mock_execute_query, client):
+        """Test database errors are reported as JSON 500s."""
+        mock_execute_query.side_effect = psycopg2.Error("down")
+
+        response = client.get("/api/tasks?ids=1")
+
+        assert response.status_code == 500
+        assert response.json == {"error": "Database error"}
+
+
+class TestApiSearch:
+    """Test suite for GET /api/tasks/search."""
+
+    @patch("tasks_routes.execute_query")
+    def test_search_returns_page(self, mock_execute_query, client):
+        """Test matches are returned best first with a cursor for more."""
+        rows = [dict(make_task(i), rank=0.1) for i in (2, 1)]
+        mock_execute_query.return_value = rows
+
+        response = client.get("/api/tasks/search?q=tas&per_page=1&fields=id")
+
+        assert response.status_code == 200
+        assert response.json == {"tasks": [{"id": 2}], "next_cursor": "0.1,2"}
+        assert mock_execute_query.call_args[0][1][1] == "tas:*"
+
+
+class TestApiSingleTask:
+    """Test suite for /api/tasks/<id> CRUD routes."""
+
+    @patch("tasks_routes.execute_query")
+    def test_get_task(self, mock_execute_query, client):
+        """Test a single task is returned."""
+        mock_execute_query.return_value = [make_task(4)]
+
+        response = client.get("/api/tasks/4?fields=title")
+
+        assert response.json == {"title": "Task 4"}
+        assert mock_execute_query.call_args[0][1] == (4, TEST_USER_ID)
+
+    @patch("tasks_routes.execute_query")
+    def test_get_task_not_found(self, mock_execute_query, client):
+        """Test a missing task returns 404."""
+        mock_execute_query.return_value = []
+
+        assert client.get("/api/tasks/4").status_code == 404
+
+    @patch("tasks_routes.execute_update")
+    def test_create_task(self, mock_execute_update, client):
+        """Test POST creates a task and points Location at it."""
+        mock_execute_update.return_value = [make_task(5)]
+
+        response = client.post(
+            "/api/tasks",
+            json={"title": "  New  ", "description": "", "completed": True},
+        )
+
+        assert response.status_code == 201
+        assert response.headers["Location"].endswith("/api/tasks/5")
+        assert mock_execute_update.call_args[0][1] == ("New", None, True, TEST_USER_ID)
+
+    @patch("tasks_routes.execute_update")
+    def test_create_task_without_row(self, mock_execute_update, client):
+        """Test an insert returning no row is a JSON 500, not a crash."""
+        mock_execute_update.return_value = []
+
+        response = client.post("/api/tasks", json={"title": "New"})
+
+        assert response.status_code == 500
+        assert response.json == {"error": "Failed to create task"}
+
+    def test_create_task_validation(self, client):
+        """Test POST applies the task form rules."""
+        response = client.post("/api/tasks", json={"title": "", "completed": "yes"})
+
+        assert response.status_code == 400
+        assert response.json["errors"] == {
+            "title": "Title is required",
+            "completed": "completed must be true or false",
+        }
+
+    def test_create_task_requires_object(self, client):
+        """Test a non-object body is rejected."""
+        assert client.post("/api/tasks", json=["title"]).status_code == 400
+
+    @patch("tasks_routes.execute_update")
+    def test_put_replaces_task(self, mock_execute_update, client):
+        """Test PUT updates every field in one UPDATE ... RETURNING."""
+        mock_execute_update.return_value = [make_task(2, "Renamed")]
+
+        response = client.put("/api/tasks/2", json={"title": "Renamed"})
+
+        assert response.status_code == 200
+        query, params = mock_execute_update.call_args[0]
+        assert "title = %s, description = %s, completed_at" in query
+        assert "RETURNING" in query
+        assert params == ["Renamed", None, False, 2, TEST_USER_ID]
+
+    @patch("tasks_routes.execute_update")
+    def test_patch_updates_given_fields(self, mock_execute_update, client):
+        """Test PATCH only touches the fields present in the body."""
+        mock_execute_update.return_value = [make_task(2)]
+
+        response = client.patch("/api/tasks/2", json={"completed": True})
+
+        assert response.status_code == 200
+        query, params = mock_execute_update.call_args[0]
+        assert "title" not in query.split("RETURNING")[0]
+        assert params == [True, 2, TEST_USER_ID]
+
+    def test_patch_validates_fields(self, client):
+        """Test PATCH validates the fields it was given."""
+        response = client.patch("/api/tasks/2", json={"description": "x" * 256})
+
+        assert response.status_code == 400
+        assert "description" in response.json["errors"]
+
+    def test_patch_requires_changes(self, client):
+        """Test PATCH with no known fields is rejected."""
+        assert client.patch("/api/tasks/2", json={"id": 9}).status_code == 400
+
+    @patch("tasks_routes.execute_update")
+    def test_update_not_found(self, mock_execute_update, client):
+        """Test updating a missing task returns 404."""
+        mock_execute_update.return_value = []
+
+        assert client.patch("/api/tasks/2", json={"title": "x"}).status_code == 404
+
+    @patch("tasks_routes.execute_update")
+    def test_delete_task(self, mock_execute_update, client):
+        """Test DELETE removes the task."""
+        mock_execute_update.return_value = [{"id": 2}]
+
+        response = client.delete("/api/tasks/2")
+
+        assert response.status_code == 204
+        assert mock_execute_update.call_args[0][1] == [2, TEST_USER_ID]
+
+    @patch("tasks_routes.execute_update")
+    def test_delete_task_not_found(self, mock_execute_update, client):
+        """Test deleting a missing task returns 404."""
+        mock_execute_update.return_value = []
+
+        assert client.delete("/api/tasks/2").status_code == 404
+
+    @patch("api_routes.fetch_task_page")
+    @patch("tasks_routes.execute_update")
+    def test_writes_invalidate_list_cache(
+        self, mock_execute_update, mock_fetch_task_page, client
+    ):
+        """Test API writes make the next list request reload."""
+        mock_fetch_task_page.return_value = ([], None, None)
+        mock_execute_update.return_value = [{"id": 2}]
+
+        client.get("/api/tasks")
+        client.delete("/api/tasks/2")
+        client.get("/api/tasks")
+
+        assert mock_fetch_task_page.call_count == 2
+
+    @patch("tasks_routes.execute_query")
+    @patch("tasks_routes.execute_update")
+    def test_patch_stale_version_conflicts(
+        self, mock_execute_update, mock_execute_query, client
+    ):
+        """Test a stale updated_at precondition returns 409."""
+        mock_execute_update.return_value = []
+        mock_execute_query.return_value = [(1,)]
+
+        response = client.patch(
+            "/api/tasks/2",
+            json={"title": "x", "updated_at": "2024-01-02T00:00:00.123456"},
+        )
+
+        assert response.status_code == 409
+        query, params = mock_execute_update.call_args[0]
+        assert "id = %s AND updated_at = %s" in query
+        assert params == ["x", 2, TEST_USER_ID, datetime(2024, 1, 2, 0, 0, 0, 123456)]
+
+    def test_patch_invalid_version(self, client):
+        """Test a malformed updated_at precondition is rejected."""
+        response = client.patch("/api/tasks/2", json={"title": "x", "updated_at": 5})
+
+        assert response.status_code == 400
+        assert "updated_at" in response.json["errors"]
+
+    @patch("tasks_routes.execute_query")
+    @patch("tasks_routes.execute_update")
+    def test_delete_stale_version_conflicts(
+        self, mock_execute_update, mock_execute_query, client
+    ):
+        """Test DELETE with a stale ?updated_at= returns 409."""
+        mock_execute_update.return_value = []
+        mock_execute_query.return_value = [(1,)]
+
+        response = client.delete("/api/tasks/2?updated_at=2024-01-02T00:00:00")
+
+        assert response.status_code == 409
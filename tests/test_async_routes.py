@@ -0,0 +1,216 @@
+"""Unit tests for the async data layer and task views."""
+
+import asyncio
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+import pytest
+
+pytest.importorskip("psycopg_pool")
+pytest.importorskip("asgiref")
+
+import psycopg
+
+import db_async
+from tests.conftest import TEST_USER_ID
+
+
+def make_task(task_id):
+    """Build a task row as returned by psycopg 3 with dict_row."""
+    return {
+        "id": task_id,
+        "title": f"Task {task_id}",
+        "description": None,
+        "completed_at": None,
+        "created_at": datetime(2024, 1, task_id),
+        "updated_at": datetime(2024, 1, task_id),
+    }
+
+
+def make_async_pool():
+    """Return a mock async pool handing out one mock connection."""
+    conn = MagicMock()
+    conn.closed = False
+    conn.commit = AsyncMock()
+    conn.rollback = AsyncMock()
+    cursor = MagicMock()
+    cursor.execute = AsyncMock()
+    cursor.rowcount = 1
+    cursor.fetchall = AsyncMock(return_value=[{"id": 1}])
+    conn.cursor.return_value.__aenter__ = AsyncMock(return_value=cursor)
+    conn.cursor.return_value.__aexit__ = AsyncMock(return_value=False)
+    pool = MagicMock()
+    pool.getconn = AsyncMock(return_value=conn)
+    pool.putconn = AsyncMock()
+    return pool, conn, cursor
+
+
+class TestAsyncGetCursor:
+    """Test suite for db_async.get_cursor and its helpers."""
+
+    @patch("db_async.get_pool", new_callable=AsyncMock)
+    def test_execute_query_returns_rows_and_releases(self, mock_get_pool):
+        """Test a SELECT runs on a pooled connection that is put back."""
+        pool, conn, cursor = make_async_pool()
+        mock_get_pool.return_value = pool
+
+        rows = asyncio.run(db_async.execute_query("SELECT 1 WHERE %s", (True,)))
+
+        assert rows == [{"id": 1}]
+        cursor.execute.assert_awaited_once_with("SELECT 1 WHERE %s", (True,))
+        conn.rollback.assert_awaited_once()
+        conn.commit.assert_not_awaited()
+        pool.putconn.assert_awaited_once_with(conn)
+
+    @patch("db_async.get_pool", new_callable=AsyncMock)
+    def test_unit_of_work_runs_on_pool_loop(self, mock_get_pool):
+        """Test checkout, query and return all run on the pool's loop."""
+        pool, conn, cursor = make_async_pool()
+        mock_get_pool.return_value = pool
+        loops = []
+
+        def record_loop(*args):
+            loops.append(asyncio.get_running_loop())
+            return conn
+
+        pool.getconn.side_effect = record_loop
+        cursor.execute.side_effect = record_loop
+        pool.putconn.side_effect = record_loop
+
+        asyncio.run(db_async.execute_query("SELECT 1"))
+
+        assert loops == [db_async._get_loop()] * 3
+
+    def test_get_cursor_refuses_other_loops(self):
+        """Test get_cursor can't hand a pool connection to a request's loop."""
+
+        async def use_cursor():
+            async with db_async.get_cursor():
+                pass
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(use_cursor())
+
+    @patch("db_async.db.note_write")
+    @patch("db_async.get_pool", new_callable=AsyncMock)
+    def test_execute_update_commits(self, mock_get_pool, mock_note_write):
+        """Test writes are committed and pin the session to the primary."""
+        pool, conn, cursor = make_async_pool()
+        mock_get_pool.return_value = pool
+
+        asyncio.run(db_async.execute_update("DELETE FROM tasks"))
+
+        conn.commit.assert_awaited_once()
+        mock_note_write.assert_called_once()
+
+    @patch("db_async.get_pool", new_callable=AsyncMock)
+    def test_error_rolls_back_and_releases(self, mock_get_pool):
+        """Test a failing statement is rolled back and the connection returned."""
+        pool, conn, cursor = make_async_pool()
+        cursor.execute.side_effect = psycopg.OperationalError("boom")
+        mock_get_pool.return_value = pool
+
+        with pytest.raises(psycopg.OperationalError):
+            asyncio.run(db_async.execute_update("DELETE FROM tasks"))
+
+        conn.commit.assert_not_awaited()
+        conn.rollback.assert_awaited_once()
+        pool.putconn.assert_awaited_once_with(conn)
+
+    def test_run_on_db_loop_uses_pool_loop(self):
+        """Test coroutines are executed on the shared db loop thread."""
+
+        async def current_loop():
+            return asyncio.get_running_loop()
+
+        loop = asyncio.run(db_async.run_on_db_loop(current_loop()))
+
+        assert loop is db_async._get_loop()
+
+
+class TestAsyncTaskRoutes:
+    """Test suite for the async task views."""
+
+    @patch("async_routes.db_async.get_table_version", new_callable=AsyncMock)
+    @patch("async_routes.db_async.execute_query", new_callable=AsyncMock)
+    def test_list_tasks(self, mock_execute_query, mock_get_version, client):
+        """Test the async list renders a keyset page with async links."""
+        mock_get_version.return_value = None
+        mock_execute_query.return_value = [make_task(3), make_task(2), make_task(1)]
+
+        response = client.get("/async/tasks/?per_page=2")
+
+        assert response.status_code == 200
+        assert b"Task 3" in response.data
+        assert b"Task 1" not in response.data
+        assert b"/async/tasks/?after=" in response.data
+        query, params = mock_execute_query.await_args.args
+        assert "LIMIT %s" in query
+        assert params == (TEST_USER_ID, 3)
+
+    @patch("async_routes.db_async.get_table_version", new_callable=AsyncMock)
+    def test_list_tasks_not_modified(self, mock_get_version, client):
+        """Test a matching ETag is answered with 304."""
+        mock_get_version.return_value = {
+            "version": 7,
+            "updated_at": datetime(2024, 1, 1),
+        }
+
+        response = client.get(
+            "/async/tasks/", headers={"If-None-Match": 'W/"tasks-1-7"'}
+        )
+
+        assert response.status_code == 304
+
+    @patch("async_routes.db_async.get_table_version", new_callable=AsyncMock)
+    @patch("async_routes.db_async.execute_query", new_callable=AsyncMock)
+    def test_list_tasks_database_error(
+        self, mock_execute_query, mock_get_version, client
+    ):
+        """Test database errors render the empty list with a 500."""
+        mock_get_version.return_value = None
+        mock_execute_query.side_effect = psycopg.OperationalError("down")
+
+        response = client.get("/async/tasks/")
+
+        assert response.status_code == 500
+
+    @patch("async_routes.db_async.execute_update", new_callable=AsyncMock)
+    def test_create_task(self, mock_execute_update, client):
+        """Test a valid form inserts the task and redirects to the async list."""
+        mock_execute_update.return_value = [make_task(1)]
+
+        response = client.post("/async/tasks/", data={"title": "Write tests"})
+
+        assert response.status_code == 302
+        assert response.location.endswith("/async/tasks/")
+        assert mock_execute_update.await_args.args[1] == (
+            "Write tests",
+            None,
+            False,
+            TEST_USER_ID,
+        )
+
+    @patch("async_routes.insert_task")
+    @patch("async_routes.db_async.execute_update", new_callable=AsyncMock)
+    def test_create_task_batched(
+        self, mock_execute_update, mock_insert_task, app, client
+    ):
+        """Test creates join the sync views' batches when batching is on."""
+        mock_insert_task.return_value = make_task(1)
+
+        with patch("async_routes.batching.enabled", return_value=True):
+            response = client.post("/async/tasks/", data={"title": "Write tests"})
+
+        assert response.status_code == 302
+        mock_insert_task.assert_called_once_with(
+            "Write tests", None, False, TEST_USER_ID
+        )
+        mock_execute_update.assert_not_awaited()
+
+    @patch("async_routes.db_async.execute_update", new_callable=AsyncMock)
+    def test_create_task_validation(self, mock_execute_update, client):
+        """Test an empty title is rejected without touching the database."""
+        response = client.post("/async/tasks/", data={"title": ""})
+
+        assert response.status_code == 400
+        mock_execute_update.assert_not_awaited()
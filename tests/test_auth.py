@@ -0,0 +1,204 @@
+"""Unit tests for session login and per-user scoping."""
+
+from unittest.mock import patch
+import psycopg2
+from werkzeug.security import generate_password_hash
+
+import passwords
+from auth import authenticate, safe_next_url, validate_credentials
+
+
+def make_user(password="correct horse", method=passwords.PASSWORD_HASH_METHOD):
+    """Build a users row as returned by the database helpers."""
+    return {
+        "id": 5,
+        "email": "ada@example.com",
+        "hashed_password": generate_password_hash(password, method),
+    }
+
+
+class TestAuthHelpers:
+    """Test suite for credential checks and redirects."""
+
+    @patch("auth.execute_query")
+    def test_authenticate(self, mock_execute_query):
+        """Test a matching password returns the user, a wrong one None."""
+        mock_execute_query.return_value = [make_user()]
+
+        assert authenticate(" Ada@Example.com ", "correct horse") == {
+            "id": 5,
+            "email": "ada@example.com",
+        }
+        assert authenticate("ada@example.com", "wrong") is None
+        assert mock_execute_query.call_args[0][1] == ("ada@example.com",)
+
+    @patch("auth.passwords.verify_password", return_value=False)
+    @patch("auth.execute_query")
+    def test_authenticate_unknown_email_still_hashes(
+        self, mock_execute_query, mock_check
+    ):
+        """Test unknown emails cost a hash check too, so timing leaks nothing."""
+        mock_execute_query.return_value = []
+
+        assert authenticate("nobody@example.com", "secret") is None
+        mock_check.assert_called_once()
+
+    @patch("auth.execute_update")
+    @patch("auth.execute_query")
+    def test_authenticate_rehashes_outdated_cost(
+        self, mock_execute_query, mock_execute_update
+    ):
+        """Test a hash made with other parameters is replaced on login."""
+        user = make_user(method="pbkdf2:sha256:1000")
+        mock_execute_query.return_value = [user]
+
+        assert authenticate("ada@example.com", "correct horse")["id"] == 5
+
+        query, params = mock_execute_update.call_args[0]
+        assert "WHERE id = %s AND hashed_password = %s" in query
+        assert params[0].startswith(passwords.get_hasher().method + "$")
+        assert params[1:] == (5, user["hashed_password"])
+
+    @patch("auth.execute_update")
+    @patch("auth.execute_query")
+    def test_authenticate_keeps_current_hash(
+        self, mock_execute_query, mock_execute_update
+    ):
+        """Test a hash with the current parameters is left alone."""
+        mock_execute_query.return_value = [make_user()]
+
+        assert authenticate("ada@example.com", "correct horse") is not None
+        mock_execute_update.assert_not_called()
+
+    @patch("auth.execute_update", side_effect=psycopg2.Error("down"))
+    @patch("auth.execute_query")
+    def test_failed_rehash_still_logs_in(self, mock_execute_query, mock_execute_update):
+        """Test a failed rehash leaves the old hash and lets the user in."""
+        mock_execute_query.return_value = [make_user(method="pbkdf2:sha256:1000")]
+
+        assert authenticate("ada@example.com", "correct horse") is not None
+
+    def test_validate_credentials(self):
+        """Test email and minimum password length are validated."""
+        assert validate_credentials("ada@example.com", "long enough") == {}
+        assert set(validate_credentials("ada", "short")) == {"email", "password"}
+
+    def test_safe_next_url(self):
+        """Test only local paths are accepted as post-login redirects."""
+        assert safe_next_url("/tasks/?sort=title") == "/tasks/?sort=title"
+        assert safe_next_url("https://evil.example") is None
+        assert safe_next_url("//evil.example") is None
+        assert safe_next_url("") is None
+
+
+class TestAuthRoutes:
+    """Test suite for login, logout and registration."""
+
+    def test_task_views_require_login(self, anonymous_client):
+        """Test anonymous requests are redirected to the login form."""
+        response = anonymous_client.get("/tasks/?sort=title")
+
+        assert response.status_code == 302
+        assert "/auth/login?next=" in response.location
+
+    @patch("auth.execute_query")
+    def test_login_starts_session(self, mock_execute_query, anonymous_client):
+        """Test valid credentials log in and follow ?next=."""
+        mock_execute_query.return_value = [make_user()]
+
+        response = anonymous_client.post(
+            "/auth/login",
+            data={
+                "email": "ada@example.com",
+                "password": "correct horse",
+                "next": "/tasks/new",
+            },
+        )
+
+        assert response.status_code == 302
+        assert response.location.endswith("/tasks/new")
+        with anonymous_client.session_transaction() as session:
+            assert session["user_id"] == 5
+
+    @patch("auth.execute_query")
+    def test_login_rejects_bad_password(self, mock_execute_query, anonymous_client):
+        """Test wrong credentials re-render the form without a session."""
+        mock_execute_query.return_value = [make_user()]
+
+        response = anonymous_client.post(
+            "/auth/login", data={"email": "ada@example.com", "password": "nope"}
+        )
+
+        assert response.status_code == 401
+        assert b"Invalid email or password" in response.data
+        with anonymous_client.session_transaction() as session:
+            assert "user_id" not in session
+
+    @patch("auth.authenticate", side_effect=passwords.HashingOverloaded)
+    def test_login_overloaded(self, mock_authenticate, anonymous_client):
+        """Test a full hashing queue answers 503 with Retry-After."""
+        response = anonymous_client.post(
+            "/auth/login", data={"email": "ada@example.com", "password": "x"}
+        )
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert b"Too many sign-ins" in response.data
+
+    @patch("auth.execute_query")
+    def test_login_database_error(self, mock_execute_query, anonymous_client):
+        """Test database errors render the form with a 500."""
+        mock_execute_query.side_effect = psycopg2.Error("down")
+
+        response = anonymous_client.post(
+            "/auth/login", data={"email": "ada@example.com", "password": "x"}
+        )
+
+        assert response.status_code == 500
+
+    def test_logout_clears_session(self, client):
+        """Test logging out ends the session."""
+        response = client.post("/auth/logout")
+
+        assert response.status_code == 302
+        with client.session_transaction() as session:
+            assert "user_id" not in session
+
+    @patch("auth.execute_update")
+    def test_register_creates_and_logs_in(self, mock_execute_update, anonymous_client):
+        """Test sign-up stores a password hash and logs the user in."""
+        mock_execute_update.return_value = [{"id": 8, "email": "new@example.com"}]
+
+        response = anonymous_client.post(
+            "/auth/register",
+            data={"email": "New@Example.com", "password": "long enough"},
+        )
+
+        assert response.status_code == 302
+        email, hashed = mock_execute_update.call_args[0][1]
+        assert email == "new@example.com"
+        assert hashed != "long enough"
+        with anonymous_client.session_transaction() as session:
+            assert session["user_id"] == 8
+
+    @patch("auth.execute_update")
+    def test_register_duplicate_email(self, mock_execute_update, anonymous_client):
+        """Test an email that is already registered is refused."""
+        mock_execute_update.return_value = []
+
+        response = anonymous_client.post(
+            "/auth/register",
+            data={"email": "ada@example.com", "password": "long enough"},
+        )
+
+        assert response.status_code == 409
+
+    @patch("auth.execute_update")
+    def test_register_validation(self, mock_execute_update, anonymous_client):
+        """Test invalid sign-ups are rejected without touching the database."""
+        response = anonymous_client.post(
+            "/auth/register", data={"email": "ada", "password": "short"}
+        )
+
+        assert response.status_code == 400
+        mock_execute_update.assert_not_called()
@@ -0,0 +1,178 @@
+"""Unit tests for write batching."""
+
+import threading
+from unittest.mock import patch
+import psycopg2
+
+import batching
+import metrics
+from batching import InsertBatcher
+from metrics import Registry
+from tasks_routes import CREATE_TASK_QUERY, build_create_tasks_query, insert_task
+
+
+def build_query(count):
+    """Return a fake multi-row insert naming its row count."""
+    return f"INSERT {count}"
+
+
+def fake_insert(query, params):
+    """Return one row per inserted value, as execute_update would."""
+    return [{"ordinal": i, "value": value} for i, value in enumerate(params)]
+
+
+def row(value, ordinal=0):
+    """The row fake_insert returns for `value` at `ordinal`."""
+    return {"ordinal": ordinal, "value": value}
+
+
+def submit_concurrently(batcher, values):
+    """Submit each value from its own thread; returns {value: row or error}."""
+    results = {}
+
+    def submit(value):
+        try:
+            results[value] = batcher.submit((value,))
+        except Exception as error:
+            results[value] = error
+
+    threads = [threading.Thread(target=submit, args=(value,)) for value in values]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    return results
+
+
+class TestInsertBatcher:
+    """Test suite for InsertBatcher."""
+
+    @patch("batching.db.execute_update", side_effect=fake_insert)
+    def test_concurrent_inserts_share_a_statement(self, mock_execute_update):
+        """Test a full batch runs as one statement and every caller gets its row."""
+        batcher = InsertBatcher("test", build_query, window=5, max_rows=3)
+
+        results = submit_concurrently(batcher, [1, 2, 3])
+
+        mock_execute_update.assert_called_once()
+        query, params = mock_execute_update.call_args[0]
+        assert query == "INSERT 3"
+        assert sorted(params) == [1, 2, 3]
+        assert {value: r["value"] for value, r in results.items()} == {1: 1, 2: 2, 3: 3}
+        assert batcher.stats()["avg_rows"] == 3
+
+    @patch("batching.db.execute_update", side_effect=fake_insert)
+    def test_lone_insert_waits_out_the_window(self, mock_execute_update):
+        """Test an insert nobody joins runs alone once the window passes."""
+        batcher = InsertBatcher("test", build_query, window=0.001, max_rows=10)
+
+        assert batcher.submit((7,)) == row(7)
+        assert batcher.submit((8,)) == row(8)
+
+        assert mock_execute_update.call_count == 2
+        assert batcher.stats()["batches"] == 2
+
+    @patch("batching.db.execute_update")
+    def test_row_error_reaches_only_its_caller(self, mock_execute_update):
+        """Test a failed batch is retried row by row."""
+
+        def insert(query, params):
+            if 2 in params:
+                raise psycopg2.DataError("value too long")
+            return fake_insert(query, params)
+
+        mock_execute_update.side_effect = insert
+        batcher = InsertBatcher("test", build_query, window=5, max_rows=3)
+
+        results = submit_concurrently(batcher, [1, 2, 3])
+
+        assert results[1] == row(1)
+        assert results[3] == row(3)
+        assert isinstance(results[2], psycopg2.DataError)
+        assert mock_execute_update.call_count == 4
+        assert batcher.stats()["retried_singly"] == 1
+
+    @patch("batching.db.execute_update")
+    def test_database_error_reaches_every_caller(self, mock_execute_update):
+        """Test errors not caused by a row fail the whole batch without retries."""
+        mock_execute_update.side_effect = psycopg2.OperationalError("down")
+        batcher = InsertBatcher("test", build_query, window=5, max_rows=2)
+
+        results = submit_concurrently(batcher, [1, 2])
+
+        # Each caller gets an exception of its own, caused by the shared one
+        assert all(isinstance(r, batching.BatchError) for r in results.values())
+        assert results[1] is not results[2]
+        assert all(
+            isinstance(r.__cause__, psycopg2.OperationalError) for r in results.values()
+        )
+        mock_execute_update.assert_called_once()
+
+    @patch("batching.db.execute_update")
+    def test_rows_are_matched_by_ordinal(self, mock_execute_update):
+        """Test rows come back to their callers by ordinal, in any order."""
+        mock_execute_update.side_effect = lambda query, params: list(
+            reversed(fake_insert(query, params))
+        )
+        batcher = InsertBatcher("test", build_query, window=5, max_rows=3)
+
+        results = submit_concurrently(batcher, [1, 2, 3])
+
+        assert all(results[value]["value"] == value for value in (1, 2, 3))
+
+    @patch("batching.db.execute_update", side_effect=fake_insert)
+    def test_batches_are_measured(self, mock_execute_update, monkeypatch, app):
+        """Test batches and their rows are counted per batcher."""
+        registry = Registry()
+        monkeypatch.setattr(metrics, "registry", registry)
+        batcher = InsertBatcher("test", build_query, window=5, max_rows=2)
+
+        submit_concurrently(batcher, [1, 2])
+
+        counters, _ = registry.collect()
+        labels = (("batcher", "test"),)
+        assert counters[("db_write_batches_total", labels)] == 1
+        assert counters[("db_write_batch_rows_total", labels)] == 2
+
+
+class TestInsertTask:
+    """Test suite for insert_task with and without batching."""
+
+    @patch("tasks_routes.execute_update")
+    def test_unbatched_by_default(self, mock_execute_update, app):
+        """Test inserts run one by one unless WRITE_BATCH_ENABLED is set."""
+        mock_execute_update.return_value = [{"id": 1}]
+
+        assert insert_task("Title", None, False, 1) == {"id": 1}
+
+        mock_execute_update.assert_called_once_with(
+            CREATE_TASK_QUERY, ("Title", None, False, 1), prepare=True
+        )
+
+    @patch("batching.db.execute_update")
+    def test_batched_when_enabled(self, mock_execute_update, make_app):
+        """Test enabled batching inserts through the multi-row statement."""
+        mock_execute_update.return_value = [{"ordinal": 0, "id": 1}]
+        app = make_app(WRITE_BATCH_ENABLED=True, WRITE_BATCH_WINDOW=0.001)
+
+        with app.app_context():
+            assert insert_task("Title", None, False, 1)["id"] == 1
+
+        mock_execute_update.assert_called_once_with(
+            build_create_tasks_query(1), ("Title", None, False, 1)
+        )
+        # An app with batching off drops the batchers
+        make_app()
+        assert batching.get_batcher("tasks", build_create_tasks_query) is None
+
+    def test_create_tasks_query(self):
+        """Test the multi-row insert keeps the callers' order."""
+        query = build_create_tasks_query(2)
+
+        assert query.count("%s") == 8
+        assert "(0, %s, %s, %s, %s), (1, %s, %s, %s, %s)" in query
+        assert "nextval(pg_get_serial_sequence('tasks', 'id'))" in query
+        assert "SELECT new_task.ordinal" in query
+        assert "INSERT INTO jobs" not in query
+        assert "INSERT INTO jobs" in build_create_tasks_query(2, queue_jobs=True)
+        assert query.rstrip().endswith("FROM task JOIN new_task USING (id)")
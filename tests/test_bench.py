@@ -0,0 +1,103 @@
+"""Unit tests for the benchmark report helpers."""
+
+import random
+from unittest.mock import patch
+
+from benchmarks.bench import (
+    SCENARIOS,
+    compare_reports,
+    hashing_throughput,
+    render_timing,
+    row_memory,
+    percentile,
+    round_trips,
+    summarize,
+)
+
+
+class TestBenchHelpers:
+    """Test suite for benchmark statistics and reports."""
+
+    def test_percentile_nearest_rank(self):
+        """Test percentiles pick the nearest-rank sample."""
+        values = list(range(1, 101))
+
+        assert percentile(values, 0.50) == 50
+        assert percentile(values, 0.99) == 99
+        assert percentile([7], 0.95) == 7
+        assert percentile([], 0.5) is None
+
+    def test_round_trips_from_server_timing(self):
+        """Test the query count is read from the Server-Timing header."""
+        header = 'db;dur=1.20;desc="3 queries", db-acquire;dur=0.01'
+
+        assert round_trips(header) == 3
+        assert round_trips(None) is None
+
+    def test_summarize(self):
+        """Test latency, throughput, errors and round-trips are reported."""
+        samples = [(0.010, 200, 2), (0.020, 200, 2), (0.030, 500, None)]
+
+        summary = summarize(samples, elapsed=2.0)
+
+        assert summary["requests"] == 3
+        assert summary["errors"] == 1
+        assert summary["throughput"] == 1.5
+        assert summary["latency_ms"]["p50"] == 20
+        assert summary["db_round_trips"] == 2
+
+    def test_compare_reports(self):
+        """Test metrics of matching scenarios are paired with their change."""
+
+        def report(p50):
+            return {
+                "scenarios": {
+                    "tasks.list": {
+                        "throughput": 100.0,
+                        "db_round_trips": 2,
+                        "latency_ms": {"p50": p50, "p95": None, "p99": 4.0},
+                    }
+                }
+            }
+
+        rows = compare_reports(report(2.0), report(1.0))
+
+        assert ("tasks.list", "p50", 2.0, 1.0, -50.0) in rows
+        assert ("tasks.list", "p95", None, None, None) in rows
+
+    def test_scenarios_build_requests(self):
+        """Test every scenario produces a request against a known path."""
+        rng = random.Random(0)
+        for scenario in SCENARIOS:
+            method, path, body, headers = scenario.build(rng, 1, 100)
+            assert method in ("GET", "POST")
+            assert path.startswith(("/tasks/", "/api/tasks", "/auth/"))
+
+    def test_hashing_throughput(self):
+        """Test the hashing benchmark reports logins per second per core."""
+        result = hashing_throughput("pbkdf2:sha256:1000", 1, 0.05)
+
+        assert result["logins"] > 0
+        assert result["cores"] == 1
+        assert result["logins_per_second_per_core"] == result["logins_per_second"]
+
+    def test_render_timing(self):
+        """Test the render benchmark times cached and uncached card renders."""
+        result = render_timing(5, 2, fragment_cache=True)
+
+        assert result["tasks"] == 5
+        assert result["first_ms"] > 0 and result["median_ms"] > 0
+
+    def test_row_memory(self):
+        """Test the memory benchmark traces the rows held by a fetch."""
+
+        def fetch(query, params, row_type):
+            return [(i, f"Task {i}") for i in range(params[0])]
+
+        with patch("benchmarks.bench.db.execute_query", side_effect=fetch) as mock:
+            result = row_memory("tuple", 100)
+
+        assert mock.call_args.kwargs["row_type"] == "tuple"
+        assert result["rows"] == 100
+        assert result["peak_bytes"] >= result["held_bytes"] > 0
+        assert result["gc_collections"] >= 0
@@ -0,0 +1,126 @@
+"""Unit tests for the read-through cache."""
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from cache import LRUCache, NullCache, create_cache
+
+
+class TestLRUCache:
+    """Test suite for the in-process LRU cache."""
+
+    def test_get_or_load_caches_value(self):
+        """Test the loader runs once and later lookups are hits."""
+        cache = LRUCache()
+        loader = MagicMock(return_value=["task"])
+
+        first = cache.get_or_load("tasks", ("page", 1), loader)
+        second = cache.get_or_load("tasks", ("page", 1), loader)
+
+        assert first == second == ["task"]
+        loader.assert_called_once()
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_key_parts_are_distinct(self):
+        """Test different key parts are cached separately."""
+        cache = LRUCache()
+
+        cache.get_or_load("tasks", ("page", 1), lambda: "one")
+        value = cache.get_or_load("tasks", ("page", 2), lambda: "two")
+
+        assert value == "two"
+        assert cache.stats()["misses"] == 2
+
+    def test_invalidate_namespace(self):
+        """Test invalidate forces the next lookup to reload."""
+        cache = LRUCache()
+        cache.get_or_load("tasks", ("page",), lambda: "old")
+        cache.get_or_load("users", ("page",), lambda: "user")
+
+        cache.invalidate("tasks")
+
+        assert cache.get_or_load("tasks", ("page",), lambda: "new") == "new"
+        assert cache.get_or_load("users", ("page",), lambda: "other") == "user"
+        assert cache.stats()["invalidations"] == 1
+
+    @patch("cache.time.monotonic")
+    def test_ttl_expiry(self, mock_monotonic):
+        """Test entries older than their TTL are reloaded."""
+        mock_monotonic.return_value = 100.0
+        cache = LRUCache(default_ttl=10)
+        cache.get_or_load("tasks", ("page",), lambda: "old")
+
+        mock_monotonic.return_value = 111.0
+        value = cache.get_or_load("tasks", ("page",), lambda: "new")
+
+        assert value == "new"
+        assert cache.stats()["expirations"] == 1
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted at capacity."""
+        cache = LRUCache(max_entries=2)
+        cache.get_or_load("tasks", ("a",), lambda: "a")
+        cache.get_or_load("tasks", ("b",), lambda: "b")
+        cache.get_or_load("tasks", ("a",), lambda: "unused")
+
+        cache.get_or_load("tasks", ("c",), lambda: "c")
+
+        stats = cache.stats()
+        assert stats["evictions"] == 1
+        assert stats["entries"] == 2
+        assert cache.get_or_load("tasks", ("a",), lambda: "reloaded") == "a"
+        assert cache.get_or_load("tasks", ("b",), lambda: "reloaded") == "reloaded"
+
+
+class TestNullCache:
+    """Test suite for the disabled cache."""
+
+    def test_always_loads(self):
+        """Test every lookup calls the loader."""
+        cache = NullCache()
+        loader = MagicMock(return_value="value")
+
+        cache.get_or_load("tasks", (), loader)
+        cache.get_or_load("tasks", (), loader)
+
+        assert loader.call_count == 2
+
+
+class TestRedisCache:
+    """Test suite for the Redis-backed cache."""
+
+    def test_round_trip_and_invalidate(self):
+        """Test values and namespace versions are stored in the server."""
+        redis = pytest.importorskip("redis")
+        from cache import RedisCache
+
+        store = {}
+        client = MagicMock()
+        client.get.side_effect = store.get
+        client.set.side_effect = lambda key, value, px: store.__setitem__(key, value)
+        client.incr.side_effect = lambda key: store.__setitem__(
+            key, int(store.get(key, 0)) + 1
+        )
+        cache = RedisCache(client)
+
+        assert cache.get_or_load("tasks", (1,), lambda: ["a"]) == ["a"]
+        assert cache.get_or_load("tasks", (1,), lambda: ["b"]) == ["a"]
+        cache.invalidate("tasks")
+        assert cache.get_or_load("tasks", (1,), lambda: ["c"]) == ["c"]
+
+        client.get.side_effect = redis.ConnectionError("down")
+        assert cache.get_or_load("tasks", (1,), lambda: ["d"]) == ["d"]
+        assert cache.stats()["errors"] > 0
+
+
+class TestCreateCache:
+    """Test suite for backend selection."""
+
+    def test_create_cache_backends(self):
+        """Test backend names map to cache classes."""
+        assert isinstance(create_cache("memory"), LRUCache)
+        assert isinstance(create_cache("none"), NullCache)
+        with pytest.raises(ValueError):
+            create_cache("memcached")
@@ -1,12 +1,29 @@
 """Unit tests for database utilities."""
 
+import threading
+import time
 import pytest
 from unittest.mock import patch, MagicMock
 from contextlib import contextmanager
 import psycopg2
-from psycopg2.extras import DictCursor
+from psycopg2 import extensions
+from collections import OrderedDict, namedtuple
+from psycopg2.extras import DictCursor, NamedTupleCursor
+from flask import session
 
+from app import create_app
 import db
+from db_pool import PoolTimeout
+
+Row = namedtuple("Row", "id title")
+
+
+def make_mock_connection():
+    """Return a mock connection that looks open and outside a transaction."""
+    mock_conn = MagicMock()
+    mock_conn.closed = 0
+    mock_conn.get_transaction_status.return_value = extensions.TRANSACTION_STATUS_IDLE
+    return mock_conn
 
 
 class TestGetConnection:
@@ -43,7 +60,7 @@ class TestGetCursor:
     @patch("db.get_connection")
     def test_get_cursor_success(self, mock_get_conn):
         """Test get_cursor yields a cursor."""
-        mock_conn = MagicMock()
+        mock_conn = make_mock_connection()
         mock_cursor = MagicMock()
         mock_conn.cursor.return_value = mock_cursor
         mock_get_conn.return_value = mock_conn
@@ -52,12 +69,13 @@ class TestGetCursor:
             assert cursor == mock_cursor
 
         mock_conn.commit.assert_called_once()
-        mock_conn.close.assert_called_once()
+        mock_conn.close.assert_not_called()
+        assert db.pool_stats()["idle"] == 1
 
     @patch("db.get_connection")
     def test_get_cursor_rollback_on_error(self, mock_get_conn):
         """Test get_cursor rolls back on database error."""
-        mock_conn = MagicMock()
+        mock_conn = make_mock_connection()
         mock_cursor = MagicMock()
         mock_conn.cursor.return_value = mock_cursor
         mock_get_conn.return_value = mock_conn
@@ -67,12 +85,13 @@ class TestGetCursor:
                 raise psycopg2.Error("Test error")
 
         mock_conn.rollback.assert_called_once()
-        mock_conn.close.assert_called_once()
+        mock_conn.close.assert_not_called()
+        assert db.pool_stats()["idle"] == 1
 
     @patch("db.get_connection")
     def test_get_cursor_no_commit_when_false(self, mock_get_conn):
         """Test get_cursor does not commit when commit=False."""
-        mock_conn = MagicMock()
+        mock_conn = make_mock_connection()
         mock_cursor = MagicMock()
         mock_conn.cursor.return_value = mock_cursor
         mock_get_conn.return_value = mock_conn
@@ -81,12 +100,13 @@ class TestGetCursor:
             assert cursor == mock_cursor
 
         mock_conn.commit.assert_not_called()
-        mock_conn.close.assert_called_once()
+        mock_conn.close.assert_not_called()
+        assert db.pool_stats()["in_use"] == 0
 
     @patch("db.get_connection")
-    def test_get_cursor_closes_connection_on_error(self, mock_get_conn):
-        """Test get_cursor closes connection even when error occurs."""
-        mock_conn = MagicMock()
+    def test_get_cursor_releases_connection_on_error(self, mock_get_conn):
+        """Test get_cursor returns the connection even when error occurs."""
+        mock_conn = make_mock_connection()
         mock_cursor = MagicMock()
         mock_conn.cursor.return_value = mock_cursor
         mock_get_conn.return_value = mock_conn
@@ -97,13 +117,15 @@ class TestGetCursor:
         except ValueError:
             pass
 
-        # Connection should still be closed even for non-database errors
-        mock_conn.close.assert_called_once()
+        # Connection should still go back to the pool for non-database errors
+        stats = db.pool_stats()
+        assert stats["in_use"] == 0
+        assert stats["idle"] == 1
 
     @patch("db.get_connection")
     def test_get_cursor_uses_dict_cursor(self, mock_get_conn):
-        """Test get_cursor uses DictCursor factory."""
-        mock_conn = MagicMock()
+        """Test get_cursor uses the instrumented DictCursor factory."""
+        mock_conn = make_mock_connection()
         mock_cursor = MagicMock()
         mock_conn.cursor.return_value = mock_cursor
         mock_get_conn.return_value = mock_conn
@@ -111,8 +133,89 @@ class TestGetCursor:
         with db.get_cursor() as _:
             pass
 
-        # Verify cursor_factory was set to DictCursor
-        mock_conn.cursor.assert_called_once_with(cursor_factory=DictCursor)
+        # Verify cursor_factory was set to the DictCursor subclass
+        mock_conn.cursor.assert_called_once_with(cursor_factory=db.InstrumentedCursor)
+        assert issubclass(db.InstrumentedCursor, DictCursor)
+
+    @patch("db.get_connection")
+    def test_get_cursor_row_types(self, mock_get_conn):
+        """Test row_type picks an instrumented cursor of the matching kind."""
+        mock_conn = make_mock_connection()
+        mock_get_conn.return_value = mock_conn
+
+        for row_type, factory in (
+            ("namedtuple", db.InstrumentedNamedTupleCursor),
+            ("tuple", db.InstrumentedTupleCursor),
+            (Row, db.InstrumentedTupleCursor),
+        ):
+            with db.get_cursor(row_type=row_type) as _:
+                pass
+            assert mock_conn.cursor.call_args.kwargs["cursor_factory"] is factory
+
+        assert issubclass(db.InstrumentedNamedTupleCursor, NamedTupleCursor)
+        assert issubclass(db.InstrumentedTupleCursor, db._InstrumentedMixin)
+
+    @patch("db.get_connection")
+    def test_get_cursor_unknown_row_type(self, mock_get_conn):
+        """Test an unknown row_type name fails before a connection is taken."""
+        with pytest.raises(ValueError, match="row_type"):
+            with db.get_cursor(row_type="set") as _:
+                pass
+
+        mock_get_conn.assert_not_called()
+
+    @patch("db.get_connection")
+    def test_get_cursor_reuses_pooled_connection(self, mock_get_conn):
+        """Test consecutive get_cursor calls share one pooled connection."""
+        mock_conn = make_mock_connection()
+        mock_get_conn.return_value = mock_conn
+
+        with db.get_cursor() as _:
+            pass
+        with db.get_cursor() as _:
+            pass
+
+        mock_get_conn.assert_called_once()
+        assert db.pool_stats()["checkouts"] == 2
+
+    @patch("db.get_connection")
+    def test_get_cursor_discards_broken_connection(self, mock_get_conn):
+        """Test get_cursor closes a connection whose rollback fails."""
+        mock_conn = make_mock_connection()
+        mock_conn.rollback.side_effect = psycopg2.InterfaceError("closed")
+        mock_get_conn.return_value = mock_conn
+
+        with pytest.raises(psycopg2.OperationalError):
+            with db.get_cursor() as _:
+                raise psycopg2.OperationalError("server closed the connection")
+
+        mock_conn.close.assert_called_once()
+        assert db.pool_stats()["size"] == 0
+
+
+class TestInitApp:
+    """Test suite for init_app pool configuration."""
+
+    def test_init_app_applies_config(self, make_app):
+        """Test init_app builds the pool from DB_POOL_* config keys."""
+        app = make_app(DB_POOL_MAX_SIZE=3, DB_POOL_TIMEOUT=1.5)
+
+        pool = app.extensions["db_pool"]
+        assert pool is db.get_pool()
+        assert pool.max_size == 3
+        assert pool.timeout == 1.5
+        assert pool.min_size == db.POOL_SETTINGS["min_size"]
+
+    def test_create_app_takes_config_object(self, make_app):
+        """Test create_app also reads config from an object's attributes."""
+
+        class Config:
+            DB_POOL_MAX_SIZE = 4
+
+        # make_app puts the default settings back afterwards
+        app = create_app(Config)
+
+        assert app.extensions["db_pool"].max_size == 4
 
 
 class TestExecuteQuery:
@@ -170,6 +273,23 @@ class TestExecuteQuery:
 
         assert result == []
 
+    @patch("db.get_cursor")
+    def test_execute_query_builds_row_type(self, mock_get_cursor):
+        """Test a row_type class is built from each row's columns."""
+        mock_cursor = MagicMock()
+        mock_cursor.fetchall.return_value = [(1, "Task 1"), (2, "Task 2")]
+
+        @contextmanager
+        def mock_cursor_context(*args, **kwargs):
+            yield mock_cursor
+
+        mock_get_cursor.side_effect = mock_cursor_context
+
+        result = db.execute_query("SELECT id, title FROM tasks", row_type=Row)
+
+        assert result == [Row(1, "Task 1"), Row(2, "Task 2")]
+        assert mock_get_cursor.call_args.kwargs["row_type"] is Row
+
     @patch("db.get_cursor")
     def test_execute_query_does_not_commit_by_default(self, mock_get_cursor):
         """Test execute_query does not commit by default."""
@@ -185,7 +305,193 @@ class TestExecuteQuery:
         db.execute_query("SELECT * FROM tasks")
 
         # Verify commit=False is passed to get_cursor
-        mock_get_cursor.assert_called_once_with(commit=False)
+        mock_get_cursor.assert_called_once_with(
+            commit=False, read_only=True, row_type="dict"
+        )
+
+
+class TestGetTableVersion:
+    """Test suite for get_table_version lookup."""
+
+    @patch("db.execute_query")
+    def test_get_table_version(self, mock_execute_query):
+        """Test the version row of a user's rows of a table is returned."""
+        mock_execute_query.return_value = [{"version": 3, "updated_at": None}]
+
+        assert db.get_table_version("tasks", 5) == {"version": 3, "updated_at": None}
+        assert mock_execute_query.call_args[0][1] == ("tasks", 5)
+
+    @patch("db.execute_query")
+    def test_get_table_version_untracked(self, mock_execute_query):
+        """Test an untracked table or user returns None."""
+        mock_execute_query.return_value = []
+
+        assert db.get_table_version("users", 5) is None
+
+
+class TestStreamQuery:
+    """Test suite for stream_query generator."""
+
+    @patch("db.get_connection")
+    def test_stream_query_uses_named_cursor(self, mock_get_conn):
+        """Test stream_query yields rows from a named server-side cursor."""
+        mock_conn = make_mock_connection()
+        mock_cursor = MagicMock()
+        mock_cursor.__iter__.return_value = iter([{"id": 1}, {"id": 2}])
+        mock_conn.cursor.return_value = mock_cursor
+        mock_get_conn.return_value = mock_conn
+
+        rows = list(db.stream_query("SELECT * FROM tasks", itersize=50))
+
+        assert rows == [{"id": 1}, {"id": 2}]
+        assert mock_conn.cursor.call_args.kwargs["name"].startswith("stream_")
+        assert mock_cursor.itersize == 50
+        mock_cursor.execute.assert_called_once_with("SELECT * FROM tasks", ())
+        mock_conn.commit.assert_not_called()
+
+    @patch("db.get_connection")
+    def test_stream_query_builds_row_type(self, mock_get_conn):
+        """Test streamed rows are built into the row_type class."""
+        mock_conn = make_mock_connection()
+        mock_cursor = MagicMock()
+        mock_cursor.__iter__.return_value = iter([(1, "Task 1")])
+        mock_conn.cursor.return_value = mock_cursor
+        mock_get_conn.return_value = mock_conn
+
+        rows = list(db.stream_query("SELECT id, title FROM tasks", row_type=Row))
+
+        assert rows == [Row(1, "Task 1")]
+        factory = mock_conn.cursor.call_args.kwargs["cursor_factory"]
+        assert factory is db.InstrumentedTupleCursor
+
+    @patch("db.get_connection")
+    def test_stream_query_is_lazy(self, mock_get_conn):
+        """Test no connection is checked out until iteration starts."""
+        db.stream_query("SELECT * FROM tasks")
+
+        mock_get_conn.assert_not_called()
+
+    @patch("db.get_connection")
+    def test_stream_query_releases_connection_when_closed(self, mock_get_conn):
+        """Test closing the generator early returns the connection."""
+        mock_conn = make_mock_connection()
+        mock_cursor = MagicMock()
+        mock_cursor.__iter__.return_value = iter([{"id": 1}, {"id": 2}])
+        mock_conn.cursor.return_value = mock_cursor
+        mock_get_conn.return_value = mock_conn
+
+        rows = db.stream_query("SELECT * FROM tasks")
+        next(rows)
+        assert db.pool_stats()["in_use"] == 1
+        rows.close()
+
+        assert db.pool_stats()["in_use"] == 0
+
+
+class TestCopyIn:
+    """Test suite for copy_in bulk loading."""
+
+    @patch("db.get_cursor")
+    def test_copy_in_streams_lines(self, mock_get_cursor):
+        """Test copy_in feeds lines to copy_expert through a file object."""
+        mock_cursor = MagicMock()
+        mock_cursor.rowcount = 3
+        read_chunks = []
+
+        def copy_expert(query, source):
+            while chunk := source.read(4):
+                read_chunks.append(chunk)
+
+        mock_cursor.copy_expert.side_effect = copy_expert
+
+        @contextmanager
+        def mock_cursor_context(*args, **kwargs):
+            yield mock_cursor
+
+        mock_get_cursor.side_effect = mock_cursor_context
+
+        result = db.copy_in("COPY tasks FROM STDIN", ["a,b\n", "c,d\n", "e,f\n"])
+
+        assert result == 3
+        assert "".join(read_chunks) == "a,b\nc,d\ne,f\n"
+        assert all(len(chunk) <= 4 for chunk in read_chunks)
+        mock_get_cursor.assert_called_once_with(commit=True)
+
+
+class TestStreamCopy:
+    """Test suite for COPY TO streaming."""
+
+    @patch("db.copy_to")
+    def test_stream_copy_yields_chunks(self, mock_copy_to):
+        """Test COPY output written on the worker thread is yielded in chunks."""
+
+        def copy_to(query, params, destination, primary=None):
+            for row in (b"1,a\n", b"2,b\n", b"3,c\n"):
+                destination.write(row)
+
+        mock_copy_to.side_effect = copy_to
+
+        chunks = list(db.stream_copy("COPY tasks TO STDOUT", chunk_size=8))
+
+        assert b"".join(chunks) == b"1,a\n2,b\n3,c\n"
+        assert chunks == [b"1,a\n2,b\n", b"3,c\n"]
+
+    @patch("db.copy_to")
+    def test_stream_copy_reraises_errors(self, mock_copy_to):
+        """Test a failing COPY raises in the consuming thread."""
+        mock_copy_to.side_effect = psycopg2.Error("COPY failed")
+
+        with pytest.raises(psycopg2.Error):
+            list(db.stream_copy("COPY tasks TO STDOUT"))
+
+    @patch("db.copy_to")
+    def test_stream_copy_stops_writer_when_closed(self, mock_copy_to):
+        """Test closing the generator makes further writes abort the COPY."""
+        stopped = threading.Event()
+
+        def copy_to(query, params, destination, primary=None):
+            try:
+                while True:
+                    destination.write(b"x" * 10)
+            finally:
+                stopped.set()
+
+        mock_copy_to.side_effect = copy_to
+
+        chunks = db.stream_copy("COPY tasks TO STDOUT", chunk_size=10, max_chunks=1)
+        next(chunks)
+        chunks.close()
+
+        assert stopped.wait(timeout=5)
+
+    @patch("db.copy_to")
+    def test_stream_copy_follows_request_stickiness(self, mock_copy_to, app):
+        """Test the primary/replica choice is made in the request thread."""
+        with app.test_request_context():
+            session[db._PRIMARY_UNTIL_KEY] = time.time() + 60
+            list(db.stream_copy("COPY tasks TO STDOUT"))
+
+        assert mock_copy_to.call_args.kwargs == {"primary": True}
+
+    @patch("db.get_cursor")
+    def test_copy_to_interpolates_params(self, mock_get_cursor):
+        """Test copy_to mogrifies params into the COPY statement."""
+        mock_cursor = MagicMock()
+        mock_cursor.mogrify.return_value = b"COPY (SELECT 1) TO STDOUT"
+        destination = MagicMock()
+
+        @contextmanager
+        def mock_cursor_context(*args, **kwargs):
+            yield mock_cursor
+
+        mock_get_cursor.side_effect = mock_cursor_context
+
+        db.copy_to("COPY (SELECT %s) TO STDOUT", [1], destination)
+
+        mock_cursor.mogrify.assert_called_once_with("COPY (SELECT %s) TO STDOUT", [1])
+        mock_cursor.copy_expert.assert_called_once_with(
+            b"COPY (SELECT 1) TO STDOUT", destination
+        )
 
 
 class TestExecuteUpdate:
@@ -280,3 +586,280 @@ class TestExecuteUpdate:
         db.execute_update("DELETE FROM tasks")
 
         mock_cursor.execute.assert_called_once_with("DELETE FROM tasks", ())
+
+
+class TestPreparedStatements:
+    """Test suite for execute_prepared and the per-connection statement cache."""
+
+    QUERY = "SELECT * FROM tasks WHERE id = %s AND title LIKE 'a%%'"
+
+    def make_cursor(self):
+        """Return a mock cursor on a fresh connection."""
+        mock_cursor = MagicMock()
+        mock_cursor.connection = make_mock_connection()
+        return mock_cursor
+
+    def test_placeholders_are_numbered(self):
+        """Test %s becomes $n and %% a literal % in the server-side text."""
+        statement = db.get_statement(self.QUERY)
+
+        assert statement.text == (
+            "SELECT * FROM tasks WHERE id = $1 AND title LIKE 'a%'"
+        )
+        assert statement.param_count == 1
+        assert db.get_statement(self.QUERY) is statement
+
+    def test_prepares_once_per_connection(self):
+        """Test the first run sends PREPARE and EXECUTE, later ones EXECUTE only."""
+        mock_cursor = self.make_cursor()
+        name = db.get_statement(self.QUERY).name
+
+        db.execute_prepared(mock_cursor, self.QUERY, (1,))
+        db.execute_prepared(mock_cursor, self.QUERY, (2,))
+
+        first, second = mock_cursor.execute.call_args_list
+        assert first[0][0] == (
+            f"PREPARE {name} AS SELECT * FROM tasks WHERE id = $1 "
+            f"AND title LIKE 'a%%'; EXECUTE {name} (%s)"
+        )
+        assert first[0][1] == (1,)
+        assert second[0] == (f"EXECUTE {name} (%s)", (2,))
+
+        # Another connection prepares its own copy
+        other_cursor = self.make_cursor()
+        db.execute_prepared(other_cursor, self.QUERY, (3,))
+        assert other_cursor.execute.call_args[0][0].startswith("PREPARE")
+
+    def test_least_recently_used_is_deallocated(self, monkeypatch):
+        """Test statements beyond the per-connection cap are deallocated."""
+        monkeypatch.setattr(db, "_prepared_max", 2)
+        mock_cursor = self.make_cursor()
+        queries = [f"SELECT {n}" for n in range(3)]
+
+        db.execute_prepared(mock_cursor, queries[0])
+        db.execute_prepared(mock_cursor, queries[1])
+        db.execute_prepared(mock_cursor, queries[0])
+        db.execute_prepared(mock_cursor, queries[2])
+
+        oldest = db.get_statement(queries[1]).name
+        assert mock_cursor.execute.call_args[0][0].startswith(
+            f"DEALLOCATE {oldest}; PREPARE"
+        )
+
+    def test_failed_prepare_is_checked_before_retrying(self):
+        """Test a statement whose PREPARE failed is looked up before re-preparing."""
+        mock_cursor = self.make_cursor()
+        mock_cursor.execute.side_effect = [psycopg2.Error("boom"), None, None]
+        mock_cursor.fetchall.return_value = [(1,)]
+        name = db.get_statement("SELECT 42").name
+
+        with pytest.raises(psycopg2.Error):
+            db.execute_prepared(mock_cursor, "SELECT 42")
+        db.execute_prepared(mock_cursor, "SELECT 42")
+
+        lookup, retry = mock_cursor.execute.call_args_list[1:]
+        assert "pg_prepared_statements" in lookup[0][0]
+        assert retry[0][0].startswith(f"DEALLOCATE {name}; PREPARE {name}")
+
+    def test_wrong_parameter_count(self):
+        """Test a parameter count mismatch is refused before reaching the server."""
+        mock_cursor = self.make_cursor()
+
+        with pytest.raises(ValueError):
+            db.execute_prepared(mock_cursor, self.QUERY, (1, 2))
+        mock_cursor.execute.assert_not_called()
+
+    @patch("db.get_cursor")
+    def test_execute_query_prepare_flag(self, mock_get_cursor, monkeypatch):
+        """Test prepare=True only prepares while prepared statements are enabled."""
+        mock_cursor = self.make_cursor()
+
+        @contextmanager
+        def mock_cursor_context(*args, **kwargs):
+            yield mock_cursor
+
+        mock_get_cursor.side_effect = mock_cursor_context
+
+        monkeypatch.setattr(db, "_prepare_enabled", False)
+        db.execute_query("SELECT 7", prepare=True)
+        mock_cursor.execute.assert_called_once_with("SELECT 7", ())
+
+        monkeypatch.setattr(db, "_prepare_enabled", True)
+        db.execute_query("SELECT 7", prepare=True)
+        assert mock_cursor.execute.call_args[0][0].startswith("PREPARE")
+
+    def test_statement_stats(self):
+        """Test prepares and executes are counted per statement."""
+        mock_cursor = self.make_cursor()
+        before = db.statement_stats()
+
+        db.execute_prepared(mock_cursor, "SELECT 'stats'")
+        db.execute_prepared(mock_cursor, "SELECT 'stats'")
+
+        stats = db.statement_stats()
+        assert stats["prepares"] - before["prepares"] == 1
+        assert stats["executes"] - before["executes"] == 2
+        name = db.get_statement("SELECT 'stats'").name
+        entry = next(s for s in stats["statements"] if s["name"] == name)
+        assert (entry["prepares"], entry["executes"]) == (1, 2)
+
+    def test_instrumentation_sees_the_query(self, monkeypatch):
+        """Test listeners and EXPLAIN get the query, not the PREPARE/EXECUTE text."""
+
+        class Base:
+            rowcount = 1
+
+            def __init__(self):
+                self.connection = make_mock_connection()
+                self.sent = []
+
+            def execute(self, query, vars=None):
+                self.sent.append(query)
+
+        class Cursor(db._InstrumentedMixin, Base):
+            pass
+
+        recorded = []
+        monkeypatch.setattr(
+            db.instrumentation,
+            "record_query",
+            lambda sql, duration, rows, explain: recorded.append((sql, explain)),
+        )
+        mock_cursor = Cursor()
+
+        db.execute_prepared(mock_cursor, self.QUERY, (1,))
+
+        assert mock_cursor.sent[0].startswith("PREPARE")
+        ((sql, explain),) = recorded
+        assert sql == self.QUERY
+        assert explain.args == (self.QUERY, (1,))
+
+    def test_registry_is_bounded(self, monkeypatch):
+        """Test the least recently used statements leave the shared registry."""
+        monkeypatch.setattr(db, "_statements", OrderedDict())
+        monkeypatch.setattr(db, "_STATEMENTS_MAX", 2)
+
+        first = db.get_statement("SELECT 'first'")
+        db.get_statement("SELECT 'second'")
+        db.get_statement("SELECT 'first'")
+        db.get_statement("SELECT 'third'")
+
+        assert list(db._statements) == ["SELECT 'first'", "SELECT 'third'"]
+        assert db.get_statement("SELECT 'first'") is first
+        assert db.get_statement("SELECT 'second'").name == (
+            db.Statement("SELECT 'second'").name
+        )
+
+
+REPLICA_URLS = [
+    "postgresql://replica1/taskmanager",
+    "postgresql://replica2/taskmanager",
+]
+
+
+class TestReplicaRouting:
+    """Test suite for routing reads to replicas."""
+
+    @pytest.fixture(autouse=True)
+    def replicas(self):
+        """Configure two replicas whose connections record their URL."""
+        self.connections = []
+        self.lag = {url: 0 for url in REPLICA_URLS}
+        self.down = set()
+
+        def connect(url):
+            if url in self.down:
+                raise psycopg2.OperationalError("could not connect")
+            mock_conn = make_mock_connection()
+            mock_conn.url = url
+            lag_cursor = mock_conn.cursor.return_value.__enter__.return_value
+            lag_cursor.fetchone.side_effect = lambda: (self.lag[url],)
+            self.connections.append(mock_conn)
+            return mock_conn
+
+        with patch("db.psycopg2.connect", side_effect=connect):
+            db.configure_replicas(REPLICA_URLS)
+            yield
+        db.configure_replicas([])
+
+    def reads(self):
+        """Return the number of reads served by each replica."""
+        return [entry["reads"] for entry in db.replica_stats()]
+
+    @patch("db.get_connection")
+    def test_reads_round_robin_over_replicas(self, mock_get_conn):
+        """Test reads alternate between replicas and never touch the primary."""
+        for _ in range(4):
+            db.execute_query("SELECT 1")
+
+        assert self.reads() == [2, 2]
+        mock_get_conn.assert_not_called()
+
+    @patch("db.get_connection")
+    def test_writes_pin_reads_to_primary(self, mock_get_conn, app):
+        """Test a user's reads go to the primary for a while after a write."""
+        mock_get_conn.return_value = make_mock_connection()
+
+        with app.test_request_context():
+            db.execute_update("UPDATE tasks SET title = 'x'")
+            db.execute_query("SELECT 1")
+
+            assert self.reads() == [0, 0]
+            assert mock_get_conn.call_count == 1
+
+        with app.test_request_context():
+            # Another user's session is not pinned
+            db.execute_query("SELECT 1")
+            assert sum(self.reads()) == 1
+
+    @patch("db.get_connection")
+    def test_primary_flag_skips_replicas(self, mock_get_conn):
+        """Test primary=True reads from the primary."""
+        mock_get_conn.return_value = make_mock_connection()
+
+        db.execute_query("SELECT 1", primary=True)
+
+        assert self.reads() == [0, 0]
+
+    @patch("db.get_connection")
+    def test_unreachable_replica_is_skipped(self, mock_get_conn):
+        """Test a replica that can't be reached is left out, then the primary."""
+        mock_get_conn.return_value = make_mock_connection()
+        self.down.add(REPLICA_URLS[0])
+
+        for _ in range(3):
+            db.execute_query("SELECT 1")
+
+        assert self.reads() == [0, 3]
+        assert [entry["up"] for entry in db.replica_stats()] == [False, True]
+        mock_get_conn.assert_not_called()
+
+        self.down.add(REPLICA_URLS[1])
+        db.close_pool()
+        db.execute_query("SELECT 1")
+        mock_get_conn.assert_called_once()
+
+    @patch("db.get_connection")
+    def test_busy_replica_is_passed_over(self, mock_get_conn):
+        """Test a replica with no free connection is skipped without waiting."""
+        busy = db.get_replicas()[0]
+        busy.pool.getconn = MagicMock(side_effect=PoolTimeout("exhausted"))
+
+        db.execute_query("SELECT 1")
+        db.execute_query("SELECT 1")
+
+        busy.pool.getconn.assert_called_with(0)
+        assert self.reads() == [0, 2]
+        # Busy is not down; it is tried again on its next turn
+        assert db.replica_stats()[0]["up"]
+
+    @patch("db.get_connection")
+    def test_lagging_replica_is_skipped(self, mock_get_conn):
+        """Test a replica too far behind the primary is left out."""
+        self.lag[REPLICA_URLS[1]] = db.DB_REPLICA_MAX_LAG + 50
+
+        for _ in range(2):
+            db.execute_query("SELECT 1")
+
+        assert self.reads() == [2, 0]
+        assert db.replica_stats()[1]["lag"] == db.DB_REPLICA_MAX_LAG + 50
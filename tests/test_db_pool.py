@@ -0,0 +1,187 @@
+"""Unit tests for the connection pool."""
+
+import threading
+import pytest
+from unittest.mock import MagicMock, patch
+import psycopg2
+from psycopg2 import extensions
+
+from db_pool import ConnectionPool, PoolTimeout
+
+
+def make_connect():
+    """Return a connect callable producing fresh idle mock connections."""
+
+    def connect():
+        conn = MagicMock()
+        conn.closed = 0
+        conn.get_transaction_status.return_value = extensions.TRANSACTION_STATUS_IDLE
+        return conn
+
+    return MagicMock(side_effect=connect)
+
+
+class TestConnectionPool:
+    """Test suite for ConnectionPool."""
+
+    def test_getconn_creates_lazily(self):
+        """Test no connection is opened until the first checkout."""
+        connect = make_connect()
+        pool = ConnectionPool(connect, min_size=1, max_size=2)
+
+        assert connect.call_count == 0
+        conn = pool.getconn()
+
+        assert connect.call_count == 1
+        assert pool.stats()["in_use"] == 1
+        pool.putconn(conn)
+        assert pool.stats()["idle"] == 1
+
+    def test_putconn_then_getconn_reuses(self):
+        """Test a returned connection is handed out again."""
+        pool = ConnectionPool(make_connect(), max_size=2)
+
+        first = pool.getconn()
+        pool.putconn(first)
+        second = pool.getconn()
+
+        assert first is second
+        assert pool.stats()["connections_created"] == 1
+
+    def test_getconn_times_out_when_exhausted(self):
+        """Test checkout raises PoolTimeout when max_size is reached."""
+        pool = ConnectionPool(make_connect(), max_size=1, timeout=0.01)
+        pool.getconn()
+
+        with pytest.raises(PoolTimeout):
+            pool.getconn()
+
+        assert pool.stats()["timeouts"] == 1
+
+    def test_pool_timeout_is_psycopg2_error(self):
+        """Test PoolTimeout is caught by existing psycopg2.Error handlers."""
+        assert issubclass(PoolTimeout, psycopg2.Error)
+
+    def test_getconn_waits_for_release(self):
+        """Test a blocked checkout proceeds once a connection is returned."""
+        pool = ConnectionPool(make_connect(), max_size=1, timeout=5)
+        held = pool.getconn()
+        result = {}
+
+        def worker():
+            result["conn"] = pool.getconn()
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        while pool.stats()["waiting"] == 0:
+            pass
+        pool.putconn(held)
+        thread.join(timeout=5)
+
+        assert result["conn"] is held
+        assert pool.stats()["wait_time_max"] > 0
+
+    def test_putconn_rolls_back_open_transaction(self):
+        """Test a connection left inside a transaction is rolled back."""
+        pool = ConnectionPool(make_connect())
+        conn = pool.getconn()
+        conn.get_transaction_status.return_value = extensions.TRANSACTION_STATUS_INTRANS
+
+        pool.putconn(conn)
+
+        conn.rollback.assert_called_once()
+        assert pool.stats()["idle"] == 1
+
+    def test_putconn_discards_closed_connection(self):
+        """Test a closed connection is not returned to the idle set."""
+        pool = ConnectionPool(make_connect())
+        conn = pool.getconn()
+        conn.closed = 1
+
+        pool.putconn(conn)
+
+        stats = pool.stats()
+        assert stats["idle"] == 0
+        assert stats["size"] == 0
+        assert stats["connections_discarded"] == 1
+
+    def test_putconn_rejects_foreign_connection(self):
+        """Test returning a connection the pool never handed out fails."""
+        pool = ConnectionPool(make_connect())
+
+        with pytest.raises(psycopg2.pool.PoolError):
+            pool.putconn(MagicMock())
+
+    def test_health_check_replaces_dead_connection(self):
+        """Test a connection failing SELECT 1 is replaced on checkout."""
+        connect = make_connect()
+        pool = ConnectionPool(connect, check_interval=0)
+        dead = pool.getconn()
+        pool.putconn(dead)
+        cursor = dead.cursor.return_value.__enter__.return_value
+        cursor.execute.side_effect = psycopg2.OperationalError("gone")
+
+        conn = pool.getconn()
+
+        assert conn is not dead
+        dead.close.assert_called_once()
+        assert connect.call_count == 2
+
+    @patch("db_pool.time.monotonic")
+    def test_max_age_recycles_connection(self, mock_monotonic):
+        """Test connections older than max_age are replaced."""
+        mock_monotonic.return_value = 100.0
+        pool = ConnectionPool(make_connect(), max_age=10, check_interval=1000)
+        old = pool.getconn()
+        pool.putconn(old)
+
+        mock_monotonic.return_value = 111.0
+        conn = pool.getconn()
+
+        assert conn is not old
+        old.close.assert_called_once()
+
+    @patch("db_pool.time.monotonic")
+    def test_max_idle_keeps_min_size(self, mock_monotonic):
+        """Test idle recycling never shrinks the pool below min_size."""
+        mock_monotonic.return_value = 100.0
+        pool = ConnectionPool(
+            make_connect(), min_size=1, max_size=3, max_idle=10, check_interval=1000
+        )
+        first, second = pool.getconn(), pool.getconn()
+        pool.putconn(first)
+        pool.putconn(second)
+
+        mock_monotonic.return_value = 200.0
+        conn = pool.getconn()
+
+        assert conn is second
+        first.close.assert_called_once()
+        assert pool.stats()["size"] == 1
+
+    def test_connect_failure_releases_slot(self):
+        """Test a failed connect does not leak a pool slot."""
+        connect = MagicMock(side_effect=psycopg2.OperationalError("refused"))
+        pool = ConnectionPool(connect, max_size=1)
+
+        with pytest.raises(psycopg2.OperationalError):
+            pool.getconn()
+
+        assert pool.stats()["size"] == 0
+
+    def test_close_refuses_checkout(self):
+        """Test a closed pool closes idle connections and rejects checkout."""
+        pool = ConnectionPool(make_connect())
+        conn = pool.getconn()
+        pool.putconn(conn)
+
+        pool.close()
+
+        conn.close.assert_called_once()
+        with pytest.raises(psycopg2.pool.PoolError):
+            pool.getconn()
+
+    def test_invalid_sizes(self):
+        """Test min_size larger than max_size is rejected."""
+        with pytest.raises(ValueError):
+            ConnectionPool(make_connect(), min_size=5, max_size=2)
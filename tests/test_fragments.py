@@ -0,0 +1,90 @@
+"""Unit tests for the task card fragment cache."""
+
+from datetime import datetime
+from unittest.mock import patch
+
+import fragments
+import metrics
+from metrics import Registry
+
+
+def make_task(task_id=1, title="Write tests", updated_at=datetime(2024, 1, 1)):
+    """Build a task row as returned by the database helpers."""
+    return {
+        "id": task_id,
+        "title": title,
+        "description": None,
+        "completed_at": None,
+        "created_at": datetime(2024, 1, 1),
+        "updated_at": updated_at,
+    }
+
+
+class TestTaskCard:
+    """Test suite for task_card."""
+
+    def test_unchanged_card_is_rendered_once(self, app):
+        """Test a card is reused until the task's updated_at moves."""
+        with (
+            app.test_request_context(),
+            patch(
+                "fragments._render_card", wraps=fragments._render_card
+            ) as mock_render,
+        ):
+            first = fragments.task_card(make_task())
+            second = fragments.task_card(make_task())
+            changed = fragments.task_card(
+                make_task(title="Renamed", updated_at=datetime(2024, 1, 2))
+            )
+
+        assert first == second
+        assert "Write tests" in first
+        assert "Renamed" in changed
+        assert mock_render.call_count == 2
+        assert fragments.stats()["hits"] == 1
+
+    def test_card_is_markup(self, app):
+        """Test the cached card is spliced in without being escaped again."""
+        with app.test_request_context():
+            card = fragments.task_card(make_task(title="<b>bold</b>"))
+
+        assert hasattr(card, "__html__")
+        assert "&lt;b&gt;bold&lt;/b&gt;" in card
+
+    def test_disabled_cache_always_renders(self, make_app):
+        """Test FRAGMENT_CACHE_ENABLED=False renders every card."""
+        app = make_app(FRAGMENT_CACHE_ENABLED=False)
+        with (
+            app.test_request_context(),
+            patch("fragments._render_card", return_value="card") as mock_render,
+        ):
+            fragments.task_card(make_task())
+            fragments.task_card(make_task())
+
+        assert mock_render.call_count == 2
+
+    def test_lookups_are_measured(self, app, monkeypatch):
+        """Test hits and misses are counted and misses timed."""
+        registry = Registry()
+        monkeypatch.setattr(metrics, "registry", registry)
+
+        with app.test_request_context():
+            fragments.task_card(make_task(task_id=77))
+            fragments.task_card(make_task(task_id=77))
+
+        counters, histograms = registry.collect()
+        labels = (("template", fragments.TASK_CARD_TEMPLATE),)
+        assert counters[("template_fragments_total", (*labels, ("result", "hit")))]
+        assert counters[("template_fragments_total", (*labels, ("result", "miss")))]
+        assert ("template_fragment_render_seconds", labels) in histograms
+
+    @patch("tasks_routes.fetch_task_page")
+    def test_list_page_uses_cached_cards(self, mock_fetch_task_page, client):
+        """Test the task list renders cards through the fragment cache."""
+        mock_fetch_task_page.return_value = ([make_task(task_id=5)], None, None)
+
+        response = client.get("/tasks/?sort=title")
+
+        assert response.status_code == 200
+        assert b"Write tests" in response.data
+        assert fragments.stats()["entries"] == 1
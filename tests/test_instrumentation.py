@@ -0,0 +1,105 @@
+"""Unit tests for query instrumentation and the slow-query log."""
+
+import logging
+from unittest.mock import MagicMock
+from flask import g
+
+import instrumentation
+from instrumentation import RequestStats, normalize_sql, record_query
+
+
+class TestNormalizeSql:
+    """Test suite for normalize_sql."""
+
+    def test_replaces_literals_and_placeholders(self):
+        """Test values are replaced so equal query shapes normalize equally."""
+        query = """
+            SELECT id FROM tasks
+            WHERE title = 'it''s' AND id > 42 AND created_at < %s
+        """
+
+        assert normalize_sql(query) == (
+            "SELECT id FROM tasks WHERE title = ? AND id > ? AND created_at < ?"
+        )
+
+    def test_accepts_bytes(self):
+        """Test mogrified (bytes) statements are decoded first."""
+        assert normalize_sql(b"SELECT  1") == "SELECT ?"
+
+
+class TestRequestStats:
+    """Test suite for per-request aggregation."""
+
+    def test_record_query_outside_request_is_ignored(self):
+        """Test recording without an app context is a no-op."""
+        record_query("SELECT 1", 0.001, 1)
+
+    def test_record_query_aggregates_into_g(self, app):
+        """Test queries and checkouts made in a request are summed on g."""
+        with app.test_request_context("/tasks/"):
+            app.preprocess_request()
+            instrumentation.record_acquire(0.002)
+            record_query("SELECT * FROM tasks WHERE id = %s", 0.010, 1)
+            record_query("SELECT * FROM tasks WHERE id = %s", 0.005, 0)
+
+            stats = g.query_stats
+            assert stats.query_count == 2
+            assert stats.acquire_count == 1
+            assert stats.queries[0].sql == "SELECT * FROM tasks WHERE id = ?"
+            assert abs(stats.query_time - 0.015) < 1e-9
+
+    def test_server_timing_format(self):
+        """Test the header lists query and checkout time in milliseconds."""
+        stats = RequestStats()
+        stats.add_query("SELECT 1", 0.0125, 1)
+        stats.add_acquire(0.0005)
+
+        assert stats.server_timing(0.02) == (
+            'db;dur=12.50;desc="1 queries", db-acquire;dur=0.50, app;dur=20.00'
+        )
+
+    def test_response_has_server_timing_header(self, client):
+        """Test every response carries a Server-Timing header."""
+        response = client.get("/tasks/new")
+
+        assert response.headers["Server-Timing"].startswith('db;dur=0.00;desc="0')
+
+
+class TestSlowQueryLog:
+    """Test suite for the slow-query log."""
+
+    def test_slow_query_is_logged_with_plan(self, app, caplog, monkeypatch):
+        """Test queries over the threshold are logged with their EXPLAIN plan."""
+        monkeypatch.setattr(instrumentation, "_threshold", 0.1)
+        monkeypatch.setattr(instrumentation, "_explain", True)
+        explain = MagicMock(return_value=["Seq Scan on tasks"])
+
+        with caplog.at_level(logging.WARNING, logger="taskmanager.slow_queries"):
+            with app.test_request_context("/tasks/"):
+                record_query("SELECT * FROM tasks", 0.5, 3, explain=explain)
+                record_query("SELECT 1", 0.01, 1, explain=explain)
+
+        explain.assert_called_once_with()
+        assert len(caplog.records) == 1
+        message = caplog.records[0].getMessage()
+        assert message.startswith("GET /tasks/ 500.0 ms rows=3 SELECT * FROM tasks")
+        assert "Seq Scan on tasks" in message
+
+    def test_explain_disabled_by_default(self, caplog, monkeypatch):
+        """Test the plan is only captured when EXPLAIN capture is enabled."""
+        monkeypatch.setattr(instrumentation, "_threshold", 0.1)
+        monkeypatch.setattr(instrumentation, "_explain", False)
+        explain = MagicMock()
+
+        with caplog.at_level(logging.WARNING, logger="taskmanager.slow_queries"):
+            record_query("SELECT * FROM tasks", 0.5, explain=explain)
+
+        explain.assert_not_called()
+        assert "rows=None" in caplog.records[0].getMessage()
+
+    def test_init_app_reads_config(self, make_app):
+        """Test the threshold and EXPLAIN switch come from app.config."""
+        make_app(SLOW_QUERY_THRESHOLD_MS=50, SLOW_QUERY_EXPLAIN=True)
+
+        assert instrumentation._threshold == 0.05
+        assert instrumentation._explain is True
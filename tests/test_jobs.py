@@ -0,0 +1,233 @@
+"""Unit tests for the Postgres job queue."""
+
+import threading
+from unittest.mock import MagicMock, patch
+import psycopg2
+
+import jobs
+
+
+def make_job(kind="test", payload=None, attempts=1, max_attempts=3):
+    """Build a claimed jobs row as returned by claim_job."""
+    return {
+        "id": 7,
+        "kind": kind,
+        "payload": payload if payload is not None else {"value": 1},
+        "attempts": attempts,
+        "max_attempts": max_attempts,
+    }
+
+
+class TestEnqueue:
+    """Test suite for enqueue and claim_job."""
+
+    @patch("jobs.db.execute_update")
+    def test_enqueue(self, mock_execute_update):
+        """Test a job is inserted with its payload, delay and attempts."""
+        mock_execute_update.return_value = [{"id": 3}]
+
+        assert jobs.enqueue("test", {"value": 1}, delay=10) == 3
+
+        query, params = mock_execute_update.call_args[0]
+        assert "INSERT INTO jobs" in query
+        assert params[0] == "test"
+        assert params[1].adapted == {"value": 1}
+        assert params[2:] == (10, jobs.JOB_MAX_ATTEMPTS)
+
+    def test_enqueue_in_transaction(self):
+        """Test a cursor makes the job part of the caller's transaction."""
+        mock_cursor = MagicMock()
+        mock_cursor.fetchone.return_value = {"id": 4}
+
+        assert jobs.enqueue("test", cursor=mock_cursor) == 4
+        assert "INSERT INTO jobs" in mock_cursor.execute.call_args[0][0]
+
+    @patch("jobs.db.execute_update")
+    def test_claim_skips_locked_jobs(self, mock_execute_update):
+        """Test claiming skips jobs other workers hold instead of waiting."""
+        mock_execute_update.return_value = []
+
+        assert jobs.claim_job("worker-1") is None
+
+        query, params = mock_execute_update.call_args[0]
+        assert "FOR UPDATE SKIP LOCKED" in query
+        assert params == ("worker-1",)
+
+
+class TestPruneJobs:
+    """Test suite for prune_jobs retention."""
+
+    @patch("jobs.db.execute_update")
+    def test_prune_failed_and_unclaimed(self, mock_execute_update):
+        """Test old failed jobs and never-claimed queued jobs are deleted."""
+        mock_execute_update.return_value = [{"id": 1}, {"id": 2}]
+
+        assert jobs.prune_jobs(60, 30) == 2
+
+        query, params = mock_execute_update.call_args[0]
+        assert query.lstrip().startswith("DELETE FROM jobs")
+        assert "status = 'failed'" in query
+        assert "status = 'queued' AND attempts = 0" in query
+        assert params == (60, 30)
+
+
+class TestRunJob:
+    """Test suite for run_job outcomes."""
+
+    @patch("jobs.db.execute_update")
+    def test_success_deletes_job(self, mock_execute_update, monkeypatch):
+        """Test a successful job gets its payload and is deleted."""
+        handler = MagicMock()
+        monkeypatch.setitem(jobs.handlers, "test", handler)
+
+        jobs.run_job(make_job())
+
+        handler.assert_called_once_with(value=1)
+        query, params = mock_execute_update.call_args[0]
+        assert query.startswith("DELETE FROM jobs")
+        assert params == (7,)
+
+    @patch("jobs.db.execute_update")
+    def test_failure_is_retried_with_backoff(self, mock_execute_update, monkeypatch):
+        """Test a failing job is queued again after a delay."""
+        monkeypatch.setitem(
+            jobs.handlers, "test", MagicMock(side_effect=RuntimeError("boom"))
+        )
+
+        jobs.run_job(make_job(attempts=2))
+
+        query, params = mock_execute_update.call_args[0]
+        assert "status = 'queued'" in query
+        delay, error, job_id = params
+        assert jobs.JOB_RETRY_BASE <= delay <= jobs.JOB_RETRY_BASE * 2
+        assert "RuntimeError: boom" in error
+        assert job_id == 7
+
+    @patch("jobs.db.execute_update")
+    def test_last_attempt_marks_failed(self, mock_execute_update, monkeypatch):
+        """Test a job out of attempts is marked failed."""
+        monkeypatch.setitem(
+            jobs.handlers, "test", MagicMock(side_effect=RuntimeError("boom"))
+        )
+
+        jobs.run_job(make_job(attempts=3, max_attempts=3))
+
+        assert "status = 'failed'" in mock_execute_update.call_args[0][0]
+
+    @patch("jobs.db.execute_update")
+    def test_unknown_kind_fails_without_retry(self, mock_execute_update):
+        """Test a job nobody handles is marked failed straight away."""
+        jobs.run_job(make_job(kind="nobody-handles-this", attempts=1))
+
+        query, params = mock_execute_update.call_args[0]
+        assert "status = 'failed'" in query
+        assert "nobody-handles-this" in params[0]
+
+    def test_retry_delay_doubles_up_to_cap(self):
+        """Test retry delays double per attempt and stop at the cap."""
+        assert 1 <= jobs.retry_delay(1, base=2, cap=100) <= 2
+        assert 8 <= jobs.retry_delay(4, base=2, cap=100) <= 16
+        assert 50 <= jobs.retry_delay(30, base=2, cap=100) <= 100
+
+
+class TestWorker:
+    """Test suite for the Worker loop."""
+
+    @patch("jobs.seconds_until_next_job", return_value=None)
+    @patch("jobs.run_job")
+    @patch("jobs.claim_job")
+    def test_runs_jobs_until_queue_is_empty(
+        self, mock_claim_job, mock_run_job, mock_seconds_until, app
+    ):
+        """Test threads run claimed jobs and sleep once the queue is empty."""
+        worker = jobs.Worker(app, concurrency=1, poll_interval=5)
+        idle = threading.Event()
+
+        def claim(name):
+            if mock_claim_job.call_count <= 2:
+                return make_job()
+            idle.set()
+            return None
+
+        mock_claim_job.side_effect = claim
+        thread = threading.Thread(target=worker._work)
+        thread.start()
+
+        assert idle.wait(2)
+        worker.stop()
+        thread.join(2)
+
+        assert not thread.is_alive()
+        assert mock_run_job.call_count == 2
+
+    @patch("jobs.seconds_until_next_job", return_value=None)
+    @patch("jobs.claim_job", return_value=None)
+    def test_notification_wakes_idle_threads(
+        self, mock_claim_job, mock_seconds_until, app
+    ):
+        """Test wake() ends an idle thread's wait before the poll interval."""
+        worker = jobs.Worker(app, concurrency=1, poll_interval=60)
+        thread = threading.Thread(target=worker._work)
+        thread.start()
+
+        worker.wake()
+        worker.stop()
+        thread.join(2)
+
+        assert not thread.is_alive()
+
+    @patch("jobs.claim_job")
+    def test_database_errors_keep_thread_alive(self, mock_claim_job, app):
+        """Test a database outage is logged and retried, not fatal."""
+        worker = jobs.Worker(app, concurrency=1, poll_interval=0.01)
+        retried = threading.Event()
+
+        def claim(name):
+            if mock_claim_job.call_count >= 2:
+                retried.set()
+            raise psycopg2.Error("down")
+
+        mock_claim_job.side_effect = claim
+        thread = threading.Thread(target=worker._work)
+        thread.start()
+
+        assert retried.wait(2)
+        worker.stop()
+        thread.join(2)
+
+        assert not thread.is_alive()
+
+    def test_from_app(self, app):
+        """Test worker settings come from app.config and explicit overrides."""
+        app.config["JOB_POLL_INTERVAL"] = 3
+
+        worker = jobs.Worker.from_app(app, concurrency=2, lock_timeout=None)
+
+        assert (worker.concurrency, worker.poll_interval) == (2, 3)
+        assert worker.lock_timeout == jobs.JOB_LOCK_TIMEOUT
+        assert worker.failed_retention == jobs.JOB_FAILED_RETENTION
+
+
+class TestJobsCli:
+    """Test suite for the jobs CLI commands."""
+
+    @patch("jobs.job_counts")
+    def test_status(self, mock_job_counts, runner):
+        """Test status lists counts by kind and status."""
+        mock_job_counts.return_value = {("task_created", "failed"): 2}
+
+        result = runner.invoke(args=["jobs", "status"])
+
+        assert result.exit_code == 0
+        assert "task_created" in result.output and "failed" in result.output
+
+    @patch("jobs.prune_jobs", return_value=3)
+    def test_prune(self, mock_prune_jobs, app, runner):
+        """Test prune deletes old jobs with the configured retention."""
+        app.config["JOB_UNCLAIMED_RETENTION"] = 120
+
+        result = runner.invoke(args=["jobs", "prune"])
+
+        assert result.exit_code == 0
+        assert "Pruned 3 jobs" in result.output
+        mock_prune_jobs.assert_called_once_with(jobs.JOB_FAILED_RETENTION, 120)
@@ -0,0 +1,149 @@
+"""Unit tests for the live task change stream."""
+
+import json
+from unittest.mock import patch
+
+import pytest
+
+import live
+from live import TaskChangeHub
+from tests.conftest import TEST_USER_ID
+
+
+def make_hub(queue_size=10, max_subscribers=10):
+    """Return a hub whose listener thread is never started."""
+    hub = TaskChangeHub(queue_size=queue_size, max_subscribers=max_subscribers)
+    hub._thread = "not started"
+    return hub
+
+
+class TestTaskChangeHub:
+    """Test suite for fanning out notifications."""
+
+    def test_events_reach_only_the_owner(self):
+        """Test a notification is delivered to the task owner's subscribers."""
+        hub = make_hub()
+        mine = [hub.subscribe(1), hub.subscribe(1)]
+        theirs = hub.subscribe(2)
+
+        hub.dispatch(json.dumps({"op": "insert", "user_id": 1, "ids": [5]}))
+
+        for subscription in mine:
+            assert subscription.get(timeout=0) == {"op": "insert", "ids": [5]}
+        assert theirs.get(timeout=0) is None
+        assert hub.stats()["notifications"] == 1
+
+    def test_close_unsubscribes(self):
+        """Test closed subscriptions stop receiving events."""
+        hub = make_hub()
+        subscription = hub.subscribe(1)
+
+        subscription.close()
+        hub.dispatch(json.dumps({"op": "delete", "user_id": 1, "ids": [5]}))
+
+        assert subscription.get(timeout=0) is None
+        assert hub.stats()["subscribers"] == 0
+
+    def test_slow_subscriber_gets_reload(self):
+        """Test a subscriber that falls behind gets one reload event."""
+        hub = make_hub(queue_size=2)
+        subscription = hub.subscribe(1)
+
+        for task_id in range(5):
+            hub.dispatch(json.dumps({"op": "update", "user_id": 1, "ids": [task_id]}))
+
+        assert subscription.get(timeout=0) == live.RELOAD
+        assert subscription.get(timeout=0) is None
+
+    def test_malformed_payload_is_ignored(self):
+        """Test payloads that aren't change events are skipped."""
+        hub = make_hub()
+        subscription = hub.subscribe(1)
+
+        hub.dispatch("not json")
+        hub.dispatch(json.dumps({"op": "insert"}))
+
+        assert subscription.get(timeout=0) is None
+
+    def test_subscribers_are_capped(self):
+        """Test subscribing past max_subscribers raises HubFull."""
+        hub = make_hub(max_subscribers=2)
+        first = hub.subscribe(1)
+        hub.subscribe(2)
+
+        with pytest.raises(live.HubFull):
+            hub.subscribe(3)
+
+        first.close()
+        first.close()
+        hub.subscribe(3)
+        assert hub.stats()["subscribers"] == 2
+        assert hub.stats()["rejected"] == 1
+
+    @patch("live.db.get_connection")
+    def test_one_listener_for_all_subscribers(self, mock_get_conn):
+        """Test subscribers share the listener started by the first one."""
+        hub = TaskChangeHub()
+        with patch("live.threading.Thread") as mock_thread:
+            hub.subscribe(1)
+            hub.subscribe(2)
+
+        mock_thread.assert_called_once()
+        mock_thread.return_value.start.assert_called_once()
+
+
+class TestEventStream:
+    """Test suite for the Server-Sent Events encoding and endpoint."""
+
+    def test_event_stream(self):
+        """Test events are framed as SSE with keep-alives while idle."""
+        hub = make_hub()
+        stream = live.event_stream(hub.subscribe(1), heartbeat=0)
+
+        assert next(stream) == "retry: 5000\n\n"
+        assert next(stream) == ": keep-alive\n\n"
+        hub.dispatch(json.dumps({"op": "insert", "user_id": 1, "ids": [3]}))
+        assert next(stream) == 'event: insert\ndata: {"op": "insert", "ids": [3]}\n\n'
+
+        stream.close()
+        assert hub.stats()["subscribers"] == 0
+
+    @pytest.fixture
+    def enabled(self, monkeypatch):
+        """Turn live updates on."""
+        monkeypatch.setattr(live, "_enabled", True)
+
+    def test_endpoint_streams_user_events(self, client, enabled):
+        """Test /tasks/events streams the logged-in user's changes."""
+        hub = make_hub()
+        with patch("live.get_hub", return_value=hub):
+            response = client.get("/tasks/events")
+            chunks = iter(response.response)
+
+            assert response.mimetype == "text/event-stream"
+            assert response.headers["Cache-Control"] == "no-cache"
+            assert next(chunks) == b"retry: 5000\n\n"
+            hub.dispatch(
+                json.dumps({"op": "update", "user_id": TEST_USER_ID, "ids": [9]})
+            )
+            assert next(chunks).startswith(b"event: update\n")
+            response.close()
+        assert hub.stats()["subscribers"] == 0
+
+    def test_endpoint_off_by_default(self, client):
+        """Test /tasks/events is not found unless live updates are enabled."""
+        assert client.get("/tasks/events").status_code == 404
+
+    def test_endpoint_full(self, client, enabled):
+        """Test clients past LIVE_MAX_SUBSCRIBERS get a 503 with Retry-After."""
+        hub = make_hub(max_subscribers=1)
+        hub.subscribe(2)
+        with patch("live.get_hub", return_value=hub):
+            response = client.get("/tasks/events")
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == str(live.RETRY_AFTER)
+
+    def test_endpoint_requires_login(self, anonymous_client):
+        """Test anonymous clients are sent to the login form."""
+        assert anonymous_client.get("/tasks/events").status_code == 302
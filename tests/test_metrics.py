@@ -0,0 +1,201 @@
+"""Unit tests for the metrics subsystem."""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import pytest
+
+import metrics
+from metrics import Registry, render
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Give each test an empty registry."""
+    registry = Registry()
+    monkeypatch.setattr(metrics, "registry", registry)
+    return registry
+
+
+class TestRegistry:
+    """Test suite for the per-thread sharded registry."""
+
+    def test_collect_sums_all_threads(self, registry):
+        """Test samples recorded on different threads are merged."""
+
+        def worker():
+            for _ in range(100):
+                registry.inc("http_requests_total", (("endpoint", "x"),))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        registry.inc("http_requests_total", (("endpoint", "x"),))
+
+        counters, _ = registry.collect()
+
+        assert counters[("http_requests_total", (("endpoint", "x"),))] == 401
+        # Shards of the finished threads were folded together
+        assert len(registry._shards) == 1
+
+    def test_dead_shards_are_folded_on_registration(self, registry):
+        """Test new threads retire the shards of exited ones without a scrape."""
+        for _ in range(10):
+            thread = threading.Thread(
+                target=registry.inc, args=("http_requests_total", ())
+            )
+            thread.start()
+            thread.join()
+
+        assert len(registry._shards) == 1
+        assert registry.collect()[0][("http_requests_total", ())] == 10
+
+    def test_observe_buckets(self, registry):
+        """Test observations land in the first bucket not below the value."""
+        registry.observe("template_render_seconds", (), 0.003)
+        registry.observe("template_render_seconds", (), 0.07)
+        registry.observe("template_render_seconds", (), 60)
+
+        _, histograms = registry.collect()
+        values = histograms[("template_render_seconds", ())]
+
+        assert values[0] == 1
+        assert values[metrics.LATENCY_BUCKETS.index(0.1)] == 1
+        assert values[-2] == 1
+        assert values[-1] == pytest.approx(60.073)
+
+
+class TestRender:
+    """Test suite for the text exposition format."""
+
+    def test_histogram_is_cumulative(self):
+        """Test bucket counts are cumulative and end with +Inf and _count."""
+        buckets = (0.1, 1.0)
+        text = render(
+            {("http_requests_total", (("status", 200),)): 3},
+            {("http_request_duration_seconds", (("endpoint", "a"),)): [1, 2, 0, 1.5]},
+            buckets,
+        )
+
+        assert 'http_requests_total{status="200"} 3' in text
+        assert 'http_request_duration_seconds_bucket{endpoint="a",le="0.1"} 1' in text
+        assert 'http_request_duration_seconds_bucket{endpoint="a",le="+Inf"} 3' in text
+        assert 'http_request_duration_seconds_sum{endpoint="a"} 1.5' in text
+        assert 'http_request_duration_seconds_count{endpoint="a"} 3' in text
+        assert "# TYPE template_render_seconds histogram" in text
+
+    def test_label_values_are_escaped(self):
+        """Test quotes and backslashes in label values are escaped."""
+        text = render({("http_requests_total", (("endpoint", 'a"\\'),)): 1}, {})
+
+        assert 'endpoint="a\\"\\\\"' in text
+
+
+class TestMetricsEndpoint:
+    """Test suite for request hooks and /metrics."""
+
+    def test_requests_and_templates_are_recorded(self, registry, client):
+        """Test a request shows up by endpoint, status and template."""
+        client.get("/tasks/new")
+        client.get("/no-such-page")
+
+        response = client.get("/metrics")
+        text = response.get_data(as_text=True)
+
+        assert response.status_code == 200
+        assert response.content_type.startswith("text/plain")
+        assert (
+            'http_requests_total{endpoint="tasks.new_task",method="GET",status="200"} 1'
+            in text
+        )
+        assert (
+            'http_requests_total{endpoint="unmatched",method="GET",status="404"}'
+            in text
+        )
+        assert 'http_request_errors_total{status="404"} 1' in text
+        assert 'template_render_seconds_count{template="tasks/new.html"} 1' in text
+
+    def test_db_queries_are_recorded(self, registry, app):
+        """Test statements reported by instrumentation become a histogram."""
+        with app.test_request_context("/tasks/"):
+            app.preprocess_request()
+            metrics.instrumentation.record_query("SELECT 1", 0.02, 1)
+
+        _, histograms = registry.collect()
+
+        assert (
+            sum(
+                histograms[
+                    ("db_query_duration_seconds", (("endpoint", "tasks.list_tasks"),))
+                ][:-1]
+            )
+            == 1
+        )
+
+    def test_multi_process_aggregation(self, registry, tmp_path, monkeypatch):
+        """Test /metrics sums the snapshots every worker wrote to METRICS_DIR."""
+        key = [["endpoint", "tasks.new_task"], ["method", "GET"], ["status", 200]]
+        monkeypatch.setattr(metrics, "_run_id", lambda: 42)
+        (tmp_path / "metrics-42-1.json").write_text(
+            json.dumps(
+                {"counters": [["http_requests_total", key, 5]], "histograms": []}
+            )
+        )
+        monkeypatch.setattr(metrics, "_store", metrics._ProcessStore(str(tmp_path)))
+        registry.inc(
+            "http_requests_total",
+            (("endpoint", "tasks.new_task"), ("method", "GET"), ("status", 200)),
+            2,
+        )
+
+        counters, _ = metrics.collect()
+
+        assert counters[("http_requests_total", tuple(map(tuple, key)))] == 7
+        assert len(list(tmp_path.glob("metrics-42-*.json"))) == 2
+
+    def test_exited_workers_are_retired(self, registry, tmp_path, monkeypatch):
+        """Test snapshots of exited workers are folded into one retired file."""
+        monkeypatch.setattr(metrics, "_run_id", lambda: 42)
+        exited = []
+        for _ in range(2):
+            process = subprocess.Popen([sys.executable, "-c", "pass"])
+            process.wait()
+            exited.append(process.pid)
+        payload = {"counters": [["http_requests_total", [], 5]], "histograms": []}
+        for pid in exited:
+            (tmp_path / f"metrics-42-{pid}.json").write_text(json.dumps(payload))
+        monkeypatch.setattr(metrics, "_store", metrics._ProcessStore(str(tmp_path)))
+
+        counters, _ = metrics.collect()
+        assert counters[("http_requests_total", ())] == 10
+        assert sorted(path.name for path in tmp_path.glob("*.json")) == [
+            f"metrics-42-{os.getpid()}.json",
+            "metrics-42-retired.json",
+        ]
+
+        # Folded once: collecting again doesn't count them twice
+        counters, _ = metrics.collect()
+        assert counters[("http_requests_total", ())] == 10
+
+    def test_earlier_runs_are_ignored(self, registry, tmp_path, monkeypatch):
+        """Test snapshots of an earlier server start are skipped, then deleted."""
+        monkeypatch.setattr(metrics, "_run_id", lambda: 42)
+        payload = {"counters": [["http_requests_total", [], 5]], "histograms": []}
+        recent = tmp_path / "metrics-41-1.json"
+        stale = tmp_path / "metrics-40-1.json"
+        for path in (recent, stale):
+            path.write_text(json.dumps(payload))
+        old = time.time() - metrics._STALE_RUN_AGE - 1
+        os.utime(stale, (old, old))
+        monkeypatch.setattr(metrics, "_store", metrics._ProcessStore(str(tmp_path)))
+
+        counters, _ = metrics.collect()
+
+        assert ("http_requests_total", ()) not in counters
+        assert recent.exists()
+        assert not stale.exists()
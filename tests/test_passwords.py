@@ -0,0 +1,101 @@
+"""Unit tests for the password hashing pool."""
+
+import threading
+import pytest
+
+import passwords
+from passwords import HashingOverloaded, PasswordHasher, canonical_method
+
+# Cheap enough that the tests don't spend their time hashing
+FAST_METHOD = "pbkdf2:sha256:1000"
+
+
+class TestCanonicalMethod:
+    """Test suite for canonical_method."""
+
+    def test_fills_in_defaults(self):
+        """Test methods are spelled out the way stored hashes spell them."""
+        assert canonical_method("scrypt") == "scrypt:32768:8:1"
+        assert canonical_method("scrypt:16384:8:2") == "scrypt:16384:8:2"
+        assert canonical_method("pbkdf2:sha256:1000") == "pbkdf2:sha256:1000"
+        assert canonical_method("pbkdf2").startswith("pbkdf2:sha256:")
+
+    def test_rejects_unknown_methods(self):
+        """Test a typo in the configured method fails at startup."""
+        with pytest.raises(ValueError):
+            canonical_method("md5")
+
+
+class TestPasswordHasher:
+    """Test suite for PasswordHasher."""
+
+    def test_hash_and_verify(self):
+        """Test hashes use the configured method and verify on the pool."""
+        hasher = PasswordHasher(method=FAST_METHOD, workers=2)
+
+        hashed = hasher.hash("secret")
+
+        assert hashed.startswith(FAST_METHOD + "$")
+        assert hasher.verify(hashed, "secret")
+        assert not hasher.verify(hashed, "wrong")
+        assert hasher.stats()["hashes"] == 3
+        hasher.shutdown()
+
+    def test_runs_on_worker_threads(self, monkeypatch):
+        """Test hashing happens off the calling thread."""
+        hasher = PasswordHasher(method=FAST_METHOD, workers=1)
+        threads = []
+        monkeypatch.setattr(
+            passwords,
+            "generate_password_hash",
+            lambda password, method: threads.append(threading.current_thread().name)
+            or "x",
+        )
+
+        hasher.hash("secret")
+
+        assert threads[0].startswith("password-hash")
+        hasher.shutdown()
+
+    def test_needs_rehash(self):
+        """Test hashes made with other cost parameters are flagged."""
+        hasher = PasswordHasher(method="scrypt", workers=1)
+
+        assert not hasher.needs_rehash("scrypt:32768:8:1$salt$hash")
+        assert hasher.needs_rehash("scrypt:16384:8:1$salt$hash")
+        assert hasher.needs_rehash("pbkdf2:sha256:1000$salt$hash")
+        hasher.shutdown()
+
+    def test_full_queue_is_refused(self):
+        """Test callers fail fast once max_pending hashes are in flight."""
+        hasher = PasswordHasher(
+            method=FAST_METHOD, workers=1, max_pending=1, queue_timeout=0.01
+        )
+        release = threading.Event()
+        started = threading.Event()
+
+        def block():
+            started.set()
+            release.wait(5)
+
+        thread = threading.Thread(target=hasher._run, args=(block,))
+        thread.start()
+        started.wait(5)
+
+        with pytest.raises(HashingOverloaded):
+            hasher.hash("secret")
+
+        release.set()
+        thread.join()
+        assert hasher.stats()["rejected"] == 1
+        assert hasher.verify(hasher.hash("secret"), "secret")
+        hasher.shutdown()
+
+    def test_init_app_reads_config(self, make_app):
+        """Test the method and pool size come from app.config."""
+        app = make_app(PASSWORD_HASH_METHOD=FAST_METHOD, PASSWORD_HASH_WORKERS=3)
+
+        hasher = passwords.get_hasher()
+        assert hasher is app.extensions["passwords"]
+        assert hasher.method == FAST_METHOD
+        assert hasher.workers == 3
@@ -0,0 +1,186 @@
+"""Unit tests for rate limiting and admission control."""
+
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+import psycopg2
+import pytest
+
+import ratelimit
+from ratelimit import AdmissionController, PostgresTokenBucketLimiter
+from ratelimit import TokenBucketLimiter
+
+
+class TestTokenBucketLimiter:
+    """Test suite for the in-process token buckets."""
+
+    @patch("ratelimit.time.monotonic", return_value=100.0)
+    def test_burst_then_limited(self, mock_monotonic):
+        """Test a client gets its burst, then waits for the next token."""
+        limiter = TokenBucketLimiter(rate=2, burst=3)
+
+        assert [limiter.take("a")[0] for _ in range(3)] == [True, True, True]
+        assert limiter.take("a") == (False, 0.5)
+        assert limiter.take("b") == (True, 0.0)
+
+    @patch("ratelimit.time.monotonic")
+    def test_refills_over_time(self, mock_monotonic):
+        """Test tokens come back at `rate` per second, up to the burst."""
+        limiter = TokenBucketLimiter(rate=2, burst=2)
+        mock_monotonic.return_value = 100.0
+        limiter.take("a")
+        limiter.take("a")
+
+        mock_monotonic.return_value = 100.5
+        assert limiter.take("a")[0]
+        assert not limiter.take("a")[0]
+
+        mock_monotonic.return_value = 1000.0
+        assert [limiter.take("a")[0] for _ in range(3)] == [True, True, False]
+
+    def test_least_recently_used_keys_are_forgotten(self):
+        """Test the bucket count stays within max_keys."""
+        limiter = TokenBucketLimiter(rate=1, burst=1, max_keys=2)
+
+        for key in ("a", "b", "c"):
+            limiter.take(key)
+
+        assert limiter.stats()["keys"] == 2
+        # "a" was dropped, which refilled it
+        assert limiter.take("a")[0]
+
+
+class TestPostgresTokenBucketLimiter:
+    """Test suite for the shared token buckets."""
+
+    @pytest.fixture
+    def cursor(self):
+        """Stub get_cursor with a cursor returning one bucket row."""
+        cursor = MagicMock()
+        cursor.fetchall.return_value = [{"allowed": False, "tokens": 0.5}]
+
+        @contextmanager
+        def get_cursor(commit=True):
+            yield cursor
+
+        with patch("ratelimit.db.get_cursor", side_effect=get_cursor):
+            yield cursor
+
+    @patch("ratelimit.db.note_write")
+    @patch("ratelimit.db.execute_prepared")
+    def test_take_uses_shared_bucket(
+        self, mock_execute_prepared, mock_note_write, cursor
+    ):
+        """Test a token is taken in one upsert without pinning reads to the primary."""
+        limiter = PostgresTokenBucketLimiter(rate=5, burst=10)
+
+        assert limiter.take("user:1") == (False, 0.1)
+
+        _, query, params = mock_execute_prepared.call_args[0]
+        assert "ON CONFLICT (key) DO UPDATE" in query
+        assert params == ("user:1", 10, 10, 5)
+        mock_note_write.assert_not_called()
+
+    @patch("ratelimit.db.execute_prepared")
+    def test_database_error_allows_request(self, mock_execute_prepared, cursor):
+        """Test the limiter fails open when the database can't be reached."""
+        mock_execute_prepared.side_effect = psycopg2.OperationalError("down")
+        limiter = PostgresTokenBucketLimiter(rate=5, burst=10)
+
+        assert limiter.take("user:1") == (True, 0.0)
+
+
+class TestAdmissionController:
+    """Test suite for the in-flight request cap."""
+
+    def test_sheds_beyond_capacity(self):
+        """Test requests beyond the cap are refused until a slot frees up."""
+        admission = AdmissionController(max_in_flight=2, queue_timeout=0)
+
+        assert admission.acquire() and admission.acquire()
+        assert not admission.acquire()
+        admission.release()
+        assert admission.acquire()
+
+        stats = admission.stats()
+        assert stats["in_flight"] == 2
+        assert stats["admitted"] == 3
+        assert stats["shed"] == 1
+
+
+class TestRequestHooks:
+    """Test suite for the app-wide before_request hook."""
+
+    @patch("tasks_routes.execute_update")
+    def test_writes_beyond_the_limit_get_429(self, mock_execute_update, app, client):
+        """Test a client hammering POST /tasks/ is told to retry later."""
+        mock_execute_update.return_value = [{"id": 1}]
+        app.extensions["ratelimit"]["limiter"] = TokenBucketLimiter(rate=1, burst=1)
+
+        first = client.post("/tasks/", data={"title": "One"})
+        second = client.post("/tasks/", data={"title": "Two"})
+
+        assert first.status_code == 302
+        assert second.status_code == 429
+        assert second.headers["Retry-After"] == "1"
+        mock_execute_update.assert_called_once()
+        # Reads are not rate limited
+        with patch("tasks_routes.fetch_task_page", return_value=([], None, None)):
+            assert client.get("/tasks/").status_code == 200
+
+    def test_api_gets_json(self, app, client):
+        """Test API clients get a JSON error body."""
+        app.extensions["ratelimit"]["limiter"] = TokenBucketLimiter(rate=1, burst=0)
+
+        response = client.post("/api/tasks", json={"title": "One"})
+
+        assert response.status_code == 429
+        assert response.json == {"error": "Too many requests"}
+
+    def test_limit_is_per_user(self, app, client, anonymous_client):
+        """Test the logged-in user and anonymous IPs have separate buckets."""
+        limiter = app.extensions["ratelimit"]["limiter"] = TokenBucketLimiter(1, 1)
+
+        with patch("ratelimit.TokenBucketLimiter.take", wraps=limiter.take) as take:
+            client.post("/auth/logout")
+            anonymous_client.post("/auth/logout")
+
+        keys = [call.args[0] for call in take.call_args_list]
+        assert keys == ["user:1", "ip:127.0.0.1"]
+
+    def test_overload_gets_503(self, app, client):
+        """Test requests beyond the in-flight cap are shed with a 503."""
+        admission = AdmissionController(max_in_flight=1, queue_timeout=0)
+        app.extensions["ratelimit"]["admission"] = admission
+        admission.acquire()
+
+        response = client.get("/tasks/")
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == str(ratelimit.ADMISSION_RETRY_AFTER)
+        assert client.get("/metrics").status_code == 200
+
+    def test_slot_is_released(self, app, client):
+        """Test a finished request gives its slot back."""
+        admission = AdmissionController(max_in_flight=1, queue_timeout=0)
+        app.extensions["ratelimit"]["admission"] = admission
+
+        with patch("tasks_routes.fetch_task_page", return_value=([], None, None)):
+            # WSGI servers close every response once it is sent
+            for _ in range(2):
+                with client.get("/tasks/") as response:
+                    assert response.status_code == 200
+
+        assert admission.stats()["in_flight"] == 0
+
+    def test_slot_is_held_until_stream_ends(self, app, client):
+        """Test a streamed response keeps its slot until its body is sent."""
+        admission = AdmissionController(max_in_flight=1, queue_timeout=0)
+        app.extensions["ratelimit"]["admission"] = admission
+
+        with patch("tasks_routes.stream_query", return_value=iter([])):
+            response = client.get("/tasks/?all=1", buffered=False)
+            assert admission.stats()["in_flight"] == 1
+            response.get_data()
+            response.close()
+
+        assert admission.stats()["in_flight"] == 0
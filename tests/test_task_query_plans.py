@@ -0,0 +1,100 @@
+"""
+EXPLAIN checks that every task list filter/sort combination, and search,
+uses one of the user-scoped indexes, so they only read the caller's rows.
+
+These need a real, migrated database and are skipped unless
+TEST_DATABASE_URL is set, e.g.:
+
+    alembic -x db_url=$TEST_DATABASE_URL upgrade head
+    TEST_DATABASE_URL=... pytest tests/test_task_query_plans.py
+"""
+
+import itertools
+import os
+from datetime import datetime
+import pytest
+import psycopg2
+
+from tasks_routes import (
+    SORT_COLUMNS,
+    STATUS_FILTERS,
+    build_search_query,
+    build_task_page_query,
+    build_tsquery,
+    parse_list_options,
+)
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(
+    not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set"
+)
+
+CURSOR_KEYS = {
+    "created": (datetime(2024, 1, 1), 10),
+    "updated": (datetime(2024, 1, 1), 10),
+    "title": ("m", 10),
+}
+
+
+@pytest.fixture(scope="module")
+def connection():
+    """Connection on which sequential scans are priced out."""
+    conn = psycopg2.connect(TEST_DATABASE_URL)
+    with conn.cursor() as cursor:
+        # The planner then only picks a Seq Scan when no index can serve the
+        # query, so the result does not depend on the table's current size
+        cursor.execute("SET enable_seqscan = off")
+    yield conn
+    conn.rollback()
+    conn.close()
+
+
+def explain(conn, query, params):
+    """Return the text plan of `query`."""
+    with conn.cursor() as cursor:
+        cursor.execute("EXPLAIN " + query, params)
+        return "\n".join(row[0] for row in cursor.fetchall())
+
+
+@pytest.mark.parametrize(
+    "status,sort,order,ranged,page",
+    list(
+        itertools.product(
+            STATUS_FILTERS,
+            SORT_COLUMNS,
+            ("asc", "desc"),
+            (False, True),
+            ("first", "after", "before"),
+        )
+    ),
+)
+def test_list_query_uses_index(connection, status, sort, order, ranged, page):
+    """Test each filter/sort/page combination avoids a sequential scan."""
+    args = {"status": status, "sort": sort, "order": order}
+    if ranged:
+        args.update(created_after="2024-01-01", created_before="2024-02-01")
+    errors, options = parse_list_options(args)
+    assert not errors
+    key = CURSOR_KEYS[sort]
+
+    query, params = build_task_page_query(
+        1,
+        after=key if page == "after" else None,
+        before=key if page == "before" else None,
+        options=options,
+    )
+    plan = explain(connection, query, params)
+
+    assert "Seq Scan" not in plan, plan
+    assert "ix_tasks_user_id_" in plan, plan
+
+
+@pytest.mark.parametrize("after", [None, (0.5, 10)])
+def test_search_query_uses_user_scoped_index(connection, after):
+    """Test search reads the user's matches through the btree_gin index."""
+    query, params = build_search_query(1, build_tsquery("writ te"), after=after)
+    plan = explain(connection, query, params)
+
+    assert "Seq Scan" not in plan, plan
+    assert "ix_tasks_user_id_search_vector" in plan, plan
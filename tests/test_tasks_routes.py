@@ -1,8 +1,38 @@
 """Unit tests for tasks routes."""
 
+import io
+import json
+import pickle
+import pytest
 from unittest.mock import patch
 import psycopg2
-from datetime import datetime
+from datetime import UTC, datetime
+
+from tasks_routes import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    Task,
+    buffer_chunks,
+    build_export_query,
+    build_task_page_query,
+    build_tsquery,
+    decode_cursor,
+    decode_search_cursor,
+    encode_cursor,
+    encode_search_cursor,
+    list_query_args,
+    parse_list_options,
+    parse_page_size,
+    tasks_cache_namespace,
+)
+from tests.conftest import TEST_USER_ID
+
+
+@pytest.fixture(autouse=True)
+def mock_table_version():
+    """Stub the tasks version lookup so list requests never touch the DB."""
+    with patch("tasks_routes.get_table_version", return_value=None) as mock:
+        yield mock
 
 
 class TestTaskRoutes:
@@ -86,6 +116,24 @@ class TestTaskRoutes:
 
         assert response.status_code == 302  # Redirect after successful creation
         mock_execute_update.assert_called_once()
+        query, params = mock_execute_update.call_args[0]
+        # No follow-up job unless TASK_CREATED_JOBS is set
+        assert "INSERT INTO jobs" not in query
+        assert params == ("New Task", "A task", False, TEST_USER_ID)
+
+    @patch("tasks_routes.execute_update")
+    def test_create_task_queues_job_when_enabled(
+        self, mock_execute_update, app, client
+    ):
+        """Test TASK_CREATED_JOBS queues the job in the same statement."""
+        app.config["TASK_CREATED_JOBS"] = True
+        mock_execute_update.return_value = [make_task(1, datetime(2024, 1, 1))]
+
+        response = client.post("/tasks/", data={"title": "New Task"})
+
+        assert response.status_code == 302
+        query = mock_execute_update.call_args[0][0]
+        assert "INSERT INTO jobs" in query and "'task_created'" in query
 
     def test_create_task_missing_title(self, client):
         """Test POST /tasks fails when title is missing."""
@@ -151,3 +199,857 @@ class TestTaskRoutes:
 
         assert response.status_code == 200
         assert b"home" in response.data.lower() or b"html" in response.data.lower()
+
+
+def make_task(task_id, created_at):
+    """Build a task row as returned by execute_query."""
+    return {
+        "id": task_id,
+        "title": f"Task {task_id}",
+        "description": None,
+        "completed_at": None,
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+
+
+class TestTaskPagination:
+    """Test suite for keyset pagination of the task list."""
+
+    def test_cursor_round_trip(self):
+        """Test encode_cursor output decodes to the (created_at, id) key."""
+        task = make_task(42, datetime(2024, 1, 2, 3, 4, 5, 678))
+
+        assert decode_cursor(encode_cursor(task)) == (task["created_at"], 42)
+
+    def test_decode_cursor_invalid(self):
+        """Test malformed cursors decode to None instead of raising."""
+        assert decode_cursor(None) is None
+        assert decode_cursor("") is None
+        assert decode_cursor("not-a-cursor") is None
+        assert decode_cursor("2024-01-01T00:00:00,abc") is None
+
+    def test_parse_page_size(self):
+        """Test page size is defaulted and clamped."""
+        assert parse_page_size(None) == DEFAULT_PAGE_SIZE
+        assert parse_page_size("abc") == DEFAULT_PAGE_SIZE
+        assert parse_page_size("0") == 1
+        assert parse_page_size("10") == 10
+        assert parse_page_size("100000") == MAX_PAGE_SIZE
+
+    @patch("tasks_routes.execute_query")
+    def test_first_page_limits_query(self, mock_execute_query, client):
+        """Test the first page asks for per_page + 1 of the user's rows."""
+        mock_execute_query.return_value = []
+
+        client.get("/tasks/?per_page=10")
+
+        query, params = mock_execute_query.call_args[0]
+        assert "LIMIT %s" in query
+        assert "WHERE user_id = %s\n" in query
+        assert params == (TEST_USER_ID, 11)
+
+    @patch("tasks_routes.execute_query")
+    def test_first_page_links_to_next(self, mock_execute_query, client):
+        """Test a full first page renders an Older link and no Newer link."""
+        rows = [make_task(i, datetime(2024, 1, 10 - i)) for i in range(1, 4)]
+        mock_execute_query.return_value = rows
+
+        response = client.get("/tasks/?per_page=2")
+
+        assert response.status_code == 200
+        assert b"Task 1" in response.data
+        assert b"Task 2" in response.data
+        assert b"Task 3" not in response.data
+        assert b"Older" in response.data
+        assert b"Newer" not in response.data
+
+    @patch("tasks_routes.execute_query")
+    def test_after_cursor_seeks_older_rows(self, mock_execute_query, client):
+        """Test ?after= seeks past the cursor key in descending order."""
+        mock_execute_query.return_value = [make_task(5, datetime(2024, 1, 1))]
+        cursor = encode_cursor(make_task(6, datetime(2024, 1, 2)))
+
+        response = client.get("/tasks/", query_string={"after": cursor})
+
+        query, params = mock_execute_query.call_args[0]
+        assert "(created_at, id) < (%s, %s)" in query
+        assert params == (TEST_USER_ID, datetime(2024, 1, 2), 6, DEFAULT_PAGE_SIZE + 1)
+        assert b"Newer" in response.data
+        assert b"Older" not in response.data
+
+    @patch("tasks_routes.execute_query")
+    def test_before_cursor_returns_rows_newest_first(self, mock_execute_query, client):
+        """Test ?before= seeks ascending and reverses rows for display."""
+        mock_execute_query.return_value = [
+            make_task(7, datetime(2024, 1, 3)),
+            make_task(8, datetime(2024, 1, 4)),
+        ]
+        cursor = encode_cursor(make_task(6, datetime(2024, 1, 2)))
+
+        response = client.get("/tasks/", query_string={"before": cursor})
+
+        query, _ = mock_execute_query.call_args[0]
+        assert "(created_at, id) > (%s, %s)" in query
+        assert response.data.index(b"Task 8") < response.data.index(b"Task 7")
+        assert b"Older" in response.data
+        assert b"Newer" not in response.data
+
+    @patch("tasks_routes.execute_query")
+    def test_list_reads_task_rows(self, mock_execute_query, client):
+        """Test the list page reads compact Task rows and renders them."""
+        mock_execute_query.return_value = [
+            Task(**make_task(i, datetime(2024, 1, 10 - i))) for i in range(1, 4)
+        ]
+
+        response = client.get("/tasks/?per_page=2")
+
+        assert mock_execute_query.call_args.kwargs["row_type"] is Task
+        assert b"Task 2" in response.data
+        assert b"Older" in response.data
+
+    def test_task_row_access(self):
+        """Test Task rows take subscripts like dict rows and pickle for caches."""
+        task = Task(**make_task(42, datetime(2024, 1, 2)))
+
+        assert task["title"] == task.title == "Task 42"
+        with pytest.raises(KeyError):
+            task["user_id"]
+        assert pickle.loads(pickle.dumps(task)) == task
+        assert not hasattr(task, "__dict__")
+
+
+class TestTaskStreaming:
+    """Test suite for streamed task rendering and export."""
+
+    @patch("tasks_routes.stream_query")
+    def test_list_all_tasks_streams(self, mock_stream_query, client):
+        """Test GET /tasks/?all=1 renders rows from a server-side cursor."""
+        mock_stream_query.return_value = iter(
+            [make_task(1, datetime(2024, 1, 2)), make_task(2, datetime(2024, 1, 1))]
+        )
+
+        response = client.get("/tasks/?all=1")
+
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert b"Task 1" in response.data
+        assert b"Task 2" in response.data
+        assert b"Older" not in response.data
+        mock_stream_query.assert_called_once()
+        assert mock_stream_query.call_args.kwargs["row_type"] is Task
+
+    @patch("tasks_routes.stream_query")
+    def test_list_all_tasks_empty(self, mock_stream_query, client):
+        """Test the streamed list shows the empty state for no rows."""
+        mock_stream_query.return_value = iter([])
+
+        response = client.get("/tasks/?all=1")
+
+        assert b"No tasks yet" in response.data
+
+    def test_buffer_chunks_coalesces(self):
+        """Test buffer_chunks joins small pieces up to the chunk size."""
+        chunks = list(buffer_chunks(["ab", "cd", "ef", "g"], size=4))
+
+        assert chunks == ["abcd", "efg"]
+
+
+class TestTaskImport:
+    """Test suite for bulk task import."""
+
+    @staticmethod
+    def capture_copy(mock_copy_in):
+        """Make the copy_in mock drain its line iterator into a list."""
+        copied = []
+
+        def consume(query, lines):
+            copied.extend(lines)
+            return len(copied)
+
+        mock_copy_in.side_effect = consume
+        return copied
+
+    @patch("tasks_routes.copy_in")
+    def test_import_ndjson_body(self, mock_copy_in, client):
+        """Test NDJSON in the request body is validated and copied."""
+        copied = self.capture_copy(mock_copy_in)
+        body = "\n".join(
+            [
+                '{"title": "First", "description": "One"}',
+                "",
+                '{"title": "  Second  "}',
+                '{"title": ""}',
+                "not json",
+                "[1, 2]",
+            ]
+        )
+
+        response = client.post(
+            "/tasks/import", data=body, content_type="application/x-ndjson"
+        )
+
+        assert response.status_code == 200
+        assert copied == ["First,One,1\n", "Second,,1\n"]
+        assert response.json["imported"] == 2
+        assert response.json["failed"] == 3
+        assert response.json["errors"] == [
+            {"line": 4, "errors": {"title": "Title is required"}},
+            {"line": 5, "errors": {"row": "Invalid JSON"}},
+            {"line": 6, "errors": {"row": "Expected a JSON object"}},
+        ]
+        assert "COPY tasks (title, description, user_id) FROM STDIN" in (
+            mock_copy_in.call_args[0][0]
+        )
+
+    @patch("tasks_routes.copy_in")
+    def test_import_csv_upload(self, mock_copy_in, client):
+        """Test a multipart CSV upload is detected by extension and copied."""
+        copied = self.capture_copy(mock_copy_in)
+        upload = (
+            b'title,description\n"Buy milk","2, maybe 3"\n,missing title\n',
+            "tasks.csv",
+        )
+
+        response = client.post(
+            "/tasks/import",
+            data={"file": (io.BytesIO(upload[0]), upload[1])},
+            content_type="multipart/form-data",
+        )
+
+        assert response.status_code == 200
+        assert copied == ['Buy milk,"2, maybe 3",1\n']
+        assert response.json["failed"] == 1
+        assert response.json["errors"][0]["line"] == 3
+
+    @patch("tasks_routes.copy_in")
+    def test_import_reports_long_fields(self, mock_copy_in, client):
+        """Test rows failing validate_task_form length rules are reported."""
+        self.capture_copy(mock_copy_in)
+        body = json.dumps({"title": "ok", "description": "x" * 256})
+
+        response = client.post("/tasks/import?format=ndjson", data=body)
+
+        assert response.json["imported"] == 0
+        assert response.json["errors"][0]["errors"] == {
+            "description": "Description must be 255 characters or less"
+        }
+
+    def test_import_unsupported_format(self, client):
+        """Test an unknown ?format= is rejected."""
+        response = client.post("/tasks/import?format=xml", data="<tasks/>")
+
+        assert response.status_code == 400
+
+    @patch("tasks_routes.copy_in")
+    def test_import_database_error(self, mock_copy_in, client):
+        """Test a failed COPY reports that nothing was imported."""
+        mock_copy_in.side_effect = psycopg2.Error("COPY failed")
+
+        response = client.post("/tasks/import", data='{"title": "Task"}')
+
+        assert response.status_code == 500
+        assert response.json["imported"] == 0
+
+
+class TestTaskExport:
+    """Test suite for COPY-based task export."""
+
+    @patch("tasks_routes.stream_copy")
+    def test_export_ndjson_by_default(self, mock_stream_copy, client):
+        """Test GET /tasks/export streams COPY output as NDJSON."""
+        mock_stream_copy.return_value = iter([b'{"id": 1}\n', b'{"id": 2}\n'])
+
+        response = client.get("/tasks/export")
+
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+        assert response.data == b'{"id": 1}\n{"id": 2}\n'
+        query, params = mock_stream_copy.call_args[0]
+        assert "row_to_json" in query
+        assert "WHERE user_id = %s" in query
+        assert params == [TEST_USER_ID]
+
+    @patch("tasks_routes.stream_copy")
+    def test_export_csv_with_filters(self, mock_stream_copy, client):
+        """Test filters are passed as params to a CSV COPY."""
+        mock_stream_copy.return_value = iter([b"id,title\n"])
+
+        response = client.get(
+            "/tasks/export?format=csv&completed=false&created_after=2024-01-01"
+        )
+
+        assert response.status_code == 200
+        assert response.mimetype == "text/csv"
+        query, params = mock_stream_copy.call_args[0]
+        assert "FORMAT csv, HEADER" in query
+        assert "completed_at IS NULL" in query
+        assert "created_at >= %s" in query
+        assert params == [TEST_USER_ID, datetime(2024, 1, 1)]
+
+    def test_export_rejects_bad_filters(self, client):
+        """Test invalid filter values return 400 without querying."""
+        response = client.get("/tasks/export?completed=maybe&created_before=soon")
+
+        assert response.status_code == 400
+        assert set(response.json["errors"]) == {"completed", "created_before"}
+
+    def test_export_rejects_unknown_format(self, client):
+        """Test an unsupported format returns 400."""
+        response = client.get("/tasks/export?format=xml")
+
+        assert response.status_code == 400
+
+    def test_build_export_query_filters(self):
+        """Test build_export_query only emits fixed fragments."""
+        query, params = build_export_query(
+            "csv",
+            completed=True,
+            created_after=datetime(2024, 1, 1),
+            created_before=datetime(2024, 2, 1),
+        )
+
+        assert "completed_at IS NOT NULL" in query
+        assert "created_at >= %s AND created_at < %s" in query
+        assert params == [datetime(2024, 1, 1), datetime(2024, 2, 1)]
+
+    @patch("tasks_routes.copy_to")
+    def test_export_cli_command(self, mock_copy_to, runner):
+        """Test flask tasks export writes COPY output to stdout."""
+
+        def copy_to(query, params, destination):
+            destination.write(b"id,title\n1,Task\n")
+
+        mock_copy_to.side_effect = copy_to
+
+        result = runner.invoke(args=["tasks", "export", "--open"])
+
+        assert result.exit_code == 0
+        assert result.output == "id,title\n1,Task\n"
+        query, params = mock_copy_to.call_args[0][:2]
+        assert "completed_at IS NULL" in query
+
+
+class TestTaskListCache:
+    """Test suite for task list caching and invalidation."""
+
+    @patch("tasks_routes.execute_query")
+    def test_list_tasks_served_from_cache(self, mock_execute_query, client):
+        """Test a repeated page request does not hit the database."""
+        mock_execute_query.return_value = [make_task(1, datetime(2024, 1, 1))]
+
+        client.get("/tasks/")
+        response = client.get("/tasks/")
+
+        assert b"Task 1" in response.data
+        mock_execute_query.assert_called_once()
+
+    @patch("tasks_routes.execute_query")
+    def test_cache_key_includes_page_params(self, mock_execute_query, client):
+        """Test different page sizes are cached separately."""
+        mock_execute_query.return_value = []
+
+        client.get("/tasks/?per_page=5")
+        client.get("/tasks/?per_page=10")
+
+        assert mock_execute_query.call_count == 2
+
+    @patch("tasks_routes.execute_update")
+    @patch("tasks_routes.execute_query")
+    def test_create_task_invalidates_cache(
+        self, mock_execute_query, mock_execute_update, client
+    ):
+        """Test creating a task makes the next list request reload."""
+        mock_execute_query.return_value = []
+        mock_execute_update.return_value = [make_task(1, datetime(2024, 1, 1))]
+
+        client.get("/tasks/")
+        client.post("/tasks/", data={"title": "New Task"})
+        client.get("/tasks/")
+
+        assert mock_execute_query.call_count == 2
+
+    @patch("tasks_routes.execute_update")
+    @patch("tasks_routes.execute_query")
+    def test_pages_are_cached_per_user(
+        self, mock_execute_query, mock_execute_update, client
+    ):
+        """Test users never share pages and one user's write keeps the others'."""
+        mock_execute_query.return_value = []
+        mock_execute_update.return_value = [make_task(1, datetime(2024, 1, 1))]
+
+        client.get("/tasks/")
+        with client.session_transaction() as session:
+            session["user_id"] = 2
+        client.get("/tasks/")
+        client.post("/tasks/", data={"title": "New Task"})
+        with client.session_transaction() as session:
+            session["user_id"] = TEST_USER_ID
+        client.get("/tasks/")
+
+        assert mock_execute_query.call_count == 2
+        assert tasks_cache_namespace(2) != tasks_cache_namespace(TEST_USER_ID)
+
+    @patch("tasks_routes.execute_query")
+    def test_database_errors_are_not_cached(self, mock_execute_query, client):
+        """Test a failed load is retried on the next request."""
+        mock_execute_query.side_effect = [psycopg2.Error("down"), []]
+
+        assert client.get("/tasks/").status_code == 500
+        assert client.get("/tasks/").status_code == 200
+
+
+class TestTaskListConditionalGet:
+    """Test suite for ETag / Last-Modified handling on the task list."""
+
+    VERSION = {"version": 7, "updated_at": datetime(2024, 1, 1, 12, 0, 30, 500000, UTC)}
+
+    @patch("tasks_routes.execute_query")
+    def test_list_tasks_sets_validators(
+        self, mock_execute_query, mock_table_version, client
+    ):
+        """Test a full response carries a weak ETag and Last-Modified."""
+        mock_table_version.return_value = self.VERSION
+        mock_execute_query.return_value = []
+
+        response = client.get("/tasks/")
+
+        assert response.status_code == 200
+        assert response.headers["ETag"] == 'W/"tasks-1-7"'
+        mock_table_version.assert_called_once_with("tasks", TEST_USER_ID)
+        assert response.last_modified == datetime(2024, 1, 1, 12, 0, 30, tzinfo=UTC)
+        assert response.cache_control.no_cache
+        assert response.cache_control.private
+
+    @patch("tasks_routes.execute_query")
+    def test_if_none_match_returns_304(
+        self, mock_execute_query, mock_table_version, client
+    ):
+        """Test a matching If-None-Match skips the query and the render."""
+        mock_table_version.return_value = self.VERSION
+
+        response = client.get("/tasks/", headers={"If-None-Match": 'W/"tasks-1-7"'})
+
+        assert response.status_code == 304
+        assert response.data == b""
+        mock_execute_query.assert_not_called()
+
+    @patch("tasks_routes.execute_query")
+    def test_stale_etag_renders(self, mock_execute_query, mock_table_version, client):
+        """Test an outdated ETag gets a full response."""
+        mock_table_version.return_value = self.VERSION
+        mock_execute_query.return_value = []
+
+        response = client.get("/tasks/", headers={"If-None-Match": 'W/"tasks-1-6"'})
+
+        assert response.status_code == 200
+        mock_execute_query.assert_called_once()
+
+    @patch("tasks_routes.execute_query")
+    def test_other_users_etag_renders(
+        self, mock_execute_query, mock_table_version, client
+    ):
+        """Test a page cached for another user is never revalidated."""
+        mock_table_version.return_value = self.VERSION
+        mock_execute_query.return_value = []
+
+        response = client.get("/tasks/", headers={"If-None-Match": 'W/"tasks-2-7"'})
+
+        assert response.status_code == 200
+
+    @patch("tasks_routes.execute_query")
+    def test_if_modified_since_returns_304(
+        self, mock_execute_query, mock_table_version, client
+    ):
+        """Test If-Modified-Since at or after the last write returns 304."""
+        mock_table_version.return_value = self.VERSION
+
+        response = client.get(
+            "/tasks/", headers={"If-Modified-Since": "Mon, 01 Jan 2024 12:00:30 GMT"}
+        )
+
+        assert response.status_code == 304
+        mock_execute_query.assert_not_called()
+
+    @patch("tasks_routes.execute_query")
+    def test_if_modified_since_older_renders(
+        self, mock_execute_query, mock_table_version, client
+    ):
+        """Test If-Modified-Since before the last write gets a full response."""
+        mock_table_version.return_value = self.VERSION
+        mock_execute_query.return_value = []
+
+        response = client.get(
+            "/tasks/", headers={"If-Modified-Since": "Mon, 01 Jan 2024 12:00:29 GMT"}
+        )
+
+        assert response.status_code == 200
+
+    @patch("tasks_routes.execute_query")
+    def test_version_lookup_failure_renders(
+        self, mock_execute_query, mock_table_version, client
+    ):
+        """Test a failing version lookup falls back to an unconditional GET."""
+        mock_table_version.side_effect = psycopg2.Error("no table_versions")
+        mock_execute_query.return_value = []
+
+        response = client.get("/tasks/", headers={"If-None-Match": 'W/"tasks-7"'})
+
+        assert response.status_code == 200
+        assert "ETag" not in response.headers
+
+    @patch("tasks_routes.execute_query")
+    def test_version_change_reloads_cached_page(
+        self, mock_execute_query, mock_table_version, client
+    ):
+        """Test a write seen only through the version misses the page cache."""
+        mock_execute_query.return_value = []
+        mock_table_version.return_value = self.VERSION
+        client.get("/tasks/")
+
+        # Written through another process, which can't clear this one's cache
+        mock_table_version.return_value = {**self.VERSION, "version": 8}
+        response = client.get("/tasks/")
+
+        assert response.headers["ETag"] == 'W/"tasks-1-8"'
+        assert mock_execute_query.call_count == 2
+
+    @patch("tasks_routes.execute_query")
+    def test_version_change_reloads_cached_search(
+        self, mock_execute_query, mock_table_version, client
+    ):
+        """Test cached search results are keyed by the tasks version too."""
+        mock_execute_query.return_value = []
+        mock_table_version.return_value = self.VERSION
+        client.get("/tasks/search?q=milk")
+        client.get("/tasks/search?q=milk")
+        assert mock_execute_query.call_count == 1
+
+        mock_table_version.return_value = {**self.VERSION, "version": 8}
+        client.get("/tasks/search?q=milk")
+
+        assert mock_execute_query.call_count == 2
+
+    @patch("tasks_routes.execute_update")
+    @patch("tasks_routes.execute_query")
+    def test_pending_flash_is_not_cached(
+        self, mock_execute_query, mock_execute_update, mock_table_version, client
+    ):
+        """Test the page shown after a write (with its flash) has no ETag."""
+        mock_table_version.return_value = self.VERSION
+        mock_execute_query.return_value = []
+        mock_execute_update.return_value = [make_task(1, datetime(2024, 1, 1))]
+
+        client.post("/tasks/", data={"title": "New Task"})
+        response = client.get("/tasks/", headers={"If-None-Match": 'W/"tasks-7"'})
+
+        assert response.status_code == 200
+        assert b"Task created successfully!" in response.data
+        assert "ETag" not in response.headers
+
+
+class TestTaskEditRoutes:
+    """Test suite for task update, completion and deletion routes."""
+
+    VERSION = "2024-01-01T00:00:00.250000"
+
+    @patch("tasks_routes.execute_query")
+    def test_edit_task_form(self, mock_execute_query, client):
+        """Test GET /tasks/<id>/edit renders the form with the version token."""
+        mock_execute_query.return_value = [make_task(3, datetime(2024, 1, 1))]
+
+        response = client.get("/tasks/3/edit")
+
+        assert response.status_code == 200
+        assert b"Task 3" in response.data
+        assert b'value="2024-01-01T00:00:00"' in response.data
+
+    @patch("tasks_routes.execute_query")
+    def test_edit_task_not_found(self, mock_execute_query, client):
+        """Test editing a missing task returns 404."""
+        mock_execute_query.return_value = []
+
+        assert client.get("/tasks/3/edit").status_code == 404
+
+    @patch("tasks_routes.execute_update")
+    def test_update_task_success(self, mock_execute_update, client):
+        """Test a current version updates in one conditional UPDATE."""
+        mock_execute_update.return_value = [make_task(3, datetime(2024, 1, 1))]
+
+        response = client.post(
+            "/tasks/3",
+            data={"title": "Renamed", "description": "", "updated_at": self.VERSION},
+        )
+
+        assert response.status_code == 302
+        mock_execute_update.assert_called_once()
+        query, params = mock_execute_update.call_args[0]
+        assert "WHERE id = %s AND user_id = %s AND updated_at = %s" in query
+        assert "RETURNING" in query
+        assert params == [
+            "Renamed",
+            None,
+            3,
+            TEST_USER_ID,
+            datetime.fromisoformat(self.VERSION),
+        ]
+
+    @patch("tasks_routes.execute_query")
+    @patch("tasks_routes.execute_update")
+    def test_update_task_conflict(
+        self, mock_execute_update, mock_execute_query, client
+    ):
+        """Test a stale version re-renders the form with the current token."""
+        mock_execute_update.return_value = []
+        current = make_task(3, datetime(2024, 1, 1))
+        current["updated_at"] = datetime(2024, 1, 5, 10, 0)
+        mock_execute_query.side_effect = [[(1,)], [current]]
+
+        response = client.post(
+            "/tasks/3", data={"title": "Mine", "updated_at": self.VERSION}
+        )
+
+        assert response.status_code == 409
+        assert b"changed by someone else" in response.data
+        assert b'value="2024-01-05T10:00:00"' in response.data
+        assert b'value="Mine"' in response.data
+
+    def test_update_task_validation(self, client):
+        """Test update applies the task form rules and needs a version."""
+        response = client.post("/tasks/3", data={"title": ""})
+
+        assert response.status_code == 400
+        assert b"Title is required" in response.data
+
+    @patch("tasks_routes.execute_query")
+    @patch("tasks_routes.execute_update")
+    def test_update_task_not_found(
+        self, mock_execute_update, mock_execute_query, client
+    ):
+        """Test updating a missing task returns 404."""
+        mock_execute_update.return_value = []
+        mock_execute_query.return_value = []
+
+        response = client.post(
+            "/tasks/3", data={"title": "Mine", "updated_at": self.VERSION}
+        )
+
+        assert response.status_code == 404
+
+    @patch("tasks_routes.execute_update")
+    def test_complete_task(self, mock_execute_update, client):
+        """Test completing a task sets completed_at without a prior read."""
+        mock_execute_update.return_value = [make_task(3, datetime(2024, 1, 1))]
+
+        response = client.post("/tasks/3/complete", data={"updated_at": self.VERSION})
+
+        assert response.status_code == 302
+        query, params = mock_execute_update.call_args[0]
+        assert "COALESCE(completed_at, now())" in query
+        assert params[0] is True
+
+    @patch("tasks_routes.execute_update")
+    def test_reopen_task(self, mock_execute_update, client):
+        """Test completed=0 clears completed_at."""
+        mock_execute_update.return_value = [make_task(3, datetime(2024, 1, 1))]
+
+        client.post("/tasks/3/complete", data={"completed": "0"})
+
+        assert mock_execute_update.call_args[0][1] == [False, 3, TEST_USER_ID]
+
+    @patch("tasks_routes.execute_query")
+    @patch("tasks_routes.execute_update")
+    def test_delete_task_conflict(
+        self, mock_execute_update, mock_execute_query, client
+    ):
+        """Test deleting a task edited since the page rendered is refused."""
+        mock_execute_update.return_value = []
+        # Existence check, then the list page after the redirect
+        mock_execute_query.side_effect = [[(1,)], []]
+
+        response = client.post(
+            "/tasks/3/delete",
+            data={"updated_at": self.VERSION},
+            follow_redirects=True,
+        )
+
+        assert b"changed by someone else" in response.data
+        query, _ = mock_execute_update.call_args[0]
+        assert query.startswith(
+            "DELETE FROM tasks WHERE id = %s AND user_id = %s AND updated_at = %s"
+        )
+
+    @patch("tasks_routes.execute_update")
+    def test_delete_task(self, mock_execute_update, client):
+        """Test deleting a task redirects to the list."""
+        mock_execute_update.return_value = [{"id": 3}]
+
+        response = client.post("/tasks/3/delete", data={"updated_at": self.VERSION})
+
+        assert response.status_code == 302
+
+    @patch("tasks_routes.execute_query")
+    def test_list_renders_task_actions(self, mock_execute_query, client):
+        """Test each card carries its version token for the action forms."""
+        mock_execute_query.return_value = [make_task(3, datetime(2024, 1, 1))]
+
+        response = client.get("/tasks/")
+
+        assert b"/tasks/3/complete" in response.data
+        assert b"/tasks/3/delete" in response.data
+        assert b'name="updated_at" value="2024-01-01T00:00:00"' in response.data
+
+
+class TestTaskSearch:
+    """Test suite for full-text search."""
+
+    def test_build_tsquery_prefix_matches_words(self):
+        """Test words become AND-ed prefix terms with syntax stripped."""
+        assert build_tsquery("Writ  TESTS") == "writ:* & tests:*"
+        assert build_tsquery("a|b & !c:*") == "a:* & b:* & c:*"
+        assert build_tsquery("  ?! ") is None
+        assert build_tsquery(" ".join(["w"] * 20)).count(":*") == 8
+
+    def test_search_cursor_round_trip(self):
+        """Test the (rank, id) cursor survives encoding exactly."""
+        task = {"rank": 0.0607927106320858, "id": 7}
+
+        assert decode_search_cursor(encode_search_cursor(task)) == (task["rank"], 7)
+        assert decode_search_cursor("abc") is None
+
+    @patch("tasks_routes.execute_query")
+    def test_search_ranks_with_index(self, mock_execute_query, client):
+        """Test the query matches on search_vector and orders by ts_rank."""
+        rows = [dict(make_task(i, datetime(2024, 1, i)), rank=0.5) for i in (3, 2, 1)]
+        mock_execute_query.return_value = rows
+
+        response = client.get("/tasks/search?q=task&per_page=2")
+
+        assert response.status_code == 200
+        assert b"Task 3" in response.data
+        assert b"Task 1" not in response.data
+        assert b"More results" in response.data
+        query, params = mock_execute_query.call_args[0]
+        assert "search_vector @@ query AND user_id = %s" in query
+        assert "ORDER BY rank DESC, id DESC" in query
+        assert params == ["english", "task:*", TEST_USER_ID, 3]
+
+    @patch("tasks_routes.execute_query")
+    def test_search_next_page_seeks(self, mock_execute_query, client):
+        """Test ?after= seeks past the previous page's (rank, id)."""
+        mock_execute_query.return_value = []
+
+        client.get("/tasks/search?q=task&after=0.25,9")
+
+        query, params = mock_execute_query.call_args[0]
+        assert "(rank, id) < (%s::real, %s)" in query
+        assert params == [
+            "english",
+            "task:*",
+            TEST_USER_ID,
+            0.25,
+            9,
+            DEFAULT_PAGE_SIZE + 1,
+        ]
+
+    @patch("tasks_routes.execute_query")
+    def test_empty_search_skips_database(self, mock_execute_query, client):
+        """Test a query without words renders the form without a lookup."""
+        response = client.get("/tasks/search?q=+")
+
+        assert response.status_code == 200
+        mock_execute_query.assert_not_called()
+
+
+class TestTaskListFilters:
+    """Test suite for filtered and sorted task lists."""
+
+    def test_parse_list_options_defaults(self):
+        """Test no arguments means every task, newest first."""
+        assert parse_list_options({}) == ({}, {"sort": "created", "descending": True})
+
+    def test_parse_list_options(self):
+        """Test status, date range, sort and order are parsed."""
+        errors, options = parse_list_options(
+            {
+                "status": "open",
+                "created_after": "2024-01-01",
+                "sort": "title",
+                "order": "desc",
+            }
+        )
+
+        assert errors == {}
+        assert options == {
+            "completed": False,
+            "created_after": datetime(2024, 1, 1),
+            "sort": "title",
+            "descending": True,
+        }
+
+    def test_parse_list_options_rejects_unknown_values(self):
+        """Test only whitelisted values are accepted."""
+        errors, options = parse_list_options(
+            {"status": "x", "sort": "id; DROP TABLE tasks", "order": "up"}
+        )
+
+        assert set(errors) == {"status", "sort", "order"}
+        assert options["sort"] == "created"
+
+    def test_list_query_args_round_trip(self):
+        """Test page links carry exactly the non-default options."""
+        args = {"status": "completed", "sort": "title", "order": "desc"}
+        _, options = parse_list_options(args)
+
+        assert list_query_args(options) == args
+        assert list_query_args(parse_list_options({})[1]) == {}
+
+    def test_title_cursor_round_trip(self):
+        """Test title cursors survive commas in the title."""
+        task = {"title": "a, b", "id": 3}
+
+        assert decode_cursor(encode_cursor(task, "title"), "title") == ("a, b", 3)
+
+    def test_build_query_filters_and_sort(self):
+        """Test filters become fixed predicates and the sort its own seek."""
+        _, options = parse_list_options(
+            {"status": "open", "created_before": "2024-02-01", "sort": "updated"}
+        )
+        key = (datetime(2024, 1, 5), 9)
+
+        query, params = build_task_page_query(7, after=key, per_page=5, options=options)
+
+        assert "user_id = %s AND completed_at IS NULL" in query
+        assert "created_at < %s" in query
+        assert "(updated_at, id) < (%s, %s)" in query
+        assert "ORDER BY updated_at DESC, id DESC" in query
+        assert params == (7, datetime(2024, 2, 1), *key, 6)
+
+    def test_build_query_before_reverses_ascending_sort(self):
+        """Test paging backwards on an ascending sort walks the index down."""
+        _, options = parse_list_options({"sort": "title"})
+
+        query, params = build_task_page_query(7, before=("m", 4), options=options)
+
+        assert "(title, id) < (%s, %s)" in query
+        assert "ORDER BY title DESC, id DESC" in query
+
+    @patch("tasks_routes.execute_query")
+    def test_list_links_keep_filters(self, mock_execute_query, client):
+        """Test pagination links preserve the active filters and sort."""
+        rows = [make_task(i, datetime(2024, 1, 10 - i)) for i in range(1, 4)]
+        mock_execute_query.return_value = rows
+
+        response = client.get("/tasks/?per_page=2&status=open&sort=updated")
+
+        assert b"status=open" in response.data
+        assert b"sort=updated" in response.data
+        assert "completed_at IS NULL" in mock_execute_query.call_args[0][0]
+
+    @patch("tasks_routes.execute_query")
+    def test_list_invalid_filter(self, mock_execute_query, client):
+        """Test an unknown sort is rejected with 400 before querying."""
+        response = client.get("/tasks/?sort=description")
+
+        assert response.status_code == 400
+        mock_execute_query.assert_not_called()